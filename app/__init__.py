@@ -6,10 +6,16 @@ from app.api.routes import *
 from app.ui import ui_bp
 from app.lib.camera.file_manager import FileManager
 from app.lib.camera.video_processor import VideoProcessor
+from app.lib.camera.transcode_queue import TranscodeJobQueue
 from app.lib.camera.camera_manager import CameraManager
 from app.lib.camera.stream_manager import StreamManager
+from app.lib.camera.live_segmenter import LiveSegmenter
 from app.lib.camera.motion_detector import MotionDetector
+from app.lib.camera.detection_scheduler import DetectionScheduler
+from app.lib.camera.algorithms import DetectionMask
+from app.lib.camera.clip_preview import PreviewCache, PreviewRecorder
 from app.lib.camera.status_manager import StatusManager
+from app.lib.diagnostics.profiler import SamplingProfiler
 from app.lib.notification.webhook_notifier import WebhookNotifier, get_webhook_specs
 from app.lib.notification.logging_notifier import LoggingNotifier
 import yaml
@@ -52,12 +58,24 @@ def initialize_components(app, config):
         output_dir=str(config.get("capture", {}).get("directory", "captures")),
         max_size_mb=int(config.get("capture", {}).get("max_size_mb", 0)),
         max_age_days=int(config.get("capture", {}).get("max_age_days", 0)),
+        staging_dir=config.get("capture", {}).get("staging", {}).get("directory", None),
+        staging_ram_mb=int(config.get("capture", {}).get("staging", {}).get("ram_max_mb", 48)),
+        staging_reserve_mb=int(config.get("capture", {}).get("staging", {}).get("reserve_mb", 16)),
+        preallocate=bool(config.get("capture", {}).get("staging", {}).get("preallocate", True)),
     )
 
     app.config["video_processor"] = VideoProcessor(
         file_manager=app.config["file_manager"],
         framerate=int(config.get("capture", {}).get("framerate", 30)),
         video_format=config.get("capture", {}).get("video_format", "mkv"),
+        muxer=config.get("capture", {}).get("muxer", "native"),
+    )
+
+    app.config["transcode_queue"] = TranscodeJobQueue(
+        video_processor=app.config["video_processor"],
+        file_manager=app.config["file_manager"],
+        workers=int(config.get("capture", {}).get("transcode_workers", 1)),
+        max_pending=int(config.get("capture", {}).get("transcode_queue_size", 8)),
     )
 
     app.config["camera_manager"] = CameraManager(
@@ -69,10 +87,49 @@ def initialize_components(app, config):
         detect_size=tuple(config.get("capture", {}).get("detect_size", [320, 240])),
         tuning_file=config.get("capture", {}).get("tuning", None),
         orientation=config.get("capture", {}).get("orientation", "normal"),
+        stall_timeout=float(config.get("capture", {}).get("stall_timeout", 5)),
+        backend=config.get("capture", {}).get("backend", "picamera2"),
+        backend_options=config.get("capture", {}).get("replay", None),
+        preroll_seconds=float(config.get("capture", {}).get("preroll", 0)),
+        recording_mode=config.get("capture", {}).get("recording_mode", "per_clip"),
+        transcode_queue=app.config["transcode_queue"],
     )
 
     app.config["stream_manager"] = StreamManager(
-        camera_manager=app.config["camera_manager"]
+        camera_manager=app.config["camera_manager"],
+        encoder=config.get("stream", {}).get("encoder", "software"),
+        quality=int(config.get("stream", {}).get("quality", 75)),
+        max_fps=float(config.get("stream", {}).get("max_fps", 10)),
+    )
+
+    app.config["live_segmenter"] = LiveSegmenter(
+        camera_manager=app.config["camera_manager"],
+        target_duration=float(config.get("stream", {}).get("hls", {}).get("target_duration", 2)),
+        window=int(config.get("stream", {}).get("hls", {}).get("window", 6)),
+        idle_timeout=float(config.get("stream", {}).get("hls", {}).get("idle_timeout", 30)),
+    )
+
+    mask = None
+    if config.get("motion", {}).get("include") or config.get("motion", {}).get("exclude"):
+        mask = DetectionMask(
+            size=tuple(config.get("capture", {}).get("detect_size", [320, 240])),
+            include=config.get("motion", {}).get("include"),
+            exclude=config.get("motion", {}).get("exclude"),
+        )
+
+    preview = None
+    if config.get("preview", {}).get("enabled", True):
+        preview = PreviewRecorder(
+            frame_bus=app.config["camera_manager"].frame_bus,
+            interval=float(config.get("preview", {}).get("interval", 1)),
+            max_frames=int(config.get("preview", {}).get("frames", 12)),
+            width=int(config.get("preview", {}).get("width", 320)),
+            image_format=config.get("preview", {}).get("format", "webp"),
+            quality=int(config.get("preview", {}).get("quality", 80)),
+            frame_duration=int(config.get("preview", {}).get("frame_duration", 250)),
+        )
+    app.config["preview_cache"] = PreviewCache(
+        max_bytes=int(config.get("preview", {}).get("cache_mb", 8)) * 1024 * 1024,
     )
 
     app.config["motion_detector"] = MotionDetector(
@@ -84,6 +141,16 @@ def initialize_components(app, config):
         max_clip_length=(config.get("motion", {}).get("max_clip_length", None)),
         notifiers=[logging_notifier, webhook_notifier],
         algorithm=config.get("motion", {}).get("algorithm", "frame_diff"),
+        scheduler=DetectionScheduler(
+            framerate=int(config.get("capture", {}).get("framerate", 30)),
+            base_fps=float(config.get("motion", {}).get("detection_fps", 5)),
+            idle_fps=float(config.get("motion", {}).get("idle_detection_fps", 1)),
+            idle_after=float(config.get("motion", {}).get("idle_after", 300)),
+            cpu_budget=float(config.get("motion", {}).get("cpu_budget", 0.5)),
+        ),
+        mask=mask,
+        separate_process=bool(config.get("motion", {}).get("separate_process", False)),
+        preview=preview,
     )
 
     app.config["status_manager"] = StatusManager(
@@ -91,6 +158,8 @@ def initialize_components(app, config):
         motion_detector=app.config["motion_detector"]
     )
 
+    app.config["profiler"] = SamplingProfiler()
+
 def load_config(config_file=None):
     """Loads configuration from config/config.yml."""
     default_config_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "config.default.yml")
@@ -159,12 +228,21 @@ def register_openapi_spec(app, file_path):
 
     with app.app_context():
         spec.path(view=status)
+        spec.path(view=metrics)
+        spec.path(view=profile)
         spec.path(view=enable_detection)
         spec.path(view=disable_detection)
         spec.path(view=list_captures)
         spec.path(view=download_capture)
+        spec.path(view=capture_timeline)
+        spec.path(view=capture_preview)
+        spec.path(view=list_jobs)
+        spec.path(view=get_job)
         spec.path(view=take_snapshot)
         spec.path(view=record)
+        spec.path(view=live_playlist)
+        spec.path(view=live_init)
+        spec.path(view=live_segment)
 
         for webhook_spec in webhook_specs:
             for path, definition in webhook_spec.items():
@@ -1,8 +1,13 @@
 from flask import jsonify, Response, request, send_from_directory, current_app, stream_with_context
 from app.api import api_bp
+import hmac
 import os
 import queue
 from ..version import __version__
+from app.lib.diagnostics.metrics import REGISTRY
+from app.lib.diagnostics.profiler import ProfilerBusyError
+from app.lib.camera.clip_preview import ANIMATION_SUFFIXES, CONTENT_TYPES, poster_path
+from app.lib.camera.motion_timeline import MotionTimeline, sidecar_path
 
 
 @api_bp.route("/status", methods=["GET"])
@@ -49,6 +54,108 @@ def status_stream():
     status_manager = current_app.config["status_manager"]
     return Response(stream_with_context(status_manager.generate_status()), content_type="text/event-stream")
 
+@api_bp.route("/metrics", methods=["GET"])
+def metrics():
+    """
+    Returns pipeline metrics in the Prometheus text format.
+    ---
+    get:
+      summary: Prometheus metrics
+      description: Counters, gauges and per-stage latency histograms (capture, detect, jpeg_encode, encoder_start, encoder_stop, transcode, cleanup, webhook).
+      tags: ["Incoming"]
+      responses:
+        200:
+          description: Metrics in the Prometheus text exposition format.
+          content:
+            text/plain:
+              schema:
+                type: string
+    """
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
+@api_bp.route("/profile", methods=["POST"])
+def profile():
+    """
+    Samples the stacks of all threads in the running service.
+    ---
+    post:
+      summary: Profile the running service
+      description: >
+        Samples every thread (motion-detection, capture-worker, Flask request threads...) for the
+        requested number of seconds and returns collapsed stacks for flamegraph.pl or speedscope.
+        With memory=true, the response is JSON and also lists the top tracemalloc allocation sites.
+        Requires "Authorization: Bearer <diagnostics.profile_token>".
+      tags: ["Incoming"]
+      parameters:
+        - in: query
+          name: seconds
+          schema:
+            type: number
+            default: 10
+          description: Sampling duration in seconds (at most 120).
+        - in: query
+          name: interval_ms
+          schema:
+            type: number
+            default: 5
+          description: Milliseconds between samples.
+        - in: query
+          name: thread
+          schema:
+            type: string
+          description: Only include threads whose name contains this text.
+        - in: query
+          name: memory
+          schema:
+            type: boolean
+            default: false
+          description: Also report the top allocation sites with tracemalloc.
+      responses:
+        200:
+          description: Collapsed stacks, or JSON with collapsed stacks and allocations when memory=true.
+          content:
+            text/plain:
+              schema:
+                type: string
+            application/json:
+              schema:
+                type: object
+        401:
+          description: Missing or wrong token.
+        403:
+          description: Profiling is disabled because no token is configured.
+        409:
+          description: Another profile is running.
+    """
+    token = current_app.config.get("diagnostics", {}).get("profile_token")
+    if not token:
+        return jsonify({"error": "Profiling is disabled. Set diagnostics.profile_token to enable it."}), 403
+    provided = request.headers.get("Authorization", "")
+    if not hmac.compare_digest(provided.encode(), f"Bearer {token}".encode()):
+        return jsonify({"error": "Invalid token."}), 401
+
+    try:
+        seconds = float(request.args.get("seconds", 10))
+        interval_ms = float(request.args.get("interval_ms", 5))
+    except ValueError:
+        return jsonify({"error": "seconds and interval_ms must be numbers."}), 400
+    memory = request.args.get("memory", "false").lower() in ("1", "true", "yes")
+
+    profiler = current_app.config["profiler"]
+    try:
+        result = profiler.profile(
+            seconds,
+            interval=interval_ms / 1000,
+            thread_filter=request.args.get("thread"),
+            trace_allocations=memory,
+        )
+    except ProfilerBusyError as e:
+        return jsonify({"error": str(e)}), 409
+
+    if memory:
+        return jsonify(result)
+    return Response(result["collapsed"], mimetype="text/plain")
+
 @api_bp.route("/restart", methods=["POST"])
 def restart():
     camera_manager = current_app.config["camera_manager"]
@@ -131,8 +238,18 @@ def list_captures():
     ---
     get:
       summary: List captured files
-      description: Retrieves a list of all captured files in the output directory.
+      description: >
+        Retrieves the clips and snapshots in the output directory, newest first, from the
+        capture catalog. With details=true each entry is an object with its size, mtime,
+        duration, kind and sidecar files (timeline, poster, animated preview).
       tags: ["Incoming"]
+      parameters:
+        - in: query
+          name: details
+          schema:
+            type: boolean
+            default: false
+          description: Return capture objects instead of filenames.
       responses:
         200:
           description: List of captures.
@@ -144,14 +261,35 @@ def list_captures():
                   captures:
                     type: array
                     items:
-                      type: string
+                      oneOf:
+                        - type: string
+                        - type: object
+                          properties:
+                            name:
+                              type: string
+                            kind:
+                              type: string
+                              enum: [video, image]
+                            size:
+                              type: integer
+                            mtime:
+                              type: number
+                            duration:
+                              type: number
+                            frames:
+                              type: integer
+                            sidecars:
+                              type: array
+                              items:
+                                type: string
         500:
           description: Error listing captures.
     """
     file_manager = current_app.config["file_manager"]
     try:
-        files = os.listdir(file_manager.output_dir)
-        return jsonify({"captures": files})
+        if request.args.get("details", "false").lower() in ("1", "true", "yes"):
+            return jsonify({"captures": file_manager.catalog.captures()})
+        return jsonify({"captures": file_manager.catalog.names()})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -196,6 +334,244 @@ def download_capture(input_path):
         return jsonify({"error": str(e)}), 500
 
 
+@api_bp.route("/timeline/<path:input_path>", methods=["GET"])
+def capture_timeline(input_path):
+    """
+    Returns the motion timeline of a captured clip.
+    ---
+    get:
+      summary: Motion timeline of a clip
+      description: >
+        Motion scores recorded while the clip was captured, for drawing an activity strip or
+        jumping to the peak without downloading the video. Scores are multiples of the detection
+        threshold (1.0 = threshold) and offsets are seconds from the start of the clip.
+        With format=binary, the raw sidecar file is returned instead.
+      tags: ["Incoming"]
+      parameters:
+        - in: path
+          name: input_path
+          required: true
+          schema:
+            type: string
+          description: Filename of the clip.
+        - in: query
+          name: format
+          schema:
+            type: string
+            enum: [json, binary]
+            default: json
+          description: Response format.
+      responses:
+        200:
+          description: Timeline of the clip.
+          content:
+            application/json:
+              schema:
+                type: object
+                properties:
+                  start:
+                    type: number
+                  threshold:
+                    type: number
+                  duration:
+                    type: number
+                  peak:
+                    type: object
+                    properties:
+                      offset:
+                        type: number
+                      score:
+                        type: number
+                  offsets:
+                    type: array
+                    items:
+                      type: number
+                  scores:
+                    type: array
+                    items:
+                      type: number
+            application/octet-stream: {}
+        404:
+          description: The clip has no timeline.
+        500:
+          description: Error reading the timeline.
+    """
+    file_manager = current_app.config["file_manager"]
+    output_dir = file_manager.output_dir.resolve()
+
+    try:
+        resolved_path = sidecar_path((output_dir / input_path).resolve())
+        if not resolved_path.is_relative_to(output_dir):
+            raise ValueError("Invalid path: Outside allowed directory")
+        if not resolved_path.is_file():
+            return jsonify({"error": "No timeline for this capture."}), 404
+
+        if request.args.get("format") == "binary":
+            return send_from_directory(output_dir, str(resolved_path.relative_to(output_dir)))
+        timeline = MotionTimeline.load(resolved_path)
+        return jsonify({"filename": os.path.basename(input_path), **timeline.to_dict()})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@api_bp.route("/preview/<path:input_path>", methods=["GET"])
+def capture_preview(input_path):
+    """
+    Returns the poster or the animated preview of a captured clip.
+    ---
+    get:
+      summary: Preview image of a clip
+      description: >
+        Images sampled from the camera while the clip was recorded, so galleries and
+        notifications never have to decode video. The poster is a JPEG of the moment with
+        the most motion; the animation is a short WebP or GIF spanning the whole clip.
+        Recently requested images are served from memory.
+      tags: ["Incoming"]
+      parameters:
+        - in: path
+          name: input_path
+          required: true
+          schema:
+            type: string
+          description: Filename of the clip.
+        - in: query
+          name: kind
+          schema:
+            type: string
+            enum: [poster, animation]
+            default: poster
+          description: Which preview to return.
+      responses:
+        200:
+          description: The preview image.
+          content:
+            image/jpeg: {}
+            image/webp: {}
+            image/gif: {}
+        304:
+          description: The cached copy is current.
+        404:
+          description: The clip has no preview of this kind.
+        500:
+          description: Error reading the preview.
+    """
+    file_manager = current_app.config["file_manager"]
+    preview_cache = current_app.config["preview_cache"]
+    output_dir = file_manager.output_dir.resolve()
+
+    try:
+        clip_path = (output_dir / input_path).resolve()
+        if not clip_path.is_relative_to(output_dir):
+            raise ValueError("Invalid path: Outside allowed directory")
+        if request.args.get("kind", "poster") == "animation":
+            candidates = [clip_path.with_suffix(suffix) for suffix in ANIMATION_SUFFIXES.values()]
+        else:
+            candidates = [poster_path(clip_path)]
+        for path in candidates:
+            try:
+                data, mtime = preview_cache.get(path)
+            except FileNotFoundError:
+                continue
+            response = Response(data, mimetype=CONTENT_TYPES[path.suffix])
+            response.set_etag(f"{mtime:.6f}-{len(data)}")
+            response.cache_control.max_age = 3600
+            return response.make_conditional(request)
+        return jsonify({"error": "No preview for this capture."}), 404
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@api_bp.route("/jobs", methods=["GET"])
+def list_jobs():
+    """
+    Lists recording conversion jobs.
+    ---
+    get:
+      summary: List conversion jobs
+      description: Returns queued, running and recently finished jobs that convert recordings into their output format.
+      tags: ["Incoming"]
+      responses:
+        200:
+          description: List of jobs, oldest first.
+          content:
+            application/json:
+              schema:
+                type: object
+                properties:
+                  pending:
+                    type: integer
+                  jobs:
+                    type: array
+                    items:
+                      type: object
+                      properties:
+                        id:
+                          type: integer
+                        state:
+                          type: string
+                          enum: [queued, running, done, failed]
+                        source:
+                          type: string
+                        filename:
+                          type: string
+                        error:
+                          type: string
+                        frames:
+                          type: integer
+                        duration:
+                          type: number
+                        dropped_frames:
+                          type: integer
+                          description: Frames the camera dropped while recording, from the gaps in the frame timestamps.
+                        write_amplification:
+                          type: number
+                          description: Bytes written to the capture storage for this clip divided by its size. 1.0 when the clip was staged in RAM.
+                        created:
+                          type: number
+                        started:
+                          type: number
+                        finished:
+                          type: number
+    """
+    transcode_queue = current_app.config["transcode_queue"]
+    return jsonify({
+        "pending": transcode_queue.pending,
+        "jobs": [job.to_dict() for job in transcode_queue.jobs()],
+    })
+
+
+@api_bp.route("/jobs/<int:job_id>", methods=["GET"])
+def get_job(job_id):
+    """
+    Returns a recording conversion job.
+    ---
+    get:
+      summary: Get a conversion job
+      description: Returns the state of a queued, running or recently finished conversion job.
+      tags: ["Incoming"]
+      parameters:
+        - in: path
+          name: job_id
+          required: true
+          schema:
+            type: integer
+          description: Job ID.
+      responses:
+        200:
+          description: The job.
+          content:
+            application/json:
+              schema:
+                type: object
+        404:
+          description: Unknown job.
+    """
+    job = current_app.config["transcode_queue"].get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found."}), 404
+    return jsonify(job.to_dict())
+
+
 @api_bp.route('/snapshot', methods=['POST'])
 def take_snapshot():
     """
@@ -280,3 +656,80 @@ def record():
             return jsonify({"error": "Recording failed or another recording is already in progress"}), 500
     except queue.Empty:
         return jsonify({"error": "Recording timed out"}), 500
+
+
+@api_bp.route("/live/stream.m3u8", methods=["GET"])
+def live_playlist():
+    """
+    Returns the HLS playlist of the live view.
+    ---
+    get:
+      summary: Live view playlist
+      description: Starts the live stream if needed and returns the HLS media playlist of fragmented MP4 segments.
+      tags: ["Incoming"]
+      responses:
+        200:
+          description: HLS media playlist.
+          content:
+            application/vnd.apple.mpegurl:
+              schema:
+                type: string
+        503:
+          description: The stream is starting and no segment is ready yet.
+    """
+    live_segmenter = current_app.config["live_segmenter"]
+    playlist = live_segmenter.playlist()
+    if playlist is None:
+        return jsonify({"error": "Live stream is starting"}), 503, {"Retry-After": "1"}
+    return Response(playlist, mimetype="application/vnd.apple.mpegurl", headers={"Cache-Control": "no-cache"})
+
+
+@api_bp.route("/live/init.mp4", methods=["GET"])
+def live_init():
+    """
+    Returns the initialization segment of the live view.
+    ---
+    get:
+      summary: Live view initialization segment
+      tags: ["Incoming"]
+      responses:
+        200:
+          description: fMP4 initialization segment.
+          content:
+            video/mp4: {}
+        404:
+          description: The stream has not started.
+    """
+    data = current_app.config["live_segmenter"].init()
+    if data is None:
+        return jsonify({"error": "Live stream not available"}), 404
+    return Response(data, mimetype="video/mp4")
+
+
+@api_bp.route("/live/segment_<int:sequence>.m4s", methods=["GET"])
+def live_segment(sequence):
+    """
+    Returns one media segment of the live view.
+    ---
+    get:
+      summary: Live view media segment
+      tags: ["Incoming"]
+      parameters:
+        - in: path
+          name: sequence
+          required: true
+          schema:
+            type: integer
+          description: Media sequence number from the playlist.
+      responses:
+        200:
+          description: fMP4 media segment.
+          content:
+            video/iso.segment: {}
+        404:
+          description: Segment is no longer in the window.
+    """
+    data = current_app.config["live_segmenter"].segment(sequence)
+    if data is None:
+        return jsonify({"error": "Segment not available"}), 404
+    return Response(data, mimetype="video/iso.segment", headers={"Cache-Control": "max-age=60"})
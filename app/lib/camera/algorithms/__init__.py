@@ -1,13 +1,38 @@
 from .base_algorithm import BaseAlgorithm
 from .frame_diff_algorithm import FrameDiffAlgorithm
 from .background_subtraction_algorithm import BackgroundSubtractionAlgorithm
+from .running_average_algorithm import RunningAverageAlgorithm
+from .cascade_algorithm import CascadeAlgorithm
+from .detection_mask import DetectionMask
 
+# Names accepted by get_motion_algorithm ("cascade" is an alias of "cascade_background",
+# the only inner algorithm costly enough for the block-mean pre-check to pay off).
+MOTION_ALGORITHMS = (
+    "frame_diff",
+    "background",
+    "running_average",
+    "cascade_frame_diff",
+    "cascade_background",
+    "cascade_running_average",
+)
 
-def get_motion_algorithm(name, threshold, blur_strength) -> BaseAlgorithm:
+
+def get_motion_algorithm(name, threshold, blur_strength, mask=None) -> BaseAlgorithm:
     name = name.lower()
     if name == "frame_diff":
-        return FrameDiffAlgorithm(threshold, blur_strength)
+        return FrameDiffAlgorithm(threshold, blur_strength, mask=mask)
     elif name == "background":
-        return BackgroundSubtractionAlgorithm(threshold, blur_strength)
+        return BackgroundSubtractionAlgorithm(threshold, blur_strength, mask=mask)
+    elif name == "running_average":
+        return RunningAverageAlgorithm(threshold, blur_strength, mask=mask)
+    elif name == "cascade_frame_diff":
+        inner = FrameDiffAlgorithm(threshold, blur_strength, mask=mask)
+        return CascadeAlgorithm(threshold, inner, mask=mask)
+    elif name in ("cascade", "cascade_background"):
+        inner = BackgroundSubtractionAlgorithm(threshold, blur_strength, mask=mask)
+        return CascadeAlgorithm(threshold, inner, mask=mask)
+    elif name == "cascade_running_average":
+        inner = RunningAverageAlgorithm(threshold, blur_strength, mask=mask)
+        return CascadeAlgorithm(threshold, inner, mask=mask)
     else:
         raise ValueError(f"Unknown motion detection algorithm: {name}")
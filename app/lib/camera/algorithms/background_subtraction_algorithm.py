@@ -12,8 +12,9 @@ class BackgroundSubtractionAlgorithm(BaseAlgorithm):
         pixel_ratio_max: float = 0.10,
         history: int = 100,
         var_threshold: float = 25,
+        mask=None,
     ):
-        super().__init__(normalized_threshold)
+        super().__init__(normalized_threshold, mask)
         self.logger = logging.getLogger(__name__)
         self.logger.info("Initializing BackgroundSubtractionAlgorithm")
         self.blur_strength = blur_strength
@@ -35,6 +36,10 @@ class BackgroundSubtractionAlgorithm(BaseAlgorithm):
         self.frame_count = 0
         self.log_interval = 1800 # log every minute at 30fps
 
+    @property
+    def score_threshold(self):
+        return self.pixel_ratio_threshold
+
     def apply_blur(self, frame: np.ndarray) -> np.ndarray:
         if self.blur_strength <= 0:
             return frame
@@ -58,11 +63,17 @@ class BackgroundSubtractionAlgorithm(BaseAlgorithm):
         if not hasattr(self, "prev_mean"):
             self.prev_mean = current_mean
 
-        blurred = self.apply_blur(frame)
+        cropped = self.crop(frame)
+        blurred = self.apply_blur(cropped)
         fg_mask = self.bg_subtractor.apply(blurred)
+        if self.region is not None:
+            fg_mask = cv2.bitwise_and(fg_mask, self.region)
+            total_pixels = self.mask.pixel_count
+        else:
+            total_pixels = cropped.shape[0] * cropped.shape[1]
         motion_pixels = cv2.countNonZero(fg_mask)
-        total_pixels = frame.shape[0] * frame.shape[1]
         ratio = motion_pixels / total_pixels if total_pixels else 0
+        self.last_score = ratio
         self.logger.debug(f"Motion pixel ratio: {ratio:.4f}, Threshold: {self.pixel_ratio_threshold:.4f}")
 
         detected = ratio > self.pixel_ratio_threshold
@@ -2,14 +2,39 @@ import numpy as np
 
 
 class BaseAlgorithm:
-    def __init__(self, normalized_threshold: float):
+    def __init__(self, normalized_threshold: float, mask=None):
         """
         Accepts a normalized threshold from 1 to 10.
         Each subclass must map this to a raw value.
+
+        An optional DetectionMask restricts detection to part of the frame.
         """
         if not (1 <= normalized_threshold <= 10):
             raise ValueError("motion_threshold must be between 1 and 10")
         self.normalized_threshold = normalized_threshold
+        self.mask = mask
+        # Raw score of the most recent comparison (MSE, pixel ratio...), for diagnostics.
+        self.last_score = None
+
+    def crop(self, frame: np.ndarray) -> np.ndarray:
+        """Crops a frame to the mask's bounding box (a view, no copy)."""
+        if self.mask is None:
+            return frame
+        return self.mask.crop(frame)
+
+    @property
+    def region(self):
+        """uint8 mask of the evaluated pixels within the cropped frame, or None for all of them."""
+        return self.mask.region if self.mask is not None else None
+
+    @property
+    def score_threshold(self):
+        """Value of last_score above which motion is detected, or None if unknown."""
+        return None
 
     def detect(self, frame) -> bool:
         raise NotImplementedError()
+
+    def close(self):
+        """Releases resources held outside the object (processes, shared memory)."""
+        pass
@@ -0,0 +1,132 @@
+import cv2
+import numpy as np
+import logging
+from .base_algorithm import BaseAlgorithm
+
+
+class CascadeAlgorithm(BaseAlgorithm):
+    """Runs a cheap block-mean test first and escalates to a full algorithm.
+
+    Every frame is reduced to block means (4x4 pixel blocks by default, 80x60
+    for a 320x240 detection frame) and compared with the previous reduction.
+    Only when some block changed by more than ``block_delta`` gray levels is
+    the ``inner`` algorithm run on the full frame, and it keeps running for
+    ``hold_frames`` frames after the last coarse change. The inner algorithm
+    is fed a frame every ``refresh_interval`` frames while the scene is
+    quiet, so its reference frame or background model does not go stale and
+    slow changes below ``block_delta`` are still detected.
+    """
+
+    def __init__(
+        self,
+        normalized_threshold: float,
+        inner: BaseAlgorithm,
+        block: int = 4,
+        delta_min: float = 3.0,
+        delta_max: float = 12.0,
+        hold_frames: int = 15,
+        refresh_interval: int = 30,
+        mask=None,
+    ):
+        super().__init__(normalized_threshold, mask)
+        self.logger = logging.getLogger(__name__)
+        self.logger.info(f"Initializing CascadeAlgorithm with {type(inner).__name__}")
+        self.inner = inner
+        self.block = max(1, int(block))
+        self.hold_frames = hold_frames
+        self.refresh_interval = refresh_interval
+        self.block_delta = np.interp(normalized_threshold, [1, 10], [delta_min, delta_max])
+        self.coarse_buffers: list[np.ndarray] | None = None
+        self.coarse_index = 0
+        self.prev_coarse: np.ndarray | None = None
+        self.coarse_diff: np.ndarray | None = None
+        self.coarse_region: np.ndarray | None = None
+        self.prev_frame: np.ndarray | None = None
+        self.escalated_frames = 0
+        self.frames_since_inner = 0
+        self.frame_count = 0
+        self.inner_count = 0
+        self.logger.debug(
+            f"Initialized with normalized_threshold={normalized_threshold}, "
+            f"block={self.block}, block_delta={self.block_delta:.2f}"
+        )
+
+    @property
+    def score_threshold(self):
+        return self.inner.score_threshold
+
+    def _coarse(self, frame: np.ndarray) -> np.ndarray:
+        """Reduces the cropped frame to block means.
+
+        The reduction goes into one of two preallocated buffers that swap
+        roles every call, like FrameDiffAlgorithm's blurred frames, so the
+        quiet-scene path allocates nothing per frame.
+        """
+        cropped = self.crop(frame)
+        height, width = cropped.shape
+        size = (max(1, width // self.block), max(1, height // self.block))
+        shape = (size[1], size[0])
+        if self.coarse_buffers is None or self.coarse_buffers[0].shape != shape:
+            self.coarse_buffers = [np.empty(shape, dtype=np.uint8), np.empty(shape, dtype=np.uint8)]
+            self.coarse_diff = np.empty(shape, dtype=np.uint8)
+            self.prev_coarse = None
+        coarse = cv2.resize(cropped, size, dst=self.coarse_buffers[self.coarse_index],
+                            interpolation=cv2.INTER_AREA)
+        self.coarse_index ^= 1
+        region = self.region
+        if region is None:
+            self.coarse_region = None
+        elif self.coarse_region is None or self.coarse_region.shape != coarse.shape:
+            self.coarse_region = cv2.resize(region, size, interpolation=cv2.INTER_AREA)
+        return coarse
+
+    def _coarse_changed(self, coarse: np.ndarray) -> bool:
+        if self.prev_coarse is None:
+            return True
+        diff = cv2.absdiff(coarse, self.prev_coarse, dst=self.coarse_diff)
+        if self.coarse_region is not None:
+            cv2.bitwise_and(diff, self.coarse_region, dst=diff)
+        return cv2.minMaxLoc(diff)[1] > self.block_delta
+
+    def detect(self, frame: np.ndarray) -> bool:
+        if frame is None or frame.ndim != 2:
+            self.logger.warning(
+                f"Invalid frame: {type(frame)}, shape={getattr(frame, 'shape', 'N/A')}"
+            )
+            return False
+
+        self.frame_count += 1
+        coarse = self._coarse(frame)
+        changed = self._coarse_changed(coarse)
+        self.prev_coarse = coarse
+
+        if changed:
+            if self.escalated_frames == 0 and self.prev_frame is not None:
+                # Give the inner algorithm the frame before the change as its reference.
+                self.inner.detect(self.prev_frame)
+            self.escalated_frames = self.hold_frames
+
+        detected = False
+        if self.escalated_frames > 0:
+            self.escalated_frames -= 1
+            detected = self.inner.detect(frame)
+            self.last_score = self.inner.last_score
+            self.frames_since_inner = 0
+            self.inner_count += 1
+        else:
+            self.last_score = 0.0
+            self.frames_since_inner += 1
+            if self.frames_since_inner >= self.refresh_interval:
+                # A slow change can stay under the block delta; escalate if
+                # the inner algorithm sees it on a refresh.
+                detected = self.inner.detect(frame)
+                self.last_score = self.inner.last_score
+                self.frames_since_inner = 0
+                self.inner_count += 1
+                if detected:
+                    self.escalated_frames = self.hold_frames
+
+        self.prev_frame = frame
+        if self.frame_count % 1800 == 0:
+            self.logger.debug(f"Full detection ran on {self.inner_count / self.frame_count:.1%} of frames.")
+        return detected
@@ -0,0 +1,74 @@
+import logging
+
+import cv2
+import numpy as np
+
+
+class DetectionMask:
+    """Region of the detection frame that motion is evaluated on.
+
+    Polygons are lists of [x, y] points given as fractions of the frame
+    (0.0 to 1.0), so they stay valid when ``detect_size`` changes. Pixels
+    inside any ``include`` polygon count, minus those inside any ``exclude``
+    polygon. Without include polygons the whole frame is included.
+
+    The mask is rasterized once per frame size. Algorithms crop frames to the
+    mask's bounding box before any processing and evaluate only the masked
+    pixels inside it.
+    """
+
+    def __init__(self, size, include=None, exclude=None):
+        """
+        Args:
+            size (tuple): (width, height) of the detection frames.
+            include (list, optional): Polygons to watch.
+            exclude (list, optional): Polygons to ignore.
+        """
+        self.logger = logging.getLogger(__name__)
+        self.include = [self._validate(polygon) for polygon in include or []]
+        self.exclude = [self._validate(polygon) for polygon in exclude or []]
+        self.shape = None
+        self._rasterize((size[1], size[0]))
+
+    @staticmethod
+    def _validate(polygon):
+        points = np.asarray(polygon, dtype=np.float64)
+        if points.ndim != 2 or points.shape[1] != 2 or len(points) < 3:
+            raise ValueError(f"Mask polygon needs at least 3 [x, y] points: {polygon}")
+        if points.min() < 0 or points.max() > 1:
+            raise ValueError(f"Mask polygon points must be fractions between 0 and 1: {polygon}")
+        return points
+
+    def _scale(self, polygon, shape):
+        height, width = shape
+        return np.round(polygon * (width - 1, height - 1)).astype(np.int32)
+
+    def _rasterize(self, shape):
+        if self.include:
+            mask = np.zeros(shape, dtype=np.uint8)
+            cv2.fillPoly(mask, [self._scale(p, shape) for p in self.include], 255)
+        else:
+            mask = np.full(shape, 255, dtype=np.uint8)
+        if self.exclude:
+            cv2.fillPoly(mask, [self._scale(p, shape) for p in self.exclude], 0)
+
+        self.pixel_count = cv2.countNonZero(mask)
+        if self.pixel_count == 0:
+            raise ValueError("Detection mask excludes the whole frame.")
+        x, y, w, h = cv2.boundingRect(mask)
+        self.bounds = (slice(y, y + h), slice(x, x + w))
+        region = mask[self.bounds]
+        # None when every pixel of the bounding box counts, so callers can skip masking.
+        self.region = None if self.pixel_count == w * h else np.ascontiguousarray(region)
+        self.shape = shape
+        self.logger.info(
+            f"Detection mask: {w}x{h} region at ({x}, {y}), "
+            f"{self.pixel_count / (shape[0] * shape[1]):.0%} of the frame evaluated."
+        )
+
+    def crop(self, frame):
+        """Returns a view of ``frame`` cropped to the mask's bounding box."""
+        if frame.shape[:2] != self.shape:
+            self.logger.warning(f"Frame size {frame.shape[:2]} differs from mask size {self.shape}. Rasterizing again.")
+            self._rasterize(frame.shape[:2])
+        return frame[self.bounds]
@@ -10,13 +10,16 @@ class FrameDiffAlgorithm(BaseAlgorithm):
         normalized_threshold: float,
         blur_strength: int = 0,
         mse_min: float = 0.2,
-        mse_max: float = 10.0
+        mse_max: float = 10.0,
+        mask=None,
     ):
-        super().__init__(normalized_threshold)
+        super().__init__(normalized_threshold, mask)
         self.logger = logging.getLogger(__name__)
         self.logger.info("Initializing FrameDiffAlgorithm")
-        self.prev_frame: np.ndarray | None = None
         self.blur_strength = blur_strength
+        self.buffers: list[np.ndarray] | None = None
+        self.buffer_index = 0
+        self.prev_blurred: np.ndarray | None = None
 
         self.raw_threshold = np.interp(
             normalized_threshold,
@@ -30,33 +33,56 @@ class FrameDiffAlgorithm(BaseAlgorithm):
         )
 
 
-    def apply_blur(self, frame: np.ndarray) -> np.ndarray:
+    @property
+    def score_threshold(self):
+        return self.raw_threshold
+
+    def apply_blur(self, frame: np.ndarray, dst: np.ndarray | None = None) -> np.ndarray:
         if self.blur_strength <= 0:
-            return frame
+            if dst is None:
+                return frame
+            np.copyto(dst, frame)
+            return dst
 
         k = int(round(self.blur_strength))
         ksize = max(3, k | 1)
-        return cv2.GaussianBlur(frame, (ksize, ksize), 0)
+        return cv2.GaussianBlur(frame, (ksize, ksize), 0, dst=dst)
 
+    def _buffers_for(self, shape):
+        if self.buffers is None or self.buffers[0].shape != shape:
+            self.buffers = [np.empty(shape, dtype=np.uint8), np.empty(shape, dtype=np.uint8)]
+            self.prev_blurred = None
+        return self.buffers
 
     def detect(self, frame: np.ndarray) -> bool:
+        """Compares the blurred frame with the previous one.
+
+        The previous frame is kept blurred in one of two preallocated buffers
+        that swap roles every call, and the squared difference is summed by
+        cv2.norm in double precision, so nothing is allocated per frame.
+        """
         if frame is None or frame.ndim != 2:
             self.logger.warning(
                 f"Invalid frame: {type(frame)}, shape={getattr(frame, 'shape', 'N/A')}"
             )
             return False
 
-        blurred = self.apply_blur(frame)
+        frame = self.crop(frame)
+        buffers = self._buffers_for(frame.shape)
+        blurred = self.apply_blur(frame, dst=buffers[self.buffer_index])
         detected = False
 
-        if self.prev_frame is not None:
-            prev_blurred = self.apply_blur(self.prev_frame)
-            mse = np.mean((blurred - prev_blurred) ** 2)
-            self.logger.debug(f"MSE: {mse:.4f}, Threshold: {self.raw_threshold:.4f}")
+        if self.prev_blurred is not None:
+            region = self.region
+            count = self.mask.pixel_count if region is not None else blurred.size
+            mse = cv2.norm(blurred, self.prev_blurred, cv2.NORM_L2SQR, region) / count
+            self.last_score = mse
             detected = mse > self.raw_threshold
-            self.logger.debug(f"Motion detected: {detected}")
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug(f"MSE: {mse:.4f}, Threshold: {self.raw_threshold:.4f}, detected: {detected}")
         else:
             self.logger.debug("No previous frame available; skipping comparison.")
 
-        self.prev_frame = frame.copy()
+        self.prev_blurred = blurred
+        self.buffer_index ^= 1
         return detected
@@ -0,0 +1,99 @@
+import cv2
+import numpy as np
+import logging
+from .base_algorithm import BaseAlgorithm
+
+
+class RunningAverageAlgorithm(BaseAlgorithm):
+    """Compares frames with an exponentially weighted running-average background.
+
+    The background is accumulated in place (cv2.accumulateWeighted) into a
+    preallocated float32 buffer. Pixels that differ from it by more than
+    ``pixel_delta`` gray levels count as foreground, and motion is reported
+    when the foreground ratio exceeds the threshold. Unlike frame diff, slow
+    movers stand out against the background; unlike MOG2, the cost per
+    frame is a handful of fixed-size passes with no allocations.
+    """
+
+    def __init__(
+        self,
+        normalized_threshold: float,
+        blur_strength: int = 0,
+        alpha: float = 0.05,
+        pixel_delta: int = 25,
+        pixel_ratio_min: float = 0.0001,
+        pixel_ratio_max: float = 0.10,
+        mask=None,
+    ):
+        super().__init__(normalized_threshold, mask)
+        self.logger = logging.getLogger(__name__)
+        self.logger.info("Initializing RunningAverageAlgorithm")
+        self.blur_strength = blur_strength
+        self.alpha = alpha
+        self.pixel_delta = pixel_delta
+        self.pixel_ratio_threshold = np.interp(
+            normalized_threshold,
+            [1, 10],
+            [pixel_ratio_min, pixel_ratio_max]
+        )
+        self.background: np.ndarray | None = None
+        self.background_u8: np.ndarray | None = None
+        self.blurred: np.ndarray | None = None
+        self.foreground: np.ndarray | None = None
+        self.logger.debug(
+            f"Initialized with normalized_threshold={normalized_threshold}, "
+            f"pixel_ratio_threshold={self.pixel_ratio_threshold:.4f}, alpha={self.alpha}, "
+            f"pixel_delta={self.pixel_delta}, blur_strength={self.blur_strength}"
+        )
+
+    @property
+    def score_threshold(self):
+        return self.pixel_ratio_threshold
+
+    def apply_blur(self, frame: np.ndarray, dst: np.ndarray) -> np.ndarray:
+        if self.blur_strength <= 0:
+            np.copyto(dst, frame)
+            return dst
+        k = int(round(self.blur_strength))
+        ksize = max(3, k | 1)
+        return cv2.GaussianBlur(frame, (ksize, ksize), 0, dst=dst)
+
+    def _allocate(self, shape):
+        self.background = np.empty(shape, dtype=np.float32)
+        self.background_u8 = np.empty(shape, dtype=np.uint8)
+        self.blurred = np.empty(shape, dtype=np.uint8)
+        self.foreground = np.empty(shape, dtype=np.uint8)
+
+    def detect(self, frame: np.ndarray) -> bool:
+        if frame is None or frame.ndim != 2:
+            self.logger.warning(
+                f"Invalid frame: {type(frame)}, shape={getattr(frame, 'shape', 'N/A')}"
+            )
+            return False
+
+        frame = self.crop(frame)
+        if self.background is None or self.background.shape != frame.shape:
+            self._allocate(frame.shape)
+            self.apply_blur(frame, dst=self.blurred)
+            self.background[...] = self.blurred
+            self.logger.debug("Background initialized.")
+            return False
+
+        blurred = self.apply_blur(frame, dst=self.blurred)
+        cv2.convertScaleAbs(self.background, dst=self.background_u8)
+        cv2.absdiff(blurred, self.background_u8, dst=self.foreground)
+        cv2.threshold(self.foreground, self.pixel_delta, 255, cv2.THRESH_BINARY, dst=self.foreground)
+        region = self.region
+        if region is not None:
+            cv2.bitwise_and(self.foreground, region, dst=self.foreground)
+            total_pixels = self.mask.pixel_count
+        else:
+            total_pixels = self.foreground.size
+        ratio = cv2.countNonZero(self.foreground) / total_pixels
+        cv2.accumulateWeighted(blurred, self.background, self.alpha)
+
+        self.last_score = ratio
+        detected = ratio > self.pixel_ratio_threshold
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(f"Foreground ratio: {ratio:.4f}, Threshold: {self.pixel_ratio_threshold:.4f}, detected: {detected}")
+        return detected
@@ -0,0 +1,15 @@
+from .base_backend import BaseCameraBackend
+
+
+def get_camera_backend(name, **kwargs) -> BaseCameraBackend:
+    # Backends are imported lazily so that picamera2/libcamera are only
+    # required when the picamera2 backend is actually used.
+    name = name.lower()
+    if name == "picamera2":
+        from .picamera2_backend import Picamera2Backend
+        return Picamera2Backend(**kwargs)
+    elif name == "replay":
+        from .replay_backend import ReplayBackend
+        return ReplayBackend(**kwargs)
+    else:
+        raise ValueError(f"Unknown camera backend: {name}")
@@ -0,0 +1,76 @@
+class BaseCameraBackend:
+    """Interface between CameraManager and a camera implementation.
+
+    A backend owns the capture device and the H.264 encoder. Every completed
+    request is reported through the frame callback as a function that converts
+    a stream ("main" or "lores") to a numpy array on demand: main frames are
+    RGB (h, w, 3) arrays and lores frames are grayscale (h, w) Y planes.
+    """
+
+    supports_mjpeg_encoder = False
+
+    def __init__(
+        self,
+        record_size=(1280, 720),
+        detect_size=(320, 240),
+        framerate=30,
+        encoder_bitrate=1000000,
+        orientation="normal",
+        tuning_file=None,
+        keyframe_interval=None,
+    ):
+        self.record_size = tuple(record_size)
+        self.detect_size = tuple(detect_size)
+        self.framerate = framerate
+        self.encoder_bitrate = encoder_bitrate
+        self.orientation = orientation
+        self.tuning_file = tuning_file
+        self.keyframe_interval = keyframe_interval or framerate
+        self.frame_callback = None
+
+    def set_frame_callback(self, callback):
+        """Registers ``callback(get_array)`` to be invoked for every completed request."""
+        self.frame_callback = callback
+
+    def configure(self):
+        """Opens and configures the device. Called on startup and after close()."""
+        raise NotImplementedError()
+
+    def start(self):
+        raise NotImplementedError()
+
+    def stop(self):
+        raise NotImplementedError()
+
+    def close(self):
+        raise NotImplementedError()
+
+    def set_controls(self, controls):
+        raise NotImplementedError()
+
+    def save_snapshot(self, path):
+        """Captures one full-resolution still and saves it as a JPEG at ``path``."""
+        raise NotImplementedError()
+
+    def start_encoder(self, output, pts=None):
+        """Starts writing the H.264 stream to the ``output`` file, with timestamps in ``pts``."""
+        raise NotImplementedError()
+
+    def stop_encoder(self):
+        raise NotImplementedError()
+
+    def start_packet_encoder(self, callback):
+        """Starts the H.264 encoder delivering ``callback(data, keyframe, timestamp_us)`` per access unit.
+
+        The stream repeats SPS/PPS before every keyframe, so it can be cut at
+        any keyframe. Only one of start_encoder/start_packet_encoder may be
+        active at a time; stop it with stop_encoder().
+        """
+        raise NotImplementedError()
+
+    def start_mjpeg_encoder(self, callback, quality=75):
+        """Starts a hardware MJPEG encoder on the main stream, calling ``callback(jpeg)`` per frame."""
+        raise NotImplementedError()
+
+    def stop_mjpeg_encoder(self):
+        raise NotImplementedError()
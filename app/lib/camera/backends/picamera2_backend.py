@@ -0,0 +1,187 @@
+import logging
+import numpy as np
+from libcamera import Transform
+from picamera2 import Picamera2
+from picamera2.encoders import H264Encoder, MJPEGEncoder, Quality
+from picamera2.outputs import Output
+
+from .base_backend import BaseCameraBackend
+
+
+class _CallbackOutput(Output):
+    """picamera2 output that hands every encoded frame to a callback."""
+
+    def __init__(self, callback):
+        super().__init__()
+        self.callback = callback
+
+    def outputframe(self, frame, keyframe=True, timestamp=None, *args, **kwargs):
+        self.callback(frame, keyframe, timestamp)
+
+
+class Picamera2Backend(BaseCameraBackend):
+    """Camera backend for the Raspberry Pi camera stack via picamera2."""
+
+    supports_mjpeg_encoder = True
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.logger = logging.getLogger(__name__)
+        self.picam2 = None
+        self.stream_configs = {}
+        self.encoder = H264Encoder(
+            bitrate=self.encoder_bitrate,
+            repeat=True,
+            iperiod=self.keyframe_interval,
+            framerate=self.framerate,
+            enable_sps_framerate=True,
+        )
+        self.mjpeg_encoder = None
+
+    def _load_tuning(self, tuning_file=None):
+        if tuning_file is None:
+            self.logger.debug("No tuning file provided. Using default settings.")
+            return None
+
+        if not tuning_file.endswith(".json"):
+            tuning_file += ".json"
+
+        try:
+            tuning = Picamera2.load_tuning_file(tuning_file)
+            self.logger.info(f"Loading tuning file '{tuning_file}'")
+        except FileNotFoundError:
+            self.logger.error(
+                f"Tuning file '{tuning_file}' not found. Using default settings."
+            )
+            tuning = None
+        return tuning
+
+    def configure(self):
+        """Initializes the Picamera2 instance."""
+        tuning = self._load_tuning(self.tuning_file)
+        self.picam2 = Picamera2(tuning=tuning)
+
+        transform = Transform()
+        if self.orientation == "flipped_horizontal":
+            transform = Transform(hflip=1, vflip=0)
+        elif self.orientation == "inverted":
+            transform = Transform(hflip=1, vflip=1)
+        elif self.orientation == "flipped_vertical":
+            transform = Transform(hflip=0, vflip=1)
+        elif self.orientation != "normal":
+            self.logger.warning(f"Invalid orientation state '{self.orientation}'. Using 'normal'.")
+
+        video_config = self.picam2.create_video_configuration(
+            main={"size": self.record_size, "format": "RGB888"},
+            lores={"size": self.detect_size, "format": "YUV420"},
+            transform=transform,
+            controls={
+                "FrameRate": self.framerate,
+                "AeEnable": True,      # Auto Exposure ON
+                "AwbEnable": True,     # Auto White Balance ON
+            },
+        )
+        self.logger.debug(f"Video config: {video_config}")
+        self.picam2.configure(video_config)
+        self.picam2.set_controls({
+            "FrameRate": self.framerate
+        })
+        self.logger.debug(f"Video config after apply: {self.picam2.camera_config}")
+        self.stream_configs = {
+            stream: self.picam2.stream_configuration(stream) for stream in ("main", "lores")
+        }
+        self.picam2.post_callback = self._on_request
+
+    def _on_request(self, request):
+        if self.frame_callback is not None:
+            self.frame_callback(lambda stream: self._buffer_to_array(request.make_buffer(stream), stream))
+
+    def _buffer_to_array(self, buf, stream):
+        """Converts a raw stream buffer to an RGB image or a grayscale Y plane."""
+        self.logger.debug(f"Buffer size: {len(buf)}")
+        try:
+            config = self.stream_configs[stream]
+            w = config["size"][0]  # Width
+            h = config["size"][1]  # Height
+            self.logger.debug(f"Stream {stream} configuration: size={w}x{h}, format={config['format']}")
+
+            if config["format"] == "RGB888":
+                expected_size = w * h * 3  # 3 bytes per pixel for RGB
+                if len(buf) != expected_size:
+                    self.logger.warning(f"Buffer size {len(buf)} does not match expected {expected_size} for RGB888")
+                # Reshape to (height, width, 3) and return as RGB
+                image = np.frombuffer(buf, dtype=np.uint8).reshape(h, w, 3)
+                self.logger.debug(f"RGB image shape: {image.shape}")
+                return image
+            else:  # Assume YUV420 for lores or other formats, return grayscale Y plane
+                yuv_height = int(h * 1.5)  # Full YUV420 height
+                if len(buf) % yuv_height != 0:
+                    self.logger.error(f"Buffer size {len(buf)} not divisible by YUV height {yuv_height}")
+                    return None
+                stride = len(buf) // yuv_height
+                self.logger.debug(f"Computed stride: {stride}")
+                image = np.frombuffer(buf, dtype=np.uint8).reshape(yuv_height, stride)
+                y_plane = image[:h, :w]  # Extract Y plane as grayscale
+                self.logger.debug(f"Y plane shape: {y_plane.shape}")
+                return y_plane
+        except Exception as e:
+            self.logger.error(f"Failed to process buffer for {stream} stream: {e}", exc_info=True)
+            return None
+
+    def start(self):
+        self.picam2.start()
+
+    def stop(self):
+        self.picam2.stop()
+
+    def close(self):
+        self.picam2.close()
+
+    def set_controls(self, controls):
+        self.picam2.set_controls(controls)
+
+    def save_snapshot(self, path):
+        request = self.picam2.capture_request()
+        try:
+            request.save("main", path)
+        finally:
+            request.release()
+        return path
+
+    def start_encoder(self, output, pts=None):
+        self.picam2.start_encoder(
+            encoder=self.encoder,
+            output=str(output),
+            pts=str(pts) if pts else None,
+        )
+
+    def stop_encoder(self):
+        self.picam2.stop_encoder(encoders=[self.encoder])
+
+    def start_packet_encoder(self, callback):
+        self.picam2.start_encoder(
+            encoder=self.encoder,
+            output=_CallbackOutput(lambda frame, keyframe, timestamp: callback(bytes(frame), keyframe, timestamp)),
+        )
+
+    def start_mjpeg_encoder(self, callback, quality=75):
+        if quality >= 90:
+            level = Quality.VERY_HIGH
+        elif quality >= 75:
+            level = Quality.HIGH
+        elif quality >= 50:
+            level = Quality.MEDIUM
+        else:
+            level = Quality.LOW
+        self.mjpeg_encoder = MJPEGEncoder()
+        self.picam2.start_encoder(
+            encoder=self.mjpeg_encoder,
+            output=_CallbackOutput(lambda frame, keyframe, timestamp: callback(frame)),
+            quality=level,
+            name="main",
+        )
+
+    def stop_mjpeg_encoder(self):
+        if self.mjpeg_encoder is not None:
+            self.picam2.stop_encoder(encoders=[self.mjpeg_encoder])
+            self.mjpeg_encoder = None
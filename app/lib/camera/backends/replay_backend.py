@@ -0,0 +1,324 @@
+import logging
+import shutil
+import subprocess
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from app.lib.transcode.h264 import iter_access_units, iter_nal_units
+from ..synthetic import SyntheticScene
+from .base_backend import BaseCameraBackend
+
+
+class ReplayBackend(BaseCameraBackend):
+    """Camera backend that replays recorded files or generated patterns.
+
+    Frames come from ``source`` (a video file readable by OpenCV or a directory
+    of images) or, when no source is given, from a generated ``pattern`` (see
+    SyntheticScene). The H.264 stream is replayed from the Annex-B file
+    ``h264_source``; without one, the replayed frames are encoded by an ffmpeg
+    subprocess. ``rate`` scales the replay speed: 1.0 is real time, 4.0 is
+    four times faster and 0 runs as fast as consumers allow.
+    """
+
+    def __init__(self, source=None, h264_source=None, pattern="moving_blob", rate=1.0, loop=True, seed=0, **kwargs):
+        super().__init__(**kwargs)
+        self.logger = logging.getLogger(__name__)
+        self.source = Path(source) if source else None
+        self.h264_source = Path(h264_source) if h264_source else None
+        self.pattern = pattern
+        self.rate = float(rate)
+        self.loop = loop
+        self.seed = seed
+        self.controls = {}
+        self.frame_index = 0
+        self.latest_main = None
+        self._reader = None
+        self._scene = None
+        self._thread = None
+        self._running = threading.Event()
+        self._encoder = None
+        self._encoder_lock = threading.Lock()
+
+    def configure(self):
+        self.frame_index = 0
+        if self.source is None:
+            self._scene = SyntheticScene(self.detect_size, self.pattern, seed=self.seed)
+            self.logger.info(f"Replaying generated '{self.pattern}' pattern at rate {self.rate}.")
+        elif self.source.is_dir():
+            self._reader = _ImageDirectoryReader(self.source, self.loop)
+            self.logger.info(f"Replaying images from {self.source} at rate {self.rate}.")
+        else:
+            self._reader = _VideoFileReader(self.source, self.loop)
+            self.logger.info(f"Replaying video {self.source} at rate {self.rate}.")
+
+    def start(self):
+        if self._running.is_set():
+            return
+        self._running.set()
+        self._thread = threading.Thread(target=self._run, name="replay-backend", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running.clear()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def close(self):
+        self.stop()
+        self.stop_encoder()
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
+    def set_controls(self, controls):
+        self.controls.update(controls)
+        self.logger.debug(f"Replay controls: {self.controls}")
+
+    def _run(self):
+        interval = 1.0 / (self.framerate * self.rate) if self.rate > 0 else 0
+        next_time = time.monotonic()
+        while self._running.is_set():
+            try:
+                frame = self._next_frame()
+                if frame is None:
+                    self.logger.info("Replay source exhausted.")
+                    break
+                lores, main = frame
+                self.latest_main = main
+                timestamp_us = int(self.frame_index * 1_000_000 / self.framerate)
+                with self._encoder_lock:
+                    if self._encoder is not None:
+                        self._encoder.feed(main, timestamp_us)
+                if self.frame_callback is not None:
+                    self.frame_callback(lambda stream: lores() if stream == "lores" else main())
+                self.frame_index += 1
+            except Exception as e:
+                self.logger.error(f"Error in replay loop: {e}", exc_info=True)
+
+            if interval:
+                next_time += interval
+                delay = next_time - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_time = time.monotonic()
+        self._running.clear()
+
+    def _next_frame(self):
+        """Returns (lores, main) callables for the next frame, or None at end of input."""
+        index = self.frame_index
+        if self._scene is not None:
+            cache = {}
+
+            def main():
+                if "main" not in cache:
+                    cache["main"] = self._scene.rgb(index, self.record_size)
+                return cache["main"]
+
+            return (lambda: self._scene.gray(index)), main
+
+        bgr = self._reader.read()
+        if bgr is None:
+            return None
+        rgb = cv2.cvtColor(cv2.resize(bgr, self.record_size), cv2.COLOR_BGR2RGB)
+        gray = cv2.cvtColor(cv2.resize(bgr, self.detect_size), cv2.COLOR_BGR2GRAY)
+        return (lambda: gray), (lambda: rgb)
+
+    def save_snapshot(self, path):
+        main = self.latest_main
+        if main is None:
+            raise RuntimeError("No replay frame available for snapshot.")
+        Image.fromarray(main()).save(path, format="JPEG")
+        return path
+
+    def start_encoder(self, output, pts=None):
+        self._start_encoder(_AnnexBWriter(output, pts))
+
+    def start_packet_encoder(self, callback):
+        self._start_encoder(_CallbackWriter(callback))
+
+    def _start_encoder(self, writer):
+        with self._encoder_lock:
+            if self._encoder is not None:
+                raise RuntimeError("Encoder already running.")
+            if self.h264_source is not None:
+                self._encoder = _H264FileReplayEncoder(self.h264_source, writer)
+            else:
+                self._encoder = _FFmpegPipeEncoder(
+                    self.record_size, self.framerate, self.keyframe_interval, self.encoder_bitrate, writer
+                )
+
+    def stop_encoder(self):
+        with self._encoder_lock:
+            encoder, self._encoder = self._encoder, None
+        if encoder is not None:
+            encoder.close()
+
+
+class _VideoFileReader:
+    def __init__(self, path, loop):
+        self.path = path
+        self.loop = loop
+        self.capture = cv2.VideoCapture(str(path))
+        if not self.capture.isOpened():
+            raise RuntimeError(f"Unable to open replay source: {path}")
+
+    def read(self):
+        ok, frame = self.capture.read()
+        if not ok and self.loop:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = self.capture.read()
+        return frame if ok else None
+
+    def close(self):
+        self.capture.release()
+
+
+class _ImageDirectoryReader:
+    EXTENSIONS = {".png", ".jpg", ".jpeg", ".bmp"}
+
+    def __init__(self, path, loop):
+        self.files = sorted(p for p in path.iterdir() if p.suffix.lower() in self.EXTENSIONS)
+        if not self.files:
+            raise RuntimeError(f"No images found in replay source: {path}")
+        self.loop = loop
+        self.index = 0
+
+    def read(self):
+        if self.index >= len(self.files):
+            if not self.loop:
+                return None
+            self.index = 0
+        frame = cv2.imread(str(self.files[self.index]))
+        self.index += 1
+        return frame
+
+    def close(self):
+        pass
+
+
+class _AnnexBWriter:
+    """Writes access units and a picamera2-compatible PTS file."""
+
+    def __init__(self, output, pts=None):
+        self.output = open(output, "wb")
+        self.pts = open(pts, "w") if pts else None
+        if self.pts:
+            self.pts.write("# timestamp format v2\n")
+
+    def write(self, data, keyframe, timestamp_us):
+        self.output.write(data)
+        if self.pts:
+            self.pts.write(f"{timestamp_us // 1000}.{timestamp_us % 1000:03}\n")
+
+    def close(self):
+        self.output.close()
+        if self.pts:
+            self.pts.close()
+
+
+class _CallbackWriter:
+    """Hands access units to a packet callback."""
+
+    def __init__(self, callback):
+        self.callback = callback
+
+    def write(self, data, keyframe, timestamp_us):
+        self.callback(data, keyframe, timestamp_us)
+
+    def close(self):
+        pass
+
+
+class _H264FileReplayEncoder:
+    """Emits one access unit of a recorded H.264 file per replayed frame."""
+
+    def __init__(self, path, writer):
+        self.path = path
+        self.writer = writer
+        self._file = None
+        self._units = None
+        self._started = False
+
+    def _open(self):
+        if self._file is not None:
+            self._file.close()
+        self._file = open(self.path, "rb")
+        self._units = iter_access_units(iter_nal_units(self._file))
+
+    def feed(self, main, timestamp_us):
+        if self._units is None:
+            self._open()
+        unit = next(self._units, None)
+        if unit is None:
+            self._open()
+            unit = next(self._units, None)
+        # Output has to begin on a keyframe to be decodable.
+        while unit is not None and not self._started and not unit.keyframe:
+            unit = next(self._units, None)
+        if unit is None:
+            return
+        self._started = True
+        self.writer.write(unit.to_annexb(), unit.keyframe, timestamp_us)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+        self.writer.close()
+
+
+class _FFmpegPipeEncoder:
+    """Encodes replayed RGB frames to H.264 with an ffmpeg subprocess."""
+
+    def __init__(self, size, framerate, keyframe_interval, bitrate, writer):
+        self.logger = logging.getLogger(__name__)
+        self.writer = writer
+        self._timestamps = deque()
+        self.process = None
+        if shutil.which("ffmpeg") is None:
+            self.logger.error("ffmpeg not found. Replay encoder output will be empty.")
+            return
+        width, height = size
+        self.process = subprocess.Popen(
+            [
+                "ffmpeg", "-loglevel", "error",
+                "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}",
+                "-r", str(framerate), "-i", "-",
+                "-c:v", "libx264", "-preset", "ultrafast", "-tune", "zerolatency",
+                "-bf", "0", "-g", str(keyframe_interval), "-x264-params", "repeat-headers=1", "-b:v", str(bitrate),
+                "-f", "h264", "-",
+            ],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+        self._reader = threading.Thread(target=self._read_output, name="replay-encoder", daemon=True)
+        self._reader.start()
+
+    def feed(self, main, timestamp_us):
+        if self.process is None:
+            return
+        try:
+            self._timestamps.append(timestamp_us)
+            self.process.stdin.write(np.ascontiguousarray(main()).tobytes())
+        except (BrokenPipeError, ValueError):
+            self.logger.error("Replay encoder pipe closed.")
+            self.process = None
+
+    def _read_output(self):
+        for unit in iter_access_units(iter_nal_units(self.process.stdout)):
+            timestamp_us = self._timestamps.popleft() if self._timestamps else 0
+            self.writer.write(unit.to_annexb(), unit.keyframe, timestamp_us)
+
+    def close(self):
+        if self.process is not None:
+            self.process.stdin.close()
+            self.process.wait()
+            self._reader.join()
+        self.writer.close()
@@ -1,11 +1,21 @@
 import time
-import numpy as np
 import threading
 import logging
-from libcamera import Transform
-from picamera2 import Picamera2
-from picamera2.encoders import H264Encoder
-from picamera2.outputs import FileOutput
+
+from .backends import get_camera_backend
+from .capture_worker import CaptureWorker
+from .clip_writer import ClipWriter
+from .frame_bus import FrameBus
+from .frame_watchdog import FrameWatchdog
+from .preroll_buffer import EncodedPacket, PrerollBuffer
+from .transcode_queue import TranscodeJobQueue
+from app.lib.diagnostics.metrics import REGISTRY, STAGE_SECONDS
+
+CAPTURE_SECONDS = STAGE_SECONDS.labels(stage="capture")
+ENCODER_START_SECONDS = STAGE_SECONDS.labels(stage="encoder_start")
+ENCODER_STOP_SECONDS = STAGE_SECONDS.labels(stage="encoder_stop")
+CAMERA_RESTARTS = REGISTRY.counter("motionberry_camera_restarts", "Camera backend restarts.")
+RECORDINGS = REGISTRY.counter("motionberry_recordings", "Recordings started.")
 
 
 class CameraManager:
@@ -19,6 +29,12 @@ class CameraManager:
         detect_size=(320, 240),
         tuning_file=None,
         orientation="normal",
+        stall_timeout=5,
+        backend="picamera2",
+        backend_options=None,
+        preroll_seconds=0,
+        recording_mode="per_clip",
+        transcode_queue=None,
     ):
         self.logger = logging.getLogger(__name__)
         self.framerate = framerate
@@ -26,6 +42,8 @@ class CameraManager:
         self.client_lock = threading.Lock()
         self.is_camera_running = False
         self.is_recording = False
+        # Seconds of buffered video at the start of the current clip.
+        self.current_clip_preroll = 0.0
         self.is_restarting = False
         self.restart_condition = threading.Condition()
         self.record_size = record_size
@@ -34,32 +52,69 @@ class CameraManager:
         self.logger.debug(f"Initialized with detect_size: {self.detect_size}")
         self.file_manager = file_manager
         self.video_processor = video_processor
+        self.transcode_queue = transcode_queue or TranscodeJobQueue(video_processor, file_manager)
         self.client_count = 0
-        self.encoder = H264Encoder(
-            bitrate=encoder_bitrate, framerate=framerate, enable_sps_framerate=True
-        )
+        self.frame_bus = FrameBus()
         self.tuning_file = tuning_file
         self.orientation = orientation.lower()
         self.logger.debug(f"Initialized with orientation: {self.orientation}")
-        self._initialize_camera(tuning_file)
-
-    def _load_tuning(self, tuning_file=None):
-        if tuning_file is None:
-            self.logger.debug("No tuning file provided. Using default settings.")
-            return None
-
-        if not tuning_file.endswith(".json"):
-            tuning_file += ".json"
-
-        try:
-            tuning = Picamera2.load_tuning_file(tuning_file)
-            self.logger.info(f"Loading tuning file '{tuning_file}'")
-        except FileNotFoundError:
-            self.logger.error(
-                f"Tuning file '{tuning_file}' not found. Using default settings."
+        self.backend = get_camera_backend(
+            backend,
+            record_size=record_size,
+            detect_size=detect_size,
+            framerate=framerate,
+            encoder_bitrate=encoder_bitrate,
+            orientation=self.orientation,
+            tuning_file=tuning_file,
+            **(backend_options or {}),
+        )
+        self.logger.info(f"Using camera backend: {backend}")
+        self.capture_worker = CaptureWorker()
+        self.restart_listeners = []
+        self.packet_lock = threading.Lock()
+        self.clip_writer = None
+        self.is_packet_encoder_running = False
+        self.recording_mode = recording_mode.lower()
+        if self.recording_mode not in ("per_clip", "continuous"):
+            self.logger.warning(f"Invalid recording_mode '{recording_mode}'. Using 'per_clip'.")
+            self.recording_mode = "per_clip"
+        if preroll_seconds and preroll_seconds > 0 and self.recording_mode != "continuous":
+            self.logger.info("Pre-roll requires a continuous encoder. Using 'continuous' recording mode.")
+            self.recording_mode = "continuous"
+        # With no pre-roll the buffer holds just the current GOP, so segments
+        # still start on the most recent keyframe. Memory is bounded at twice
+        # the nominal size of the pre-roll plus one extra GOP.
+        gop_seconds = self.backend.keyframe_interval / framerate
+        max_bytes = int(encoder_bitrate / 8 * ((preroll_seconds or 0) + gop_seconds) * 2)
+        self.preroll = PrerollBuffer(preroll_seconds or 0, max_bytes=max_bytes)
+        self.packet_listeners = []
+        self.packet_stream_users = 0
+        if self.recording_mode == "continuous":
+            self.logger.info(
+                f"Continuous recording enabled: {preroll_seconds or 0}s pre-roll, "
+                f"up to {max_bytes / (1024 * 1024):.1f} MB of encoded video buffered."
             )
-            tuning = None
-        return tuning
+        self._register_metrics()
+        self._initialize_camera()
+        self.watchdog = FrameWatchdog(
+            on_stall=self.restart_camera,
+            is_active=lambda: self.is_camera_running and not self.is_restarting,
+            stall_timeout=stall_timeout,
+        )
+
+    def _register_metrics(self):
+        REGISTRY.gauge("motionberry_camera_running", "1 while the camera is running.").set_function(
+            lambda: int(self.is_camera_running))
+        REGISTRY.gauge("motionberry_recording", "1 while a recording is in progress.").set_function(
+            lambda: int(self.is_recording))
+        REGISTRY.gauge("motionberry_camera_clients", "Components currently using the camera.").set_function(
+            lambda: self.client_count)
+        REGISTRY.gauge("motionberry_capture_queue_depth", "Calls waiting for the capture worker.").set_function(
+            lambda: self.capture_worker.queue_depth)
+        REGISTRY.gauge("motionberry_frame_stalls", "Frame stalls detected by the watchdog.").set_function(
+            lambda: self.watchdog.stall_count)
+        REGISTRY.gauge("motionberry_preroll_bytes", "Encoded video held in the pre-roll buffer.").set_function(
+            lambda: self.preroll.size)
 
     def start_camera(self):
         """Starts the camera or increments the client count."""
@@ -69,8 +124,10 @@ class CameraManager:
             if self.client_count == 1:
                 with self.camera_lock:
                     if not self.is_camera_running:
-                        self.picam2.start()
+                        self.backend.start()
+                        self.watchdog.reset()
                         self.is_camera_running = True
+                        self._start_packet_encoder()
                         self.logger.info("Camera started.")
 
     def stop_camera(self):
@@ -82,47 +139,123 @@ class CameraManager:
                 if self.client_count == 0:
                     with self.camera_lock:
                         if self.is_camera_running and not self.is_recording:
-                            self.picam2.stop()
+                            self._stop_packet_encoder()
+                            self.backend.stop()
                             self.is_camera_running = False
                             self.logger.info("Camera stopped.")
 
-    def _initialize_camera(self, tuning_file=None):
-        """Initializes the Picamera2 instance."""
-        tuning = self._load_tuning(tuning_file)
-        self.picam2 = Picamera2(tuning=tuning)
-
-        transform = Transform()
-        if self.orientation == "flipped_horizontal":
-            transform = Transform(hflip=1, vflip=0)
-        elif self.orientation == "inverted":
-            transform = Transform(hflip=1, vflip=1)
-        elif self.orientation == "flipped_vertical":
-            transform = Transform(hflip=0, vflip=1)
-        elif self.orientation != "normal":
-            self.logger.warning(f"Invalid orientation state '{self.orientation}'. Using 'normal'.")
-
-        video_config = self.picam2.create_video_configuration(
-            main={"size": self.record_size, "format": "RGB888"},
-            lores={"size": self.detect_size, "format": "YUV420"},
-            transform=transform,
-            controls={
-                "FrameRate": self.framerate,
-                "AeEnable": True,      # Auto Exposure ON
-                "AwbEnable": True,     # Auto White Balance ON
-            },
+    def _initialize_camera(self):
+        """Configures the camera backend and attaches the frame bus producer."""
+        self.backend.configure()
+        self.backend.set_frame_callback(self._on_request)
+
+    def _on_request(self, get_array):
+        """Publishes every completed request to the frame bus.
+
+        Runs on the backend's capture thread, so only streams that currently
+        have subscribers are converted out of the request. The conversion and
+        publish are what the ``capture`` stage histogram measures.
+        """
+        self.watchdog.frame_received()
+        try:
+            with CAPTURE_SECONDS.time():
+                frames = {}
+                for stream in FrameBus.STREAMS:
+                    if self.frame_bus.wants(stream):
+                        frames[stream] = get_array(stream)
+                self.frame_bus.publish(frames)
+        except Exception as e:
+            self.logger.error(f"Failed to publish request: {e}", exc_info=True)
+
+    def _wants_packet_stream(self):
+        return self.recording_mode == "continuous" or self.packet_stream_users > 0
+
+    def _start_packet_encoder(self):
+        """Starts the continuously running encoder that recordings are cut from."""
+        if not self._wants_packet_stream() or self.is_packet_encoder_running:
+            return
+        if self.is_recording:
+            # A per-clip recording owns the encoder; stop_recording starts the stream afterwards.
+            return
+        self.preroll.clear()
+        with ENCODER_START_SECONDS.time():
+            self.backend.start_packet_encoder(self._on_packet)
+        self.is_packet_encoder_running = True
+        self.logger.info("Continuous encoder started.")
+
+    def _stop_packet_encoder(self):
+        if not self.is_packet_encoder_running:
+            return
+        self.is_packet_encoder_running = False
+        try:
+            with ENCODER_STOP_SECONDS.time():
+                self.backend.stop_encoder()
+            self.logger.info("Continuous encoder stopped.")
+        except Exception as e:
+            self.logger.error(f"Error stopping continuous encoder: {e}")
+
+    def _on_packet(self, data, keyframe, timestamp):
+        """Receives one encoded access unit from the continuous encoder."""
+        packet = EncodedPacket(data, keyframe, timestamp)
+        with self.packet_lock:
+            self.preroll.append(packet)
+            if self.clip_writer is not None:
+                self.clip_writer.write(packet)
+            for listener in self.packet_listeners:
+                listener(packet)
+
+    def acquire_packet_stream(self, listener):
+        """Subscribes ``listener(packet)`` to the encoded stream, starting the encoder if needed.
+
+        In per_clip mode the encoder then keeps running until the last
+        listener is released, and recordings made meanwhile are cut from it.
+        """
+        with self.camera_lock:
+            with self.packet_lock:
+                self.packet_listeners.append(listener)
+            self.packet_stream_users += 1
+            if self.is_camera_running:
+                self._start_packet_encoder()
+
+    def release_packet_stream(self, listener):
+        with self.camera_lock:
+            with self.packet_lock:
+                if listener in self.packet_listeners:
+                    self.packet_listeners.remove(listener)
+            self.packet_stream_users = max(0, self.packet_stream_users - 1)
+            if not self._wants_packet_stream() and self.clip_writer is None:
+                self._stop_packet_encoder()
+
+    def _open_clip(self, raw_path, pts_path):
+        """Opens a segment of the continuous stream.
+
+        The segment starts at the oldest buffered keyframe (the pre-roll, or
+        the current GOP without one) and the live stream is appended to it.
+        """
+        writer = ClipWriter(
+            raw_path, pts_path,
+            spill_after=self.file_manager.ram_headroom(raw_path),
+            spill_path=self.file_manager.spill_path(raw_path),
         )
-        self.logger.debug(f"Video config: {video_config}")
-        self.picam2.configure(video_config)
-        self.picam2.set_controls({
-            "FrameRate": self.framerate
-        })
-        self.logger.debug(f"Video config after apply: {self.picam2.camera_config}")
+        with self.packet_lock:
+            for packet in self.preroll.packets():
+                writer.write(packet)
+            self.clip_writer = writer
+        if writer.first_timestamp is not None:
+            preroll = (writer.last_timestamp - writer.first_timestamp) / 1_000_000
+            self.current_clip_preroll = preroll
+            self.logger.debug(f"Segment opened with {preroll:.2f}s of buffered video ({writer.bytes_written} bytes).")
+
+    def _close_clip(self):
+        with self.packet_lock:
+            writer, self.clip_writer = self.clip_writer, None
+        writer.close()
 
     def enable_ae_awb(self):
         """Enable Auto Exposure and Auto White Balance."""
         with self.camera_lock:
             try:
-                self.picam2.set_controls({
+                self.backend.set_controls({
                     "AeEnable": True,
                     "AwbEnable": True,
                 })
@@ -134,7 +267,7 @@ class CameraManager:
         """Disable Auto Exposure and Auto White Balance."""
         with self.camera_lock:
             try:
-                self.picam2.set_controls({
+                self.backend.set_controls({
                     "AeEnable": False,
                     "AwbEnable": False,
                 })
@@ -150,23 +283,29 @@ class CameraManager:
                 return
             self.is_restarting = True
 
-        self.logger.warning("Restarting Picamera2 instance...")
+        self.logger.warning("Restarting camera backend...")
+        CAMERA_RESTARTS.inc()
 
         result = False
         with self.client_lock, self.camera_lock:
             try:
                 self.is_camera_running = False
-                self.picam2.close()
+                self._stop_packet_encoder()
+                self.backend.close()
                 time.sleep(2)
             except Exception as e:
                 self.logger.error(f"Error closing camera: {e}")
 
             try:
-                self._initialize_camera(self.tuning_file)
-                self.picam2.start()
+                self._initialize_camera()
+                self.backend.start()
+                self.watchdog.reset()
                 self.is_camera_running = True
+                self._start_packet_encoder()
                 self.logger.info("Camera successfully restarted.")
                 result = True
+                for listener in self.restart_listeners:
+                    listener()
             except Exception as e:
                 self.logger.error(f"Failed to restart camera: {e}", exc_info=True)
 
@@ -176,138 +315,130 @@ class CameraManager:
 
         return result
 
-    def _capture_with_timeout(self, capture_function, *args, timeout=10):
-        self.logger.debug("Entering _capture_with_timeout with function: %s, args: %s", capture_function.__name__, args)
+    def _wait_for_capture_ready(self):
+        """Blocks during a camera restart and makes sure the camera is running.
+
+        Returns:
+            bool: False if frames are stalled or the camera could not be started.
+        """
         with self.restart_condition:
             while self.is_restarting:
                 self.logger.debug("Waiting for camera restart...")
                 self.restart_condition.wait()
+        if self.watchdog.stalled:
+            self.logger.debug("Frames are stalled. Failing fast.")
+            return False
         if not self.is_camera_running:
             self.logger.warning("Camera is not running. Attempting to start.")
             self.start_camera()
             if not self.is_camera_running:
                 self.logger.error("Camera failed to start.")
-                return None
+                return False
+        return True
 
-        capture_result = [None]
-        capture_complete = threading.Event()
+    def _capture_with_timeout(self, capture_function, *args, timeout=10):
+        """Runs a blocking capture call on the persistent capture worker."""
+        self.logger.debug("Entering _capture_with_timeout with function: %s, args: %s", capture_function.__name__, args)
+        if not self._wait_for_capture_ready():
+            return None
 
-        def capture():
-            try:
-                self.logger.debug("Executing capture function %s with args %s", capture_function.__name__, args)
-                capture_result[0] = capture_function(*args)
-                self.logger.debug("Capture function returned with result: %s", "None" if capture_result[0] is None else "valid")
-            except Exception as e:
-                self.logger.error(f"Error during capture: {e}", exc_info=True)
-            finally:
-                capture_complete.set()
+        result = self.capture_worker.call(capture_function, *args, timeout=timeout)
+        self.logger.debug("Capture completed, result: %s", "None" if result is None else "valid")
+        return result
 
-        capture_thread = threading.Thread(target=capture, daemon=True)
-        capture_thread.start()
+    def read_frame(self, subscription, timeout=None):
+        """Waits for the next frame on a frame bus subscription.
 
-        if not capture_complete.wait(timeout):
-            self.logger.error("Capture timed out! Restarting camera...")
-            self.restart_camera()
+        Stall recovery is left to the watchdog; while frames are stalled this
+        returns None immediately instead of waiting for a timeout.
+        """
+        if not self._wait_for_capture_ready():
             return None
 
-        self.logger.debug("Capture completed successfully, result: %s", "None" if capture_result[0] is None else "valid")
-        return capture_result[0]
-
-    def capture_image_array(self, stream="main"):
-        """Captures an image array with timeout handling."""
-        self.logger.debug(f"Attempting to capture image array from {stream} stream using capture_buffer")
-        buf = self._capture_with_timeout(self.picam2.capture_buffer, stream)
-        if buf is None:
-            self.logger.warning(f"Captured buffer is None for {stream} stream. Camera restart?")
-            return None
-        self.logger.debug(f"Buffer size: {len(buf)}")
-        try:
-            config = self.picam2.stream_configuration(stream)
-            w = config["size"][0]  # Width
-            h = config["size"][1]  # Height
-            self.logger.debug(f"Stream {stream} configuration: size={w}x{h}, format={config['format']}")
-            
-            if config["format"] == "RGB888":
-                expected_size = w * h * 3  # 3 bytes per pixel for RGB
-                if len(buf) != expected_size:
-                    self.logger.warning(f"Buffer size {len(buf)} does not match expected {expected_size} for RGB888")
-                # Reshape to (height, width, 3) and return as RGB
-                image = np.frombuffer(buf, dtype=np.uint8).reshape(h, w, 3)
-                self.logger.debug(f"RGB image shape: {image.shape}")
-                return image
-            else:  # Assume YUV420 for lores or other formats, return grayscale Y plane
-                yuv_height = int(h * 1.5)  # Full YUV420 height
-                if len(buf) % yuv_height != 0:
-                    self.logger.error(f"Buffer size {len(buf)} not divisible by YUV height {yuv_height}")
-                    return None
-                stride = len(buf) // yuv_height
-                self.logger.debug(f"Computed stride: {stride}")
-                image = np.frombuffer(buf, dtype=np.uint8).reshape(yuv_height, stride)
-                y_plane = image[:h, :w]  # Extract Y plane as grayscale
-                self.logger.debug(f"Y plane shape: {y_plane.shape}, min: {y_plane.min()}, max: {y_plane.max()}")
-                return y_plane
-        except Exception as e:
-            self.logger.error(f"Failed to process buffer for {stream} stream: {e}", exc_info=True)
+        frame = subscription.get(self.watchdog.stall_timeout if timeout is None else timeout)
+        if frame is None:
+            self.logger.warning(f"No {subscription.stream} frame received.")
             return None
+        return frame.array
+
+    def capture_image_array(self, stream="main", timeout=None):
+        """Returns the next frame published on the frame bus for the given stream."""
+        self.logger.debug(f"Waiting for next {stream} frame from the frame bus")
+        with self.frame_bus.subscribe(stream) as subscription:
+            return self.read_frame(subscription, timeout)
 
     def take_snapshot(self):
         """Takes a snapshot and saves it as a JPEG file with timeout handling."""
         filename = f"snapshot_{time.strftime('%Y-%m-%d_%H-%M-%S')}.jpg"
         full_path = str(self.file_manager.output_dir / filename)
 
-        request = self._capture_with_timeout(self.picam2.capture_request)
-        if request is None:
+        if self._capture_with_timeout(self.backend.save_snapshot, full_path) is None:
             self.logger.error("Failed to capture snapshot.")
             return None
+        self.file_manager.catalog.add(full_path)
 
-        try:
-            request.save("main", full_path)
-            self.logger.info(f"Snapshot taken: {full_path}")
-        finally:
-            request.release()
-
+        self.logger.info(f"Snapshot taken: {full_path}")
         return filename
 
     def start_recording(self):
-        """Starts encoding video."""
+        """Starts encoding video.
+
+        In continuous mode the encoder is already running and this only opens
+        a new keyframe-aligned segment of its output.
+        """
         with self.camera_lock:
             if not self.is_recording:
                 try:
                     self.current_raw_path, self.current_pts_path = (
                         self.file_manager.save_raw_file()
                     )
-                    self.encoder.output = FileOutput(str(self.current_raw_path))
                     self.is_recording = True
-                    self.picam2.start_encoder(
-                        encoder=self.encoder,
-                        output=str(self.current_raw_path),
-                        pts=str(self.current_pts_path),
-                    )
+                    self.current_clip_preroll = 0.0
+                    if self.is_packet_encoder_running:
+                        self._open_clip(self.current_raw_path, self.current_pts_path)
+                    else:
+                        with ENCODER_START_SECONDS.time():
+                            self.backend.start_encoder(self.current_raw_path, self.current_pts_path)
+                    RECORDINGS.inc()
                     self.logger.info(f"Recording started: {self.current_raw_path}")
                 except Exception as e:
                     self.logger.error(f"Failed to start recording: {e}", exc_info=True)
                     self.is_recording = False
                     raise
 
-    def stop_recording(self):
-        """Stops video encoding and processes the output."""
+    def stop_recording(self, on_done=None):
+        """Stops video encoding (or closes the current segment) and queues the output for conversion.
+
+        Args:
+            on_done (callable, optional): Called as ``on_done(job)`` once the clip
+                has been converted and saved, or the conversion failed.
+
+        Returns:
+            TranscodeJob: The conversion job, or None if nothing was recorded.
+        """
         with self.camera_lock:
-            if self.is_recording:
-                try:
-                    self.picam2.stop_encoder()
-                    self.logger.info("Recording stopped.")
-                    final_path = self.video_processor.process_and_save(
-                        self.current_raw_path, self.current_pts_path
-                    )
-                    self.logger.info(f"Video saved: {final_path}")
-                    return final_path
-                except Exception as e:
-                    self.logger.error(f"Failed to stop recording: {e}", exc_info=True)
-                    return None
-                finally:
-                    self.is_recording = False
-                    self.file_manager.cleanup_tmp_dir(self.current_raw_path.parent)
-                    self.file_manager.cleanup_output_directory()
+            if not self.is_recording:
+                return None
+            raw_path, pts_path = self.current_raw_path, self.current_pts_path
+            try:
+                if self.clip_writer is not None:
+                    self._close_clip()
+                else:
+                    with ENCODER_STOP_SECONDS.time():
+                        self.backend.stop_encoder()
+                self.logger.info("Recording stopped.")
+            except Exception as e:
+                self.logger.error(f"Failed to stop recording: {e}", exc_info=True)
+                self.file_manager.cleanup_tmp_dir(raw_path.parent)
+                return None
+            finally:
+                self.is_recording = False
+                if not self.is_packet_encoder_running and self.is_camera_running:
+                    self._start_packet_encoder()
+                elif self.is_packet_encoder_running and not self._wants_packet_stream():
+                    self._stop_packet_encoder()
+        # Outside the lock: submit() blocks while the queue is full.
+        return self.transcode_queue.submit(raw_path, pts_path, on_done)
 
     def record_for_duration(self, duration, result_queue=None):
         """Records a video for a specified duration in seconds."""
@@ -334,7 +465,8 @@ class CameraManager:
                 self.logger.info(f"Starting recording for {duration} seconds.")
                 self.start_recording()
                 time.sleep(duration)
-                final_path = self.stop_recording()
+                job = self.stop_recording()
+                final_path = job.wait() if job else None
                 self.logger.info(f"Recording completed and saved to: {final_path}")
                 if result_queue:
                     result_queue.put(final_path)
@@ -343,5 +475,5 @@ class CameraManager:
                 if result_queue:
                     result_queue.put(None)
 
-        record_thread = threading.Thread(target=record, daemon=True)
+        record_thread = threading.Thread(target=record, name="recording", daemon=True)
         record_thread.start()
\ No newline at end of file
@@ -0,0 +1,283 @@
+import logging
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+from .clip_preview import PREVIEW_SUFFIXES, clip_stem
+from .motion_timeline import SIDECAR_SUFFIX
+
+CATALOG_DIR_NAME = ".catalog"
+CAPTURE_KINDS = {".mp4": "video", ".mkv": "video", ".h264": "video", ".jpg": "image"}
+SIDECAR_SUFFIXES = (SIDECAR_SUFFIX, *PREVIEW_SUFFIXES)
+
+_SCHEMA_VERSION = 1
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS captures (
+    name TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    duration REAL,
+    frames INTEGER,
+    sidecars TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS captures_mtime ON captures (mtime);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value
+);
+"""
+
+
+def sidecar_owner(name):
+    """Returns the clip stem a sidecar file belongs to, or None if ``name`` is not a sidecar."""
+    if name.endswith(SIDECAR_SUFFIX):
+        return name[:-len(SIDECAR_SUFFIX)]
+    return clip_stem(name)
+
+
+def is_capture(name):
+    """Whether ``name`` is a capture (a clip or snapshot) rather than a sidecar or internal file."""
+    if name.startswith("."):
+        return False
+    return Path(name).suffix.lower() in CAPTURE_KINDS and sidecar_owner(name) is None
+
+
+class CaptureCatalog:
+    """SQLite index of the captures in the output directory.
+
+    Listing captures and enforcing the size and age limits would otherwise
+    stat every file in the directory after each recording. The catalog is
+    updated as files are published and deleted, and records the directory's
+    mtime after each change: at startup the directory is only scanned if it
+    was modified behind the catalog's back (files copied or deleted by hand,
+    or a crash between a write and its catalog update).
+
+    The database lives in a hidden subdirectory of the output directory, so
+    its own journal files do not change the directory's mtime. It runs in
+    WAL mode with relaxed syncing, so an update costs an append to the log
+    rather than an fsync per clip.
+    """
+
+    def __init__(self, output_dir, db_path=None):
+        self.logger = logging.getLogger(__name__)
+        self.output_dir = Path(output_dir)
+        if db_path is None:
+            (self.output_dir / CATALOG_DIR_NAME).mkdir(exist_ok=True)
+            db_path = self.output_dir / CATALOG_DIR_NAME / "captures.db"
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        self._db = self._open()
+
+    def _open(self):
+        try:
+            db = self._connect()
+        except sqlite3.DatabaseError as e:
+            self.logger.warning(f"Capture catalog {self.db_path} is unreadable ({e}). Rebuilding.")
+            self._remove_database()
+            db = self._connect()
+        if db.execute("PRAGMA user_version").fetchone()[0] != _SCHEMA_VERSION:
+            db.executescript("DROP TABLE IF EXISTS captures; DROP TABLE IF EXISTS meta;")
+            db.executescript(_SCHEMA)
+            db.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+            db.commit()
+        return db
+
+    def _connect(self):
+        db = sqlite3.connect(self.db_path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute("SELECT count(*) FROM sqlite_master").fetchone()
+        return db
+
+    def _remove_database(self):
+        for suffix in ("", "-wal", "-shm"):
+            Path(f"{self.db_path}{suffix}").unlink(missing_ok=True)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def add(self, path, duration=None, frames=None):
+        """Adds or updates a capture from the file on disk.
+
+        Duration and frame count are kept from an earlier entry unless given.
+
+        Args:
+            path (Path): The capture in the output directory.
+            duration (float, optional): Clip duration in seconds.
+            frames (int, optional): Frames in the clip.
+        """
+        path = Path(path)
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            self.remove(path.name)
+            return
+        kind = CAPTURE_KINDS.get(path.suffix.lower(), "other")
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO captures (name, kind, size, mtime, duration, frames, sidecars) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET kind = excluded.kind, size = excluded.size, "
+                "mtime = excluded.mtime, duration = coalesce(excluded.duration, duration), "
+                "frames = coalesce(excluded.frames, frames), sidecars = excluded.sidecars",
+                (path.name, kind, stat.st_size, stat.st_mtime, duration, frames, self._sidecars_of(path)),
+            )
+            self._commit()
+
+    def refresh_sidecars(self, path):
+        """Re-reads which sidecars (timeline, previews) a capture has."""
+        path = Path(path)
+        with self._lock:
+            self._db.execute("UPDATE captures SET sidecars = ? WHERE name = ?", (self._sidecars_of(path), path.name))
+            self._commit()
+
+    def remove(self, name):
+        with self._lock:
+            self._db.execute("DELETE FROM captures WHERE name = ?", (name,))
+            self._commit()
+
+    def get(self, name):
+        with self._lock:
+            row = self._db.execute(f"SELECT {self._COLUMNS} FROM captures WHERE name = ?", (name,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def captures(self, newest_first=True):
+        """Returns every capture as a dict, ordered by modification time."""
+        order = "DESC" if newest_first else "ASC"
+        with self._lock:
+            rows = self._db.execute(f"SELECT {self._COLUMNS} FROM captures ORDER BY mtime {order}").fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def names(self, newest_first=True):
+        order = "DESC" if newest_first else "ASC"
+        with self._lock:
+            rows = self._db.execute(f"SELECT name FROM captures ORDER BY mtime {order}").fetchall()
+        return [name for name, in rows]
+
+    def total_size(self):
+        with self._lock:
+            return self._db.execute("SELECT coalesce(sum(size), 0) FROM captures").fetchone()[0]
+
+    def over_size_limit(self, max_bytes):
+        """Returns the oldest captures to delete to bring the total size down to ``max_bytes``.
+
+        Returns:
+            list[tuple]: ``(name, size)`` pairs, oldest first.
+        """
+        with self._lock:
+            return self._db.execute(
+                "SELECT name, size FROM ("
+                "  SELECT name, size, mtime, sum(size) OVER (ORDER BY mtime DESC, name DESC) AS kept"
+                "  FROM captures"
+                ") WHERE kept > ? ORDER BY mtime ASC",
+                (max_bytes,),
+            ).fetchall()
+
+    def older_than(self, cutoff):
+        """Returns the names of captures modified before ``cutoff`` (epoch seconds), oldest first."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT name FROM captures WHERE mtime < ? ORDER BY mtime ASC", (cutoff,)).fetchall()
+        return [name for name, in rows]
+
+    def is_synced(self):
+        """Whether the output directory is unchanged since the catalog's last update."""
+        with self._lock:
+            row = self._db.execute("SELECT value FROM meta WHERE key = 'dir_mtime_ns'").fetchone()
+        return row is not None and row[0] == self._dir_mtime_ns()
+
+    def mark_synced(self):
+        """Records the current state of the directory as matching the catalog."""
+        with self._lock:
+            self._commit()
+
+    def reconcile(self, force=False):
+        """Brings the catalog in line with the directory, if it may be out of sync.
+
+        Args:
+            force (bool): Scan even if the directory looks unchanged.
+
+        Returns:
+            list[Path]: Sidecar files whose capture no longer exists, for the caller to delete.
+        """
+        if not force and self.is_synced():
+            self.logger.info(f"Capture catalog is up to date ({len(self)} captures).")
+            return []
+
+        captures = {}
+        sidecars = []
+        with os.scandir(self.output_dir) as entries:
+            for entry in entries:
+                if entry.name.startswith(".") or not entry.is_file():
+                    continue
+                if is_capture(entry.name):
+                    captures[entry.name] = entry.stat()
+                elif sidecar_owner(entry.name) is not None:
+                    sidecars.append(entry.name)
+
+        stems = {Path(name).stem for name in captures}
+        orphans = [self.output_dir / name for name in sidecars if sidecar_owner(name) not in stems]
+        sidecar_names = set(sidecars)
+
+        with self._lock:
+            known = {
+                name: (size, mtime)
+                for name, size, mtime in self._db.execute("SELECT name, size, mtime FROM captures")
+            }
+            removed = [name for name in known if name not in captures]
+            self._db.executemany("DELETE FROM captures WHERE name = ?", ((name,) for name in removed))
+            changed = 0
+            for name, stat in captures.items():
+                present = ",".join(
+                    suffix for suffix in SIDECAR_SUFFIXES if f"{Path(name).stem}{suffix}" in sidecar_names
+                )
+                if known.get(name) != (stat.st_size, stat.st_mtime):
+                    changed += 1
+                    # Duration and frames of a changed file are unknown; they are cleared.
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO captures (name, kind, size, mtime, sidecars) VALUES (?, ?, ?, ?, ?)",
+                        (name, CAPTURE_KINDS[Path(name).suffix.lower()], stat.st_size, stat.st_mtime, present),
+                    )
+                else:
+                    self._db.execute("UPDATE captures SET sidecars = ? WHERE name = ?", (present, name))
+            self._commit()
+        self.logger.info(
+            f"Capture catalog rebuilt from {self.output_dir}: {len(captures)} captures, "
+            f"{changed} added or changed, {len(removed)} removed."
+        )
+        return orphans
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT count(*) FROM captures").fetchone()[0]
+
+    _COLUMNS = "name, kind, size, mtime, duration, frames, sidecars"
+
+    @staticmethod
+    def _to_dict(row):
+        name, kind, size, mtime, duration, frames, sidecars = row
+        return {
+            "name": name,
+            "kind": kind,
+            "size": size,
+            "mtime": mtime,
+            "duration": duration,
+            "frames": frames,
+            "sidecars": [f"{Path(name).stem}{suffix}" for suffix in sidecars.split(",") if suffix],
+        }
+
+    @staticmethod
+    def _sidecars_of(path):
+        return ",".join(suffix for suffix in SIDECAR_SUFFIXES if path.with_suffix(suffix).exists())
+
+    def _dir_mtime_ns(self):
+        return os.stat(self.output_dir).st_mtime_ns
+
+    def _commit(self):
+        """Commits and records the directory mtime the catalog now matches. Call with the lock held."""
+        self._db.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('dir_mtime_ns', ?)", (self._dir_mtime_ns(),))
+        self._db.commit()
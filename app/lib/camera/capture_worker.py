@@ -0,0 +1,81 @@
+import logging
+import queue
+import threading
+import time
+
+
+class CaptureRequest:
+    """A capture call queued on the CaptureWorker."""
+
+    def __init__(self, function, args):
+        self.function = function
+        self.args = args
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class CaptureWorker:
+    """Executes blocking capture calls on a single long-lived thread.
+
+    Calls are queued and served in order. If a call hangs past its timeout
+    the worker thread is abandoned and a fresh one takes over the queue, so a
+    wedged camera costs one thread rather than one thread per capture.
+    """
+
+    def __init__(self, name="capture-worker"):
+        self.logger = logging.getLogger(__name__)
+        self.name = name
+        self._queue = queue.Queue()
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._start_thread()
+
+    def _start_thread(self):
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+        thread = threading.Thread(
+            target=self._run, args=(generation,), name=f"{self.name}-{generation}", daemon=True
+        )
+        thread.start()
+
+    def _run(self, generation):
+        while generation == self._generation:
+            request = self._queue.get()
+            if request is None:
+                break
+            try:
+                request.result = request.function(*request.args)
+            except Exception as e:
+                self.logger.error(f"Error during capture: {e}", exc_info=True)
+                request.error = e
+            finally:
+                request.done.set()
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def call(self, function, *args, timeout=10):
+        """Runs ``function(*args)`` on the worker and waits for the result.
+
+        Returns:
+            The function result, or None if it failed or timed out.
+        """
+        request = CaptureRequest(function, args)
+        self._queue.put(request)
+        start = time.monotonic()
+        if not request.done.wait(timeout):
+            self.logger.error(
+                f"Capture {function.__name__} timed out after {time.monotonic() - start:.1f}s. "
+                "Replacing capture worker."
+            )
+            self._start_thread()
+            return None
+        return request.result
+
+    def stop(self):
+        with self._lock:
+            self._generation += 1
+        self._queue.put(None)
@@ -0,0 +1,286 @@
+import io
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, features
+
+from app.lib.diagnostics.metrics import STAGE_SECONDS
+
+PREVIEW_SECONDS = STAGE_SECONDS.labels(stage="preview")
+
+POSTER_SUFFIX = ".poster.jpg"
+ANIMATION_SUFFIXES = {"webp": ".preview.webp", "gif": ".preview.gif"}
+PREVIEW_SUFFIXES = (POSTER_SUFFIX, *ANIMATION_SUFFIXES.values())
+CONTENT_TYPES = {".jpg": "image/jpeg", ".webp": "image/webp", ".gif": "image/gif"}
+
+
+def poster_path(clip_path):
+    """Returns the poster path for a clip (``clip.mp4`` -> ``clip.poster.jpg``)."""
+    return Path(clip_path).with_suffix(POSTER_SUFFIX)
+
+
+def animation_path(clip_path, image_format="webp"):
+    """Returns the animated preview path for a clip (``clip.mp4`` -> ``clip.preview.webp``)."""
+    return Path(clip_path).with_suffix(ANIMATION_SUFFIXES[image_format])
+
+
+def preview_paths(clip_path):
+    """Returns every preview file a clip may have, existing or not."""
+    return [Path(clip_path).with_suffix(suffix) for suffix in PREVIEW_SUFFIXES]
+
+
+def clip_stem(name):
+    """Returns the clip stem of a preview file name, or None if it is not a preview."""
+    for suffix in PREVIEW_SUFFIXES:
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return None
+
+
+def luma_to_jpeg(frame, quality=85):
+    """Encodes a grayscale (or first channel of a) frame as JPEG.
+
+    Args:
+        frame (np.ndarray): Frame to convert.
+        quality (int): JPEG quality.
+
+    Returns:
+        bytes: JPEG data, or None if the frame is empty or invalid.
+    """
+    if frame is None or frame.size == 0 or len(frame.shape) not in (2, 3):
+        return None
+    y_plane = frame if len(frame.shape) == 2 else frame[:, :, 0]
+    y_plane = np.clip(y_plane, 0, 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(y_plane, mode="L").save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+class PreviewRecorder:
+    """Samples colour frames from the main stream while a clip is recording.
+
+    A background thread takes one frame every ``interval`` seconds and keeps
+    a downscaled copy. When ``max_frames`` are held, every other frame is
+    dropped and the interval doubles, so the samples always span the whole
+    clip in bounded memory. The thread subscribes to the main stream only for
+    the moment it takes a sample, so the capture thread converts one main
+    frame per sample instead of one per request.
+    """
+
+    def __init__(self, frame_bus, interval=1.0, max_frames=12, width=320, image_format="webp",
+                 quality=80, frame_duration=250):
+        """
+        Args:
+            frame_bus (FrameBus): Source of main stream frames.
+            interval (float): Seconds between samples at the start of a clip.
+            max_frames (int): Samples kept per clip.
+            width (int): Width of the kept samples in pixels.
+            image_format (str): "webp" or "gif" for the animated preview.
+            quality (int): JPEG/WebP quality.
+            frame_duration (int): Milliseconds each sample is shown for in the animation.
+        """
+        self.logger = logging.getLogger(__name__)
+        self.frame_bus = frame_bus
+        self.interval = max(0.1, float(interval))
+        self.max_frames = max(2, int(max_frames))
+        self.width = int(width)
+        self.image_format = image_format.lower()
+        if self.image_format not in ANIMATION_SUFFIXES:
+            raise ValueError(f"Unsupported preview format: {image_format}")
+        if self.image_format == "webp" and not features.check("webp"):
+            self.logger.warning("Pillow was built without WebP support. Using GIF previews.")
+            self.image_format = "gif"
+        self.quality = int(quality)
+        self.frame_duration = int(frame_duration)
+        self._lock = threading.Lock()
+        self._session = None
+
+    def start(self):
+        """Starts sampling a new clip. A clip still being sampled is discarded."""
+        session = _SamplingSession(self)
+        with self._lock:
+            previous, self._session = self._session, session
+        if previous is not None:
+            previous.stop()
+        threading.Thread(target=session.run, name="preview", daemon=True).start()
+
+    def stop(self):
+        """Stops sampling without waiting for the thread.
+
+        Returns:
+            ClipPreview: The samples taken, or None if no clip was being sampled.
+        """
+        with self._lock:
+            session, self._session = self._session, None
+        if session is None:
+            return None
+        return ClipPreview(session.stop(), self.image_format, self.quality, self.frame_duration)
+
+
+class _SamplingSession:
+    def __init__(self, recorder):
+        self.recorder = recorder
+        self.frames = []
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def run(self):
+        interval = self.recorder.interval
+        while not self._stopped.is_set():
+            image = self._sample()
+            with self._lock:
+                if self._stopped.is_set():
+                    break
+                if image is not None:
+                    self.frames.append((time.time(), image))
+                    if len(self.frames) > self.recorder.max_frames:
+                        self.frames = self.frames[::2]
+                        interval *= 2
+            self._stopped.wait(interval)
+
+    def _sample(self):
+        subscription = self.recorder.frame_bus.subscribe("main")
+        try:
+            frame = subscription.get(timeout=1)
+        finally:
+            subscription.close()
+        if frame is None or frame.array is None:
+            return None
+        try:
+            image = Image.fromarray(frame.array)
+            height = max(1, round(image.height * self.recorder.width / image.width))
+            return image.resize((self.recorder.width, height), Image.BILINEAR, reducing_gap=2.0)
+        except Exception as e:
+            self.recorder.logger.error(f"Failed to sample preview frame: {e}")
+            return None
+
+    def stop(self):
+        with self._lock:
+            self._stopped.set()
+            return self.frames
+
+
+class ClipPreview:
+    """Frames sampled from one clip, rendered into a poster and an animated preview."""
+
+    def __init__(self, frames, image_format="webp", quality=80, frame_duration=250):
+        """
+        Args:
+            frames (list): ``(epoch time, PIL.Image)`` samples in order.
+            image_format (str): "webp" or "gif" for the animated preview.
+            quality (int): JPEG/WebP quality.
+            frame_duration (int): Milliseconds each sample is shown for in the animation.
+        """
+        self.logger = logging.getLogger(__name__)
+        self.frames = frames
+        self.image_format = image_format
+        self.quality = quality
+        self.frame_duration = frame_duration
+
+    def poster_frame(self, peak_time=None):
+        """Returns the sample closest to ``peak_time``, or the middle one."""
+        if not self.frames:
+            return None
+        if peak_time is None:
+            return self.frames[len(self.frames) // 2][1]
+        return min(self.frames, key=lambda sample: abs(sample[0] - peak_time))[1]
+
+    def render(self, clip_path, peak_time=None):
+        """Writes the poster and the animated preview next to a clip.
+
+        Args:
+            clip_path (Path): The saved clip.
+            peak_time (float, optional): Epoch time of the strongest motion,
+                used to pick the poster frame.
+
+        Returns:
+            bytes: The poster JPEG, or None if no frames were sampled.
+        """
+        poster = self.poster_frame(peak_time)
+        if poster is None:
+            return None
+        with PREVIEW_SECONDS.time():
+            buffer = io.BytesIO()
+            poster.convert("RGB").save(buffer, format="JPEG", quality=self.quality)
+            poster_jpeg = buffer.getvalue()
+            _write_atomic(poster_path(clip_path), poster_jpeg)
+            if len(self.frames) > 1:
+                try:
+                    self._save_animation(animation_path(clip_path, self.image_format))
+                except (OSError, ValueError) as e:
+                    self.logger.error(f"Failed to save animated preview for {clip_path}: {e}")
+        return poster_jpeg
+
+    def _save_animation(self, path):
+        images = [image for _, image in self.frames]
+        buffer = io.BytesIO()
+        options = {"quality": self.quality, "method": 4} if self.image_format == "webp" else {"optimize": False}
+        images[0].save(
+            buffer,
+            format=self.image_format.upper(),
+            save_all=True,
+            append_images=images[1:],
+            duration=self.frame_duration,
+            loop=0,
+            **options,
+        )
+        _write_atomic(path, buffer.getvalue())
+
+
+def _write_atomic(path, data):
+    """Writes a small file under a hidden name and renames it into place."""
+    tmp_path = path.with_name(f".{path.name}")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+
+class PreviewCache:
+    """Keeps recently served preview images in memory.
+
+    Gallery pages request the same posters over and over; serving them from
+    memory keeps those requests off the SD card. Entries are keyed by path
+    and invalidated when the file's mtime changes.
+    """
+
+    def __init__(self, max_bytes=8 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        """Returns ``(data, mtime)`` for a preview file, reading it on a miss.
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+        """
+        path = Path(path)
+        mtime = path.stat().st_mtime
+        key = str(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] == mtime:
+                self._entries.move_to_end(key)
+                return entry
+        data = path.read_bytes()
+        self.put(path, data, mtime)
+        return data, mtime
+
+    def put(self, path, data, mtime):
+        if len(data) > self.max_bytes:
+            return
+        key = str(path)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous[0])
+            self._entries[key] = (data, mtime)
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, (old, _) = self._entries.popitem(last=False)
+                self._size -= len(old)
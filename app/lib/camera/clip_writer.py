@@ -0,0 +1,63 @@
+import logging
+from pathlib import Path
+
+from .file_manager import WRITE_BUFFER_SIZE
+
+
+class ClipWriter:
+    """Writes encoded packets to a raw H.264 file and a picamera2-style PTS file.
+
+    Packets are a few kB each; a large write buffer turns them into few big
+    writes. If ``spill_after`` is set (the clip is staged in RAM), the stream
+    continues in ``spill_path`` once that many bytes have been written.
+    """
+
+    def __init__(self, raw_path, pts_path=None, spill_after=None, spill_path=None):
+        self.logger = logging.getLogger(__name__)
+        self.raw_path = raw_path
+        self.pts_path = pts_path
+        # A recording staged on disk already is its own spill file; reopening
+        # it would truncate what has been written.
+        if spill_path is None or Path(spill_path) == Path(raw_path):
+            spill_after = None
+        self.spill_after = spill_after
+        self.spill_path = spill_path
+        self.spilled = False
+        self.frames = 0
+        self.bytes_written = 0
+        self.first_timestamp = None
+        self.last_timestamp = None
+        self._raw = open(raw_path, "wb", buffering=WRITE_BUFFER_SIZE)
+        self._pts = open(pts_path, "w") if pts_path else None
+        if self._pts:
+            self._pts.write("# timestamp format v2\n")
+
+    def write(self, packet):
+        if self.frames == 0 and not packet.keyframe:
+            # A clip has to start on a keyframe to be decodable.
+            return
+        if (self.spill_after is not None and not self.spilled
+                and self.bytes_written + len(packet.data) > self.spill_after):
+            self._spill()
+        self._raw.write(packet.data)
+        if self._pts:
+            timestamp = packet.timestamp
+            self._pts.write(f"{timestamp // 1000}.{timestamp % 1000:03}\n")
+        if self.first_timestamp is None:
+            self.first_timestamp = packet.timestamp
+        self.last_timestamp = packet.timestamp
+        self.frames += 1
+        self.bytes_written += len(packet.data)
+
+    def _spill(self):
+        self._raw.close()
+        self.spill_path.parent.mkdir(exist_ok=True)
+        self._raw = open(self.spill_path, "wb", buffering=WRITE_BUFFER_SIZE)
+        self.spilled = True
+        self.logger.warning(f"RAM staging full after {self.bytes_written} bytes. Continuing {self.raw_path.name} on disk.")
+
+    def close(self):
+        self._raw.close()
+        if self._pts:
+            self._pts.close()
+        self.logger.debug(f"Clip closed: {self.raw_path} ({self.frames} frames, {self.bytes_written} bytes)")
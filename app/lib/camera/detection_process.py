@@ -0,0 +1,161 @@
+import logging
+import math
+import multiprocessing
+import struct
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .algorithms import BaseAlgorithm, get_motion_algorithm
+from .frame_ring import FrameRing
+
+_REQUEST = struct.Struct("<I")
+_RESPONSE = struct.Struct("<?d")
+_READY = struct.Struct("<d")
+_STOP = 0xFFFFFFFF
+
+
+def _detection_worker(conn, shm_name, shape, slots, algorithm, threshold, blur_strength, mask, log_level):
+    """Child process: runs detect() on frames the parent writes into shared memory."""
+    logging.basicConfig(
+        level=log_level,
+        format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S"
+    )
+    logger = logging.getLogger(__name__)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    frames = None
+    try:
+        frames = FrameRing(slots, shape, buffer=shm.buf).frames
+        detector = get_motion_algorithm(algorithm, threshold, blur_strength, mask=mask)
+        logger.info(f"Detection process started for {shape[1]}x{shape[0]} frames.")
+        threshold = detector.score_threshold
+        conn.send_bytes(_READY.pack(math.nan if threshold is None else float(threshold)))
+        while True:
+            (slot,) = _REQUEST.unpack(conn.recv_bytes())
+            if slot == _STOP:
+                break
+            detected = detector.detect(frames[slot])
+            score = detector.last_score
+            conn.send_bytes(_RESPONSE.pack(bool(detected), math.nan if score is None else float(score)))
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        del frames
+        shm.close()
+        conn.close()
+
+
+class DetectionProcess(BaseAlgorithm):
+    """Runs a motion detection algorithm in a dedicated worker process.
+
+    Frames are copied into a ring of ``slots`` frame-sized buffers in shared
+    memory and only the slot index goes over the pipe; the child answers with
+    the detection result and score. Nothing is pickled per frame, and the
+    algorithm runs on its own core without contending for the web server's
+    GIL. Offers the same detect() interface as the in-process algorithms.
+    """
+
+    START_TIMEOUT = 60
+
+    def __init__(self, algorithm, normalized_threshold, blur_strength, mask=None, slots=4, timeout=5):
+        """
+        Args:
+            algorithm (str): Name passed to get_motion_algorithm in the child.
+            normalized_threshold (float): Motion threshold from 1 to 10.
+            blur_strength (int): Blur strength for the algorithm.
+            mask (DetectionMask, optional): Detection mask, applied in the child.
+            slots (int): Number of frame buffers in the shared ring (at least 2, since
+                algorithms may keep a reference to the previous frame).
+            timeout (float): Seconds to wait for a result before restarting the child.
+        """
+        super().__init__(normalized_threshold)
+        self.logger = logging.getLogger(__name__)
+        self.algorithm = algorithm
+        self.blur_strength = blur_strength
+        self.detection_mask = mask
+        self.slots = max(2, int(slots))
+        self.timeout = timeout
+        self.context = multiprocessing.get_context("spawn")
+        self.process = None
+        self.conn = None
+        self.shm = None
+        self.ring = None
+        self.restarts = 0
+        self._score_threshold = None
+
+    def _start(self, shape):
+        self.close()
+        size = FrameRing.required_bytes(self.slots, shape)
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+        self.ring = FrameRing(self.slots, shape, buffer=self.shm.buf)
+        self.conn, child_conn = self.context.Pipe()
+        self.process = self.context.Process(
+            target=_detection_worker,
+            args=(
+                child_conn, self.shm.name, shape, self.slots, self.algorithm,
+                self.normalized_threshold, self.blur_strength, self.detection_mask,
+                logging.getLogger().getEffectiveLevel(),
+            ),
+            name="motion-detection-worker",
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        # Importing numpy and OpenCV in a fresh interpreter can take a while on a Pi.
+        if not self.conn.poll(self.START_TIMEOUT):
+            self.process.kill()
+            raise TimeoutError(f"Detection process did not start within {self.START_TIMEOUT}s")
+        (threshold,) = _READY.unpack(self.conn.recv_bytes())
+        self._score_threshold = None if math.isnan(threshold) else threshold
+        self.logger.info(
+            f"Detection process {self.process.pid} started with a {size / 1024:.0f} KB shared frame ring."
+        )
+
+    @property
+    def score_threshold(self):
+        return self._score_threshold
+
+    def detect(self, frame: np.ndarray) -> bool:
+        if frame is None or frame.ndim != 2:
+            self.logger.warning(
+                f"Invalid frame: {type(frame)}, shape={getattr(frame, 'shape', 'N/A')}"
+            )
+            return False
+        if self.ring is None or self.ring.shape != frame.shape or not self.process.is_alive():
+            if self.process is not None and not self.process.is_alive():
+                self.restarts += 1
+                self.logger.warning("Detection process not running. Restarting.")
+            self._start(frame.shape)
+
+        slot = self.ring.append(frame)
+        try:
+            self.conn.send_bytes(_REQUEST.pack(slot))
+            if not self.conn.poll(self.timeout):
+                raise TimeoutError(f"No result within {self.timeout}s")
+            detected, score = _RESPONSE.unpack(self.conn.recv_bytes())
+        except (OSError, EOFError, TimeoutError) as e:
+            self.logger.error(f"Detection process failed: {e}")
+            self.process.kill()
+            return False
+        self.last_score = None if math.isnan(score) else score
+        return detected
+
+    def close(self):
+        if self.process is not None:
+            try:
+                self.conn.send_bytes(_REQUEST.pack(_STOP))
+            except OSError:
+                pass
+            self.process.join(timeout=2)
+            if self.process.is_alive():
+                self.process.kill()
+                self.process.join()
+            self.conn.close()
+            self.process = None
+            self.conn = None
+        if self.shm is not None:
+            self.ring = None
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
@@ -0,0 +1,98 @@
+import logging
+import time
+
+
+class DetectionScheduler:
+    """Paces the motion detection loop.
+
+    Detection runs at ``base_fps``, at the full camera ``framerate`` while
+    motion is active or a recording is in progress, and at ``idle_fps`` once
+    nothing has happened for ``idle_after`` seconds. On top of that the
+    thread CPU time spent per detection is tracked, and the interval is
+    stretched so detection uses at most ``cpu_budget`` of one core.
+    """
+
+    def __init__(self, framerate, base_fps=5, idle_fps=1, idle_after=300, cpu_budget=0.5):
+        """
+        Args:
+            framerate (float): Camera framerate; the boosted detection rate.
+            base_fps (float): Detection rate while the scene is quiet. Must be greater than 0.
+            idle_fps (float): Detection rate after ``idle_after`` seconds without motion.
+                0, a negative value or None keeps ``base_fps``.
+            idle_after (float): Seconds without motion before dropping to ``idle_fps``.
+            cpu_budget (float): Fraction of one core detection may use. 0 or None disables the cap.
+        """
+        self.logger = logging.getLogger(__name__)
+        if float(framerate) <= 0:
+            raise ValueError(f"Invalid camera framerate: {framerate}")
+        if float(base_fps) <= 0:
+            raise ValueError(f"Invalid detection_fps: {base_fps} (must be greater than 0)")
+        self.framerate = float(framerate)
+        self.base_fps = min(float(base_fps), self.framerate)
+        self.idle_fps = min(float(idle_fps), self.base_fps) if idle_fps and idle_fps > 0 else self.base_fps
+        self.idle_after = idle_after
+        self.cpu_budget = cpu_budget or None
+        self.mode = "base"
+        self.achieved_fps = 0.0
+        self.cpu_per_detection = 0.0
+        self.throttled = False
+        self._last_activity = time.monotonic()
+        self._cycle_start = None
+        self._cpu_start = None
+        self._last_cycle = None
+
+    def begin(self):
+        """Marks the start of a detection cycle."""
+        self._cycle_start = time.monotonic()
+        self._cpu_start = time.thread_time()
+        if self._last_cycle is not None:
+            elapsed = self._cycle_start - self._last_cycle
+            if elapsed > 0:
+                self.achieved_fps += 0.1 * (1.0 / elapsed - self.achieved_fps)
+        self._last_cycle = self._cycle_start
+
+    def end(self, active):
+        """Ends a detection cycle and sleeps until the next one is due.
+
+        Args:
+            active (bool): Whether motion was detected or a recording is in progress.
+        """
+        now = time.monotonic()
+        cpu = time.thread_time() - self._cpu_start
+        self.cpu_per_detection += 0.1 * (cpu - self.cpu_per_detection)
+
+        if active:
+            self._last_activity = now
+            mode, fps = "boost", self.framerate
+        elif self.idle_after and now - self._last_activity > self.idle_after:
+            mode, fps = "idle", self.idle_fps
+        else:
+            mode, fps = "base", self.base_fps
+        if mode != self.mode:
+            self.logger.debug(f"Detection rate: {mode} ({fps:g} fps).")
+            self.mode = mode
+
+        interval = 1.0 / fps
+        throttled = False
+        if self.cpu_budget and self.cpu_per_detection / interval > self.cpu_budget:
+            interval = self.cpu_per_detection / self.cpu_budget
+            throttled = True
+        if throttled != self.throttled:
+            self.throttled = throttled
+            if throttled:
+                self.logger.warning(
+                    f"Detection limited to {1.0 / interval:.1f} fps by the CPU budget "
+                    f"({self.cpu_per_detection * 1000:.1f} ms per frame)."
+                )
+
+        delay = self._cycle_start + interval - now
+        if delay > 0:
+            time.sleep(delay)
+
+    def status(self):
+        return {
+            "mode": self.mode,
+            "fps": round(self.achieved_fps, 1),
+            "cpu_ms": round(self.cpu_per_detection * 1000, 2),
+            "throttled": self.throttled,
+        }
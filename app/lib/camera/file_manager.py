@@ -1,81 +1,285 @@
 import logging
+import os
 import time
 import tempfile
 import shutil
+from contextlib import contextmanager
 from pathlib import Path
+from app.lib.diagnostics.metrics import STAGE_SECONDS
+from .capture_catalog import CaptureCatalog
+from .clip_preview import preview_paths
+from .motion_timeline import sidecar_path
+
+CLEANUP_SECONDS = STAGE_SECONDS.labels(stage="cleanup")
+
+STAGING_DIR_NAME = ".staging"
+RAM_STAGING_DIR = Path("/dev/shm")
+WRITE_BUFFER_SIZE = 1024 * 1024
+RAM_FILESYSTEMS = {"tmpfs", "ramfs"}
+# On other filesystems (vfat, exfat) glibc emulates fallocate by writing
+# zeros, doubling the writes preallocation is meant to save.
+FALLOCATE_FILESYSTEMS = {"ext4", "xfs", "btrfs", "f2fs"}
+
+
+def _filesystem_type(path):
+    """Returns the type of the filesystem holding ``path`` from /proc/mounts, or None."""
+    try:
+        with open("/proc/mounts") as mounts:
+            entries = [line.split()[1:3] for line in mounts]
+    except OSError:
+        return None
+    path = str(Path(path).resolve())
+    fs_type = None
+    best = -1
+    for mount_point, kind in entries:
+        mount_point = mount_point.replace("\\040", " ")
+        if (path == mount_point or path.startswith(mount_point.rstrip("/") + "/")) and len(mount_point) > best:
+            fs_type, best = kind, len(mount_point)
+    return fs_type
+
 
 class FileManager:
-    def __init__(self, output_dir, max_size_mb=None, max_age_days=None):
+    """Owns the output directory and the staging area recordings are written to first.
+
+    Raw recordings are staged in RAM (a tmpfs such as /dev/shm) while it has
+    room, so the SD card only sees the finished clip. RAM staging is capped at
+    ``staging_ram_mb``; a recording that would exceed the cap continues in
+    ``<output>/.staging`` on the storage itself, and recordings that start
+    while RAM is full are staged there entirely. Because the disk staging area
+    is on the same filesystem as the output directory, publishing a file is
+    an atomic rename, never a second copy.
+    """
+
+    def __init__(self, output_dir, max_size_mb=None, max_age_days=None, staging_dir=None,
+                 staging_ram_mb=48, staging_reserve_mb=16, preallocate=True):
         self.logger = logging.getLogger(__name__)
         self.output_dir = Path(output_dir).resolve()
         self.output_dir.mkdir(exist_ok=True)
-        self.tmp_dir_base = Path(tempfile.gettempdir()) / "motionberry"
-        self.tmp_dir_base.mkdir(exist_ok=True)
         self.max_size_bytes = None if max_size_mb in (None, 0) else max_size_mb * 1024 * 1024
         self.max_age_seconds = None if max_age_days in (None, 0) else max_age_days * 24 * 60 * 60
+
+        self.staging_disk_dir = self.output_dir / STAGING_DIR_NAME
+        self.staging_disk_dir.mkdir(exist_ok=True)
+        # Emptied rather than recreated, so the output directory's mtime stays
+        # unchanged for the catalog's sync check.
+        for stale in self.staging_disk_dir.iterdir():
+            if stale.is_dir():
+                shutil.rmtree(stale, ignore_errors=True)
+            else:
+                stale.unlink(missing_ok=True)
+        self.staging_ram_bytes = max(0, int(staging_ram_mb or 0)) * 1024 * 1024
+        self.staging_reserve_bytes = max(0, int(staging_reserve_mb or 0)) * 1024 * 1024
+        if staging_dir is None:
+            staging_dir = RAM_STAGING_DIR if RAM_STAGING_DIR.is_dir() else tempfile.gettempdir()
+        self.tmp_dir_base = Path(staging_dir) / "motionberry"
+        self.tmp_dir_base.mkdir(exist_ok=True)
+        if not self.staging_ram_bytes or _filesystem_type(self.tmp_dir_base) not in RAM_FILESYSTEMS:
+            # Staging on a disk already costs one write; use the rename-safe directory.
+            self.tmp_dir_base = self.staging_disk_dir
+            self.staging_ram_bytes = 0
+        else:
+            # Recordings left over from a previous run would count against the cap.
+            for stale in self.tmp_dir_base.glob("motion-*"):
+                shutil.rmtree(stale, ignore_errors=True)
+        self.preallocate = (preallocate and hasattr(os, "posix_fallocate")
+                            and _filesystem_type(self.output_dir) in FALLOCATE_FILESYSTEMS)
+
+        self.catalog = CaptureCatalog(self.output_dir)
+        orphans = self.catalog.reconcile()
+        for orphan in orphans:
+            self.logger.info(f"Deleting orphaned sidecar: {orphan}")
+            orphan.unlink(missing_ok=True)
+        if orphans:
+            self.catalog.mark_synced()
+
         self.logger.info(f"FileManager initialized with output directory: {self.output_dir}")
+        if self.staging_ram_bytes:
+            self.logger.info(f"Staging recordings in {self.tmp_dir_base} (up to {staging_ram_mb} MB).")
+        else:
+            self.logger.info(f"Staging recordings in {self.staging_disk_dir}.")
         if self.max_size_bytes is not None:
             self.logger.info(f"Max size: {self.max_size_bytes} bytes ({max_size_mb} MB)")
         if self.max_age_seconds is not None:
             self.logger.info(f"Max age: {self.max_age_seconds} seconds ({max_age_days} days)")
 
     def cleanup_output_directory(self):
-        """Cleans up the output directory by size and age constraints."""
-        allowed_extensions = {"h264", "mkv", "mp4", "jpg"}
-        files = [
-            f for f in sorted(self.output_dir.iterdir(), key=lambda f: f.stat().st_mtime)
-            if f.is_file() and f.suffix.lstrip(".").lower() in allowed_extensions
-        ]
+        """Cleans up the output directory by size and age constraints.
+
+        The candidates come from the capture catalog, so this does not list or
+        stat the directory.
+        """
+        with CLEANUP_SECONDS.time():
+            self._cleanup_output_directory()
 
+    def _cleanup_output_directory(self):
         # Enforce size limit
         if self.max_size_bytes is not None:
-            total_size = sum(f.stat().st_size for f in files)
-            for file in files:
-                if total_size <= self.max_size_bytes:
-                    break
-                if file.exists():
-                    self.logger.info(f"Deleting file to enforce size limit: {file}")
-                    total_size -= file.stat().st_size
-                    file.unlink()
-                else:
-                    self.logger.warning(f"File not found during cleanup: {file}")
+            for name, _ in self.catalog.over_size_limit(self.max_size_bytes):
+                self.logger.info(f"Deleting file to enforce size limit: {self.output_dir / name}")
+                self._delete_with_sidecar(self.output_dir / name)
 
         # Enforce age limit
         if self.max_age_seconds is not None:
-            current_time = time.time()
-            for file in files:
-                if file.exists():
-                    if current_time - file.stat().st_mtime > self.max_age_seconds:
-                        self.logger.info(f"Deleting file to enforce age limit: {file}")
-                        file.unlink()
-                else:
-                    self.logger.warning(f"File not found during cleanup: {file}")
+            for name in self.catalog.older_than(time.time() - self.max_age_seconds):
+                self.logger.info(f"Deleting file to enforce age limit: {self.output_dir / name}")
+                self._delete_with_sidecar(self.output_dir / name)
+
+    def _delete_with_sidecar(self, file):
+        try:
+            file.unlink()
+        except FileNotFoundError:
+            self.logger.warning(f"File not found during cleanup: {file}")
+        sidecar_path(file).unlink(missing_ok=True)
+        for preview in preview_paths(file):
+            preview.unlink(missing_ok=True)
+        self.catalog.remove(file.name)
 
     def move_to_output(self, src, dest_name):
-        """Moves a file to the managed output directory."""
+        """Moves a file to the managed output directory.
+
+        Files on the output filesystem are renamed. Others are copied into the
+        disk staging area first and renamed from there, so a partially copied
+        file never appears in the output directory.
+
+        Returns:
+            Path: The file in the output directory.
+        """
+        src = Path(src)
         dest_path = (self.output_dir / dest_name).resolve()
-        shutil.move(str(src), str(dest_path))
+        if self.is_on_storage(src):
+            os.replace(src, dest_path)
+            self.catalog.add(dest_path)
+        else:
+            with open(src, "rb", buffering=0) as source, \
+                    self.write_output(dest_name, src.stat().st_size) as output:
+                shutil.copyfileobj(source, output, WRITE_BUFFER_SIZE)
+            src.unlink()
         self.logger.info(f"File moved to: {dest_path}")
         return dest_path
 
+    @contextmanager
+    def write_output(self, dest_name, size_hint=0):
+        """Opens a new output file for writing.
+
+        The file is written in the disk staging area through a large buffer,
+        with ``size_hint`` bytes preallocated so the filesystem can place it
+        contiguously, and renamed into the output directory when the block
+        exits without an error. On error it is deleted.
+
+        Args:
+            dest_name (str): File name in the output directory.
+            size_hint (int): Expected size in bytes. The file is truncated to
+                what was actually written.
+
+        Yields:
+            file: Binary file object, seekable.
+        """
+        staged = self.staging_disk_dir / dest_name
+        try:
+            with open(staged, "w+b", buffering=WRITE_BUFFER_SIZE) as output:
+                if size_hint and self.preallocate:
+                    try:
+                        os.posix_fallocate(output.fileno(), 0, size_hint)
+                    except OSError as e:
+                        self.logger.debug(f"Preallocation failed for {staged}: {e}")
+                yield output
+                output.truncate(output.tell())
+            self.publish(staged, dest_name)
+        except BaseException:
+            staged.unlink(missing_ok=True)
+            raise
+
+    def staging_path(self, dest_name):
+        """Path in the disk staging area for an output file written by another process."""
+        return self.staging_disk_dir / dest_name
+
+    def publish(self, staged, dest_name):
+        """Renames a file from the disk staging area into the output directory and catalogs it."""
+        dest_path = (self.output_dir / dest_name).resolve()
+        os.replace(staged, dest_path)
+        self.catalog.add(dest_path)
+        return dest_path
+
+    def is_on_storage(self, path):
+        """Whether ``path`` is on the same filesystem as the output directory."""
+        try:
+            return os.stat(path).st_dev == os.stat(self.output_dir).st_dev
+        except FileNotFoundError:
+            return False
+
+    def staged_storage_bytes(self, raw_path):
+        """Bytes of a staged recording (raw, PTS and spill files) held on the storage.
+
+        Used to report write amplification: these bytes were written to the
+        SD card before conversion even started.
+        """
+        raw_path = Path(raw_path)
+        files = {raw_path, raw_path.with_suffix(".pts"), self.spill_path(raw_path)}
+        return sum(f.stat().st_size for f in files if f.exists() and self.is_on_storage(f))
+
+    def ram_headroom(self, raw_path):
+        """Bytes a recording staged in RAM may still grow by before it spills to disk.
+
+        Returns:
+            int: Remaining bytes, or None if the recording is not staged in RAM.
+        """
+        # The raw file may not exist yet, so judge by the directory it goes in.
+        parent = Path(raw_path).parent
+        if (not self.staging_ram_bytes or self.staging_disk_dir in (parent, *parent.parents)
+                or self.is_on_storage(parent)):
+            return None
+        used = self._staged_ram_bytes()
+        free = shutil.disk_usage(self.tmp_dir_base).free - self.staging_reserve_bytes
+        return max(0, min(self.staging_ram_bytes - used, free))
+
+    def spill_path(self, raw_path):
+        """Disk file that continues a RAM-staged recording once the RAM cap is reached."""
+        raw_path = Path(raw_path)
+        return self.staging_disk_dir / raw_path.parent.name / raw_path.name
+
+    def open_raw(self, raw_path):
+        """Opens a staged raw recording for reading, including any part spilled to disk.
+
+        Returns:
+            file: Readable binary file object.
+        """
+        spill = self.spill_path(raw_path)
+        if Path(raw_path).parent != spill.parent and spill.exists():
+            return _ConcatenatedReader([raw_path, spill])
+        return open(raw_path, "rb")
+
     def cleanup_tmp_dir(self, tmp_dir):
-        """Cleans up a specific temporary directory."""
-        if tmp_dir.exists():
-            shutil.rmtree(tmp_dir)
-            self.logger.debug(f"Temporary directory deleted: {tmp_dir}")
+        """Cleans up a specific temporary directory, and its spilled part on disk."""
+        for directory in (Path(tmp_dir), self.staging_disk_dir / Path(tmp_dir).name):
+            if directory.exists():
+                shutil.rmtree(directory)
+                self.logger.debug(f"Temporary directory deleted: {directory}")
 
     def delete_file(self, file_path):
         """Deletes a single file."""
         if file_path.exists():
             file_path.unlink()
+            self.catalog.remove(file_path.name)
             self.logger.info(f"Deleted file: {file_path}")
 
     def _create_tmp_dir(self):
-        """Creates a unique temporary directory for a session."""
-        tmp_dir = Path(tempfile.mkdtemp(prefix="motion-", dir=self.tmp_dir_base))
+        """Creates a unique temporary directory for a session.
+
+        The directory is in RAM unless RAM staging is disabled or has less
+        than the reserve left, in which case it is in the disk staging area.
+        """
+        base = self.tmp_dir_base
+        headroom = self.ram_headroom(base)
+        if headroom is not None and headroom < max(self.staging_reserve_bytes, WRITE_BUFFER_SIZE):
+            self.logger.warning("RAM staging is full. Staging recording on disk.")
+            base = self.staging_disk_dir
+        tmp_dir = Path(tempfile.mkdtemp(prefix="motion-", dir=base))
         self.logger.debug(f"Temporary directory created: {tmp_dir}")
         return tmp_dir
 
+    def _staged_ram_bytes(self):
+        return sum(f.stat().st_size for f in self.tmp_dir_base.glob("*/*") if f.is_file())
+
     def _generate_tmp_filename(self, tmp_dir, extension):
         """Generates a filename with a timestamp and the given extension in the temporary directory."""
         timestamp = time.strftime('%Y-%m-%d_%H-%M-%S')
@@ -91,4 +295,29 @@ class FileManager:
         pts_file = raw_file.with_suffix(".pts") 
         self.logger.debug(f"Raw file path generated: {raw_file}")
         self.logger.debug(f"PTS file path generated: {pts_file}")
-        return raw_file, pts_file
\ No newline at end of file
+        return raw_file, pts_file
+
+
+class _ConcatenatedReader:
+    """Reads several files as one stream."""
+
+    def __init__(self, paths):
+        self._paths = list(paths)
+        self._file = open(self._paths.pop(0), "rb")
+
+    def read(self, size=-1):
+        while True:
+            data = self._file.read(size)
+            if data or not self._paths:
+                return data
+            self._file.close()
+            self._file = open(self._paths.pop(0), "rb")
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
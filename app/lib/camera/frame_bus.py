@@ -0,0 +1,164 @@
+import logging
+import threading
+import time
+from collections import deque
+
+
+class Frame:
+    """A single frame published on the FrameBus."""
+
+    __slots__ = ("sequence", "timestamp", "stream", "array")
+
+    def __init__(self, sequence, timestamp, stream, array):
+        self.sequence = sequence
+        self.timestamp = timestamp
+        self.stream = stream
+        self.array = array
+
+
+class FrameSubscription:
+    """Receives frames for one stream from a FrameBus.
+
+    A subscription in "latest" mode only ever holds the newest frame, so a slow
+    consumer skips frames instead of falling behind. In "every" mode frames are
+    queued up to ``maxlen``; when the queue overflows the oldest frame is
+    dropped and counted in ``dropped``.
+    """
+
+    def __init__(self, bus, stream, mode="latest", maxlen=30):
+        if mode not in ("latest", "every"):
+            raise ValueError(f"Unknown subscription mode: {mode}")
+        self.bus = bus
+        self.stream = stream
+        self.mode = mode
+        self.dropped = 0
+        self.last_sequence = 0
+        self._frames = deque(maxlen=1 if mode == "latest" else maxlen)
+        self._condition = threading.Condition()
+        self._closed = False
+
+    @property
+    def wants_frame(self):
+        """True if this subscriber would consume a newly published frame."""
+        return self.mode == "every" or not self._frames
+
+    def _push(self, frame):
+        with self._condition:
+            if self.mode == "every" and len(self._frames) == self._frames.maxlen:
+                self.dropped += 1
+            self._frames.append(frame)
+            self._condition.notify_all()
+
+    def get(self, timeout=None):
+        """Waits for the next frame and returns it, or None on timeout/close."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while not self._frames and not self._closed:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._condition.wait(remaining)
+            if not self._frames:
+                return None
+            frame = self._frames.popleft()
+            self.last_sequence = frame.sequence
+            return frame
+
+    def close(self):
+        """Detaches from the bus and wakes any waiting consumer."""
+        self.bus.unsubscribe(self)
+        with self._condition:
+            self._closed = True
+            self._frames.clear()
+            self._condition.notify_all()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class FrameBus:
+    """Fans frames from a single capture producer out to any number of consumers.
+
+    The producer calls ``publish`` once per completed camera request and skips
+    any stream no consumer is waiting on, so idle streams cost nothing and
+    extra consumers never add capture work.
+    """
+
+    STREAMS = ("lores", "main")
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._subscribers = {stream: [] for stream in self.STREAMS}
+        self._latest = {}
+        self.sequence = 0
+        self.last_publish_time = None
+
+    def subscribe(self, stream, mode="latest", maxlen=30):
+        """Creates a subscription for ``stream`` with "latest" or "every" semantics."""
+        if stream not in self._subscribers:
+            raise ValueError(f"Unknown stream: {stream}")
+        subscription = FrameSubscription(self, stream, mode=mode, maxlen=maxlen)
+        with self._lock:
+            self._subscribers[stream].append(subscription)
+            self.logger.debug(
+                f"Subscribed to {stream} ({mode}). Subscribers: {len(self._subscribers[stream])}"
+            )
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.stream, [])
+            if subscription in subscribers:
+                subscribers.remove(subscription)
+                self.logger.debug(
+                    f"Unsubscribed from {subscription.stream}. Subscribers: {len(subscribers)}"
+                )
+
+    def wants(self, stream):
+        """Returns True if any consumer of ``stream`` is waiting for a new frame.
+
+        A "latest" subscriber that has not yet consumed its pending frame does
+        not count, so slow consumers do not force a copy of every request.
+        """
+        return any(s.wants_frame for s in self._subscribers.get(stream, ()))
+
+    def subscriber_count(self, stream=None):
+        with self._lock:
+            if stream is not None:
+                return len(self._subscribers.get(stream, []))
+            return sum(len(s) for s in self._subscribers.values())
+
+    def publish(self, frames, timestamp=None):
+        """Publishes the arrays of one camera request.
+
+        Args:
+            frames (dict): Mapping of stream name to numpy array.
+            timestamp (float, optional): Capture time in seconds (monotonic).
+
+        Returns:
+            int: The sequence number assigned to this request.
+        """
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        with self._lock:
+            self.sequence += 1
+            sequence = self.sequence
+            self.last_publish_time = time.monotonic()
+            targets = []
+            for stream, array in frames.items():
+                if array is None:
+                    continue
+                frame = Frame(sequence, timestamp, stream, array)
+                self._latest[stream] = frame
+                targets.extend((subscription, frame) for subscription in self._subscribers.get(stream, []))
+
+        for subscription, frame in targets:
+            subscription._push(frame)
+        return sequence
+
+    def latest(self, stream):
+        """Returns the most recently published frame for ``stream``, if any."""
+        return self._latest.get(stream)
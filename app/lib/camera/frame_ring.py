@@ -0,0 +1,68 @@
+import logging
+
+import numpy as np
+
+
+class FrameRing:
+    """Fixed ring of same-sized uint8 frames in one contiguous (N, h, w) array.
+
+    Frames are copied into the next slot on append, so the ring's memory is
+    allocated once and never churns. Readers get views into the ring; a view
+    stays valid until its slot is overwritten ``slots`` appends later, so
+    anything kept longer (a preview, for example) has to be copied.
+    ``buffer`` lets the ring live in memory owned by someone else, such as a
+    multiprocessing SharedMemory block.
+    """
+
+    def __init__(self, slots, shape, buffer=None):
+        """
+        Args:
+            slots (int): Number of frames held.
+            shape (tuple): (height, width) of each frame.
+            buffer (optional): Object exposing the buffer protocol of at least
+                ``slots * height * width`` bytes. Allocated if omitted.
+        """
+        self.logger = logging.getLogger(__name__)
+        self.slots = max(1, int(slots))
+        self.shape = tuple(shape)
+        if buffer is None:
+            self.frames = np.zeros((self.slots, *self.shape), dtype=np.uint8)
+        else:
+            self.frames = np.ndarray((self.slots, *self.shape), dtype=np.uint8, buffer=buffer)
+        self.count = 0
+        self.index = 0
+
+    @staticmethod
+    def required_bytes(slots, shape):
+        return int(slots) * int(np.prod(shape))
+
+    @property
+    def nbytes(self):
+        return self.frames.nbytes
+
+    def __len__(self):
+        return min(self.count, self.slots)
+
+    def append(self, frame):
+        """Copies ``frame`` into the next slot and returns that slot's index."""
+        slot = self.index
+        np.copyto(self.frames[slot], frame)
+        self.index = (slot + 1) % self.slots
+        self.count += 1
+        return slot
+
+    def latest(self):
+        """Returns a view of the most recent frame, or None if the ring is empty."""
+        if self.count == 0:
+            return None
+        return self.frames[(self.index - 1) % self.slots]
+
+    def get(self, age=0):
+        """Returns a view of the frame ``age`` appends before the latest one."""
+        if age >= len(self):
+            return None
+        return self.frames[(self.index - 1 - age) % self.slots]
+
+    def clear(self):
+        self.count = 0
+        self.index = 0
@@ -0,0 +1,75 @@
+import logging
+import threading
+import time
+
+
+class FrameWatchdog:
+    """Detects frame stalls and triggers a single recovery per stall.
+
+    The capture producer calls ``frame_received`` for every completed request.
+    While ``is_active`` reports the camera as running, a background thread
+    checks how long it has been since the last frame; once that exceeds
+    ``stall_timeout`` the watchdog marks the pipeline as stalled and calls
+    ``on_stall`` once. If frames still have not resumed ``retry_interval``
+    seconds later, recovery is attempted again; this continues while the
+    camera is down after a failed recovery. Consumers check ``stalled`` to
+    fail fast instead of waiting out their own timeouts.
+    """
+
+    def __init__(self, on_stall, is_active, stall_timeout=5, retry_interval=60, check_interval=0.5):
+        self.logger = logging.getLogger(__name__)
+        self.on_stall = on_stall
+        self.is_active = is_active
+        self.stall_timeout = stall_timeout
+        self.retry_interval = retry_interval
+        self.check_interval = check_interval
+        self.last_recovery_time = None
+        self.last_frame_time = time.monotonic()
+        self.stalled = False
+        self.stall_count = 0
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="frame-watchdog", daemon=True)
+        self._thread.start()
+
+    def frame_received(self):
+        self.last_frame_time = time.monotonic()
+        if self.stalled:
+            self.logger.info("Frames resumed after stall.")
+            self.stalled = False
+
+    def reset(self):
+        """Restarts the stall timer and clears a stall, e.g. after the camera is (re)started."""
+        self.last_frame_time = time.monotonic()
+        self.stalled = False
+
+    def seconds_since_last_frame(self):
+        return time.monotonic() - self.last_frame_time
+
+    def _run(self):
+        while not self._stop_event.wait(self.check_interval):
+            try:
+                if not self.is_active():
+                    if not self.stalled:
+                        # Stopped on purpose; only a failed recovery is retried.
+                        self.last_frame_time = time.monotonic()
+                        continue
+                    if time.monotonic() - self.last_recovery_time >= self.retry_interval:
+                        self.logger.error("Camera is still down after a failed restart. Retrying...")
+                        self.last_recovery_time = time.monotonic()
+                        self.on_stall()
+                    continue
+                silence = self.seconds_since_last_frame()
+                if silence <= self.stall_timeout:
+                    continue
+                if self.stalled and time.monotonic() - self.last_recovery_time < self.retry_interval:
+                    continue
+                self.stalled = True
+                self.stall_count += 1
+                self.last_recovery_time = time.monotonic()
+                self.logger.error(f"No frames for {silence:.1f}s. Restarting camera...")
+                self.on_stall()
+            except Exception as e:
+                self.logger.error(f"Error in frame watchdog: {e}", exc_info=True)
+
+    def stop(self):
+        self._stop_event.set()
@@ -0,0 +1,194 @@
+import logging
+import math
+import threading
+import time
+from collections import deque
+
+from app.lib.diagnostics.metrics import REGISTRY
+from app.lib.transcode.fmp4 import TIMESCALE, init_segment, media_fragment, to_avcc_sample
+
+
+class _Segment:
+    __slots__ = ("sequence", "data", "duration")
+
+    def __init__(self, sequence, data, duration):
+        self.sequence = sequence
+        self.data = data
+        self.duration = duration
+
+
+class LiveSegmenter:
+    """Serves the camera's H.264 stream as HLS with fragmented MP4 segments.
+
+    The encoded packets CameraManager already produces are repackaged into
+    keyframe-aligned fMP4 fragments of roughly ``target_duration`` seconds.
+    The newest ``window`` segments are kept in memory, so any number of
+    viewers share one encoder and nothing is written to disk. The stream
+    starts when a viewer requests the playlist and stops once nobody has
+    fetched anything for ``idle_timeout`` seconds.
+    """
+
+    def __init__(self, camera_manager, target_duration=2, window=6, idle_timeout=30):
+        self.logger = logging.getLogger(__name__)
+        self.camera_manager = camera_manager
+        self.target_duration = float(target_duration)
+        self.window = max(3, int(window))
+        self.idle_timeout = float(idle_timeout)
+        self.frame_interval_us = int(1_000_000 / camera_manager.backend.framerate)
+        self.is_active = False
+        self.last_access = 0
+        self.init_data = None
+        self.segments = deque(maxlen=self.window)
+        self.bytes_served = 0
+        self._condition = threading.Condition()
+        self._reaper = None
+        self._reset_stream()
+        REGISTRY.gauge("motionberry_live_stream_active", "1 while the HLS live stream is running.").set_function(
+            lambda: int(self.is_active))
+        REGISTRY.gauge("motionberry_live_bytes_served", "Bytes of HLS segments served.").set_function(
+            lambda: self.bytes_served)
+
+    def _reset_stream(self):
+        self._sps = None
+        self._pps = None
+        self._pending = []
+        self._origin = None
+        self._offset = 0
+        self._last_timestamp = None
+        self._sequence = 0
+
+    def touch(self):
+        """Records viewer activity, starting the stream if it is not running."""
+        with self._condition:
+            self.last_access = time.monotonic()
+            if self.is_active:
+                return
+            self.is_active = True
+            self.init_data = None
+            self.segments.clear()
+            self._reset_stream()
+        self.logger.info("Live stream started.")
+        self.camera_manager.start_camera()
+        self.camera_manager.acquire_packet_stream(self._on_packet)
+        self._reaper = threading.Thread(target=self._reap_idle, name="live-segmenter", daemon=True)
+        self._reaper.start()
+
+    def stop(self):
+        with self._condition:
+            if not self.is_active:
+                return
+            self.is_active = False
+            self._condition.notify_all()
+        self.camera_manager.release_packet_stream(self._on_packet)
+        self.camera_manager.stop_camera()
+        self.logger.info(f"Live stream stopped. {self.bytes_served / (1024 * 1024):.1f} MB served.")
+
+    def _reap_idle(self):
+        while self.is_active:
+            time.sleep(1)
+            if time.monotonic() - self.last_access > self.idle_timeout:
+                self.logger.debug("No live viewers left.")
+                self.stop()
+
+    def _decode_time(self, timestamp):
+        return round((timestamp - self._origin) * TIMESCALE / 1_000_000)
+
+    def _on_packet(self, packet):
+        """Collects packets into a fragment and cuts it at the next keyframe past the target duration."""
+        sample, sps, pps = to_avcc_sample(packet.data)
+        timestamp = packet.timestamp + self._offset
+        if self._last_timestamp is not None and timestamp <= self._last_timestamp:
+            # The encoder was restarted. Keep decode times increasing.
+            self._offset += self._last_timestamp + self.frame_interval_us - timestamp
+            timestamp = self._last_timestamp + self.frame_interval_us
+        self._last_timestamp = timestamp
+
+        if (sps and sps != self._sps) or (pps and pps != self._pps):
+            self._sps = sps or self._sps
+            self._pps = pps or self._pps
+            if self._sps and self._pps:
+                with self._condition:
+                    if self.init_data is not None:
+                        # New stream parameters: players have to start over.
+                        self.segments.clear()
+                        self._pending = []
+                    self.init_data = init_segment(self._sps, self._pps)
+        if self.init_data is None:
+            return
+
+        if packet.keyframe and self._pending:
+            if (timestamp - self._pending[0][1]) / 1_000_000 >= self.target_duration:
+                self._cut_segment(timestamp)
+        if not self._pending and not packet.keyframe:
+            return
+        if self._origin is None:
+            self._origin = timestamp
+        self._pending.append((sample, timestamp, packet.keyframe))
+
+    def _cut_segment(self, next_timestamp):
+        pending, self._pending = self._pending, []
+        timestamps = [timestamp for _, timestamp, _ in pending] + [next_timestamp]
+        decode_times = [self._decode_time(timestamp) for timestamp in timestamps]
+        samples = [
+            (data, decode_times[i + 1] - decode_times[i], keyframe)
+            for i, (data, _, keyframe) in enumerate(pending)
+        ]
+        self._sequence += 1
+        data = media_fragment(self._sequence, decode_times[0], samples)
+        duration = (decode_times[-1] - decode_times[0]) / TIMESCALE
+        with self._condition:
+            self.segments.append(_Segment(self._sequence, data, duration))
+            self._condition.notify_all()
+
+    def _wait_for_segments(self, timeout):
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self.is_active and not self.segments:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            return list(self.segments), self.init_data
+
+    def playlist(self, timeout=None):
+        """Returns the media playlist, or None if no segment is ready yet.
+
+        Args:
+            timeout (float): Seconds to wait for the first segment when the
+                stream is just starting. Defaults to twice the target duration.
+        """
+        self.touch()
+        if timeout is None:
+            timeout = self.target_duration * 2 + 1
+        segments, init_data = self._wait_for_segments(timeout)
+        if not segments or init_data is None:
+            return None
+
+        target = max(math.ceil(self.target_duration), *(math.ceil(s.duration) for s in segments))
+        lines = [
+            "#EXTM3U",
+            "#EXT-X-VERSION:7",
+            f"#EXT-X-TARGETDURATION:{target}",
+            f"#EXT-X-MEDIA-SEQUENCE:{segments[0].sequence}",
+            "#EXT-X-INDEPENDENT-SEGMENTS",
+            '#EXT-X-MAP:URI="init.mp4"',
+        ]
+        for segment in segments:
+            lines.append(f"#EXTINF:{segment.duration:.3f},")
+            lines.append(f"segment_{segment.sequence}.m4s")
+        return "\n".join(lines) + "\n"
+
+    def init(self):
+        self.touch()
+        with self._condition:
+            return self.init_data
+
+    def segment(self, sequence):
+        """Returns the bytes of a segment still in the window, or None."""
+        self.touch()
+        with self._condition:
+            for segment in self.segments:
+                if segment.sequence == sequence:
+                    self.bytes_served += len(segment.data)
+                    return segment.data
+        return None
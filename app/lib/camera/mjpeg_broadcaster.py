@@ -0,0 +1,130 @@
+import io
+import logging
+import threading
+import time
+from PIL import Image
+from app.lib.diagnostics.metrics import REGISTRY, STAGE_SECONDS
+
+JPEG_ENCODE_SECONDS = STAGE_SECONDS.labels(stage="jpeg_encode")
+JPEG_FRAMES = REGISTRY.counter("motionberry_mjpeg_frames", "JPEG frames published to live view clients.", ["stream"])
+
+
+class MjpegBroadcaster:
+    """Encodes each frame of a stream to JPEG once and shares it with every client.
+
+    In "software" mode a single thread reads the frame bus and encodes with
+    PIL. In "hardware" mode the camera backend's MJPEG encoder delivers the
+    JPEG bytes directly. Either way the multipart chunk is built once per frame,
+    so each connected client only has to write bytes to its socket.
+    """
+
+    def __init__(self, camera_manager, stream="main", encoder="software", quality=75, max_fps=10):
+        self.logger = logging.getLogger(__name__)
+        self._frames_metric = JPEG_FRAMES.labels(stream=stream)
+        self.camera_manager = camera_manager
+        self.stream = stream
+        self.encoder = encoder
+        self.quality = quality
+        self.min_interval = 1.0 / max_fps if max_fps else 0
+        self.chunk = None
+        self.sequence = 0
+        self.frames_encoded = 0
+        self._condition = threading.Condition()
+        self._running = False
+        self._thread = None
+        self._subscription = None
+        self._last_publish = 0
+
+        if self.encoder == "hardware" and not (
+            stream == "main" and self.camera_manager.backend.supports_mjpeg_encoder
+        ):
+            self.logger.warning(
+                f"Hardware MJPEG encoding is not available for the {stream} stream. Using software encoding."
+            )
+            self.encoder = "software"
+        if self.encoder == "hardware":
+            self.camera_manager.restart_listeners.append(self._on_camera_restart)
+
+    def start(self):
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+        if self.encoder == "hardware":
+            self.camera_manager.backend.start_mjpeg_encoder(self._on_jpeg, quality=self.quality)
+        else:
+            self._subscription = self.camera_manager.frame_bus.subscribe(self.stream)
+            self._thread = threading.Thread(
+                target=self._encode_loop, name=f"mjpeg-{self.stream}", daemon=True
+            )
+            self._thread.start()
+        self.logger.info(f"MJPEG broadcaster started for {self.stream} stream ({self.encoder}).")
+
+    def stop(self):
+        with self._condition:
+            if not self._running:
+                return
+            self._running = False
+            self._condition.notify_all()
+        if self.encoder == "hardware":
+            self.camera_manager.backend.stop_mjpeg_encoder()
+        elif self._thread is not None:
+            self._subscription.close()
+            self._thread.join()
+            self._thread = None
+        self.logger.info(f"MJPEG broadcaster stopped for {self.stream} stream.")
+
+    def _on_camera_restart(self):
+        """Re-attaches the hardware encoder to the newly configured camera."""
+        if self._running:
+            self.camera_manager.backend.start_mjpeg_encoder(self._on_jpeg, quality=self.quality)
+
+    def _encode_loop(self):
+        while self._running:
+            frame = self.camera_manager.read_frame(self._subscription)
+            if frame is None:
+                if self._running:
+                    self.logger.warning("Captured frame is None. Skipping this frame.")
+                    time.sleep(0.25)
+                continue
+            try:
+                stream_bytes = io.BytesIO()
+                with JPEG_ENCODE_SECONDS.time():
+                    Image.fromarray(frame).save(stream_bytes, format="JPEG", quality=self.quality)
+                self._on_jpeg(stream_bytes.getvalue())
+            except Exception as e:
+                self.logger.error("Error processing frame: %s", e, exc_info=True)
+            self._throttle()
+
+    def _throttle(self):
+        delay = self.min_interval - (time.monotonic() - self._last_publish)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _on_jpeg(self, jpeg):
+        """Publishes one encoded JPEG to all waiting clients."""
+        now = time.monotonic()
+        if self.encoder == "hardware" and now - self._last_publish < self.min_interval:
+            return
+        chunk = b"--frame\r\nContent-Type: image/jpeg\r\n\r\n" + bytes(jpeg) + b"\r\n"
+        with self._condition:
+            self.chunk = chunk
+            self.sequence += 1
+            self.frames_encoded += 1
+            self._frames_metric.inc()
+            self._last_publish = now
+            self._condition.notify_all()
+
+    def wait_for_chunk(self, last_sequence, timeout=None):
+        """Blocks until a chunk newer than ``last_sequence`` is available.
+
+        Returns:
+            tuple: (sequence, chunk), or (last_sequence, None) on timeout or stop.
+        """
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self.sequence != last_sequence or not self._running, timeout
+            )
+            if self.sequence == last_sequence or not self._running:
+                return last_sequence, None
+            return self.sequence, self.chunk
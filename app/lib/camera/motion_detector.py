@@ -2,11 +2,17 @@ import time
 import logging
 from collections import deque
 from threading import Thread
-import numpy as np
-from PIL import Image
-import io
 
 from .algorithms import get_motion_algorithm
+from .detection_scheduler import DetectionScheduler
+from .detection_process import DetectionProcess
+from .clip_preview import luma_to_jpeg
+from .frame_ring import FrameRing
+from .motion_timeline import MotionTimeline, sidecar_path
+from app.lib.diagnostics.metrics import REGISTRY, STAGE_SECONDS
+
+DETECT_SECONDS = STAGE_SECONDS.labels(stage="detect")
+MOTION_EVENTS = REGISTRY.counter("motionberry_motion_events", "Motion events that started a recording.")
 
 class MotionDetector:
     """Detects motion in video frames and manages recording based on configured thresholds."""
@@ -24,6 +30,10 @@ class MotionDetector:
         buffer_duration=2,
         ae_awb_adjust_interval=300,
         adjustment_duration=5,
+        scheduler=None,
+        mask=None,
+        separate_process=False,
+        preview=None,
     ):
         """Initialize the MotionDetector with camera and motion detection settings.
 
@@ -39,12 +49,22 @@ class MotionDetector:
             buffer_duration (float): Duration of frame buffer in seconds.
             ae_awb_adjust_interval (float): Interval in seconds to re-enable AE/AWB for adjustment.
             adjustment_duration (float): Duration in seconds to allow AE/AWB to adjust before disabling.
+            scheduler (DetectionScheduler, optional): Paces detection. Defaults to 5 fps,
+                boosted to the camera framerate during motion.
+            mask (DetectionMask, optional): Region of the frame to detect motion in.
+            separate_process (bool): Run the algorithm in a worker process fed through shared memory.
+            preview (PreviewRecorder, optional): Samples colour frames of each clip for its
+                poster and animated preview. Without it the poster is the grayscale
+                detection frame that triggered the recording.
         """
         self.logger = logging.getLogger(__name__)
         self.camera_manager = camera_manager
         self.motion_threshold = motion_threshold
         self.motion_gap = motion_gap
-        self.algorithm = get_motion_algorithm(algorithm, motion_threshold, blur_strength)
+        if separate_process:
+            self.algorithm = DetectionProcess(algorithm, motion_threshold, blur_strength, mask=mask)
+        else:
+            self.algorithm = get_motion_algorithm(algorithm, motion_threshold, blur_strength, mask=mask)
         self.min_clip_length = None if min_clip_length == 0 else min_clip_length
         self.max_clip_length = None if max_clip_length == 0 else max_clip_length
         if min_clip_length == 0:
@@ -52,76 +72,116 @@ class MotionDetector:
         if max_clip_length == 0:
             self.logger.warning("max_clip_length set to 0, treating as None.")
         self.notifiers = notifiers or []
-        self.frame_buffer = deque(maxlen=int(buffer_duration * self.camera_manager.framerate))
+        self.scheduler = scheduler or DetectionScheduler(self.camera_manager.framerate)
+        width, height = self.camera_manager.detect_size
+        self.frame_buffer = FrameRing(int(buffer_duration * self.camera_manager.framerate), (height, width))
+        self.logger.info(
+            f"Frame buffer: {self.frame_buffer.slots} frames of {width}x{height}, "
+            f"{self.frame_buffer.nbytes / (1024 * 1024):.1f} MB."
+        )
+        # Scores of the buffered frames, so a clip's timeline also covers its pre-roll.
+        self.score_history = deque(maxlen=self.frame_buffer.slots)
+        self.timeline = None
         self.preview_frame = None
+        self.preview = preview
         self.is_running = False
         self.last_motion_time = 0
         self.recording_start_time = None
         self.grace_period = 5
         self.start_time = None
         self.thread = None
+        self.subscription = None
         self.ae_awb_adjust_interval = ae_awb_adjust_interval
         self.adjustment_duration = adjustment_duration
         self.last_adjustment_time = None
         self.is_adjusting = False
         self.adjustment_start_time = None
+        REGISTRY.gauge("motionberry_detection_fps", "Achieved motion detection rate.").set_function(
+            lambda: self.scheduler.achieved_fps if self.is_running else 0)
+        REGISTRY.gauge("motionberry_detection_cpu_seconds", "Average CPU time per detection.").set_function(
+            lambda: self.scheduler.cpu_per_detection)
+        REGISTRY.gauge("motionberry_detection_running", "1 while motion detection is enabled.").set_function(
+            lambda: int(self.is_running))
         self._notify("application_started")
 
-    def _save_buffer_frame_as_jpeg(self, frame):
-        """Convert a frame to JPEG format for preview.
-
-        Args:
-            frame (np.ndarray): Frame to convert.
-
-        Returns:
-            bytes: JPEG data, or None if conversion fails.
-        """
-        if frame is None or frame.size == 0 or len(frame.shape) not in (2, 3):
-            self.logger.warning("Invalid frame shape or empty frame. Failed to generate preview.")
-            return None
-
-        try:
-            if len(frame.shape) == 2:
-                y_plane = frame
-            else:
-                y_plane = frame[:, :, 0]
-                self.logger.debug(f"Y plane extracted, shape: {y_plane.shape}")
-
-            y_plane = np.clip(y_plane, 0, 255).astype(np.uint8)
-            pil_img = Image.fromarray(y_plane, mode="L")
-            buffer = io.BytesIO()
-            pil_img.save(buffer, format="JPEG")
-            return buffer.getvalue()
-
-        except Exception as e:
-            self.logger.error(f"Failed to generate JPEG from frame: {e}", exc_info=True)
-            return None
-
     def _stop_recording(self, reason, elapsed):
-        """Stop recording, reset state, and notify listeners.
+        """Stop recording, reset state, and notify listeners once the clip is saved.
+
+        The clip is converted in the background; motion_stopped is sent when
+        that has finished, so the notification refers to a file that exists.
 
         Args:
             reason (str): Reason for stopping (e.g., 'max_clip_length', 'motion_gap').
             elapsed (float): Duration of the recording in seconds.
         """
         self.logger.info(f"Stopping recording due to {reason}.")
-        path = self.camera_manager.stop_recording()
         self.recording_start_time = None
-        preview_jpeg = self._save_buffer_frame_as_jpeg(self.preview_frame)
+        timeline, self.timeline = self.timeline, None
+        preview = self.preview.stop() if self.preview is not None else None
+        trigger_frame, self.preview_frame = self.preview_frame, None
+        clip_duration = round(elapsed)
+
+        def on_done(job):
+            self._on_clip_saved(job.output_path, timeline, preview, trigger_frame, clip_duration)
+
+        job = self.camera_manager.stop_recording(on_done=on_done)
+        if job is None:
+            self.logger.error("Failed to stop recording: stop_recording returned None")
+            self.camera_manager.is_recording = False
+            self._on_clip_saved(None, None, None, trigger_frame, clip_duration)
+
+    def _on_clip_saved(self, path, timeline, preview, trigger_frame, clip_duration):
+        """Saves the clip's motion timeline and previews, and sends motion_stopped.
+
+        Runs on the transcode worker, so image encoding never delays detection.
+
+        Args:
+            path (Path): The saved clip, or None if recording or conversion failed.
+            timeline (MotionTimeline): Scores recorded during the clip.
+            preview (ClipPreview): Colour frames sampled during the clip, if any.
+            trigger_frame (np.ndarray): Detection frame that started the recording,
+                the poster when no colour frames were sampled.
+            clip_duration (int): Duration of the recording in seconds.
+        """
+        if path is not None and timeline is not None:
+            try:
+                timeline.save(sidecar_path(path))
+            except OSError as e:
+                self.logger.error(f"Failed to save motion timeline: {e}")
+        preview_jpeg = None
+        if path is not None and preview is not None:
+            try:
+                preview_jpeg = preview.render(path, timeline.peak_time() if timeline is not None else None)
+            except Exception as e:
+                self.logger.error(f"Failed to save clip preview: {e}", exc_info=True)
+        if path is not None:
+            self.camera_manager.file_manager.catalog.refresh_sidecars(path)
+        if preview_jpeg is None:
+            try:
+                preview_jpeg = luma_to_jpeg(trigger_frame)
+            except Exception as e:
+                self.logger.error(f"Failed to generate JPEG from frame: {e}", exc_info=True)
+            if preview_jpeg is None:
+                self.logger.warning("Invalid frame shape or empty frame. Failed to generate preview.")
         notify_data = {
             "filepath": str(path) if path else None,
             "filename": str(path.name) if path else None,
             "preview_jpeg": preview_jpeg,
-            "clip_duration": round(elapsed),
+            "clip_duration": clip_duration,
         }
-        if path is None:
-            self.logger.error("Failed to stop recording: stop_recording returned None")
-            self.camera_manager.is_recording = False
         self._notify("motion_stopped", notify_data)
 
+    def _start_timeline(self, current_time):
+        """Starts the score timeline of a new clip, including the buffered scores it covers."""
+        start = current_time - self.camera_manager.current_clip_preroll
+        self.timeline = MotionTimeline(start, self.algorithm.score_threshold)
+        for timestamp, score in self.score_history:
+            self.timeline.append(timestamp, score)
+
     def _motion_detection_loop(self):
         """Main loop for detecting motion and managing recordings."""
         self.camera_manager.start_camera()
+        self.subscription = self.camera_manager.frame_bus.subscribe("lores")
         time.sleep(5)
         self.start_time = time.time()
         self.camera_manager.disable_ae_awb()
@@ -129,6 +189,7 @@ class MotionDetector:
 
         while self.is_running:
             try:
+                self.scheduler.begin()
                 current_time = time.time()
 
                 # Check for periodic AE/AWB adjustment
@@ -148,16 +209,26 @@ class MotionDetector:
                         self.last_adjustment_time = current_time
                         self.logger.info("AE/AWB adjustment completed.")
 
-                frame = self.camera_manager.capture_image_array("lores")
+                frame = self.camera_manager.read_frame(self.subscription)
 
                 if frame is None:
                     self.logger.warning("Captured frame is None. Camera restart?")
                     time.sleep(0.5)
                     continue
 
+                if frame.shape != self.frame_buffer.shape:
+                    self.logger.warning(f"Frame shape {frame.shape} differs from detect_size. Reallocating frame buffer.")
+                    self.frame_buffer = FrameRing(self.frame_buffer.slots, frame.shape)
                 self.frame_buffer.append(frame)
 
-                detected = self.algorithm.detect(frame)
+                with DETECT_SECONDS.time():
+                    detected = self.algorithm.detect(frame)
+
+                score = self.algorithm.last_score
+                if score is not None:
+                    self.score_history.append((current_time, score))
+                    if self.timeline is not None:
+                        self.timeline.append(current_time, score)
 
                 if self.camera_manager.is_recording:
                     elapsed = current_time - self.recording_start_time
@@ -188,16 +259,25 @@ class MotionDetector:
                         if not self.camera_manager.is_recording:
                             self.camera_manager.start_recording()
                             self.recording_start_time = current_time
-                            self.preview_frame = self.frame_buffer[-1] if self.frame_buffer else None
+                            self._start_timeline(current_time)
+                            latest = self.frame_buffer.latest()
+                            # The ring slot is reused, so the preview keeps its own copy.
+                            self.preview_frame = latest.copy() if latest is not None else None
+                            if self.preview is not None:
+                                self.preview.start()
+                            MOTION_EVENTS.inc()
                             self._notify("motion_started")
                         self.last_motion_time = current_time
 
-                time.sleep(0.1)
+                self.scheduler.end(detected or self.camera_manager.is_recording)
 
             except Exception as e:
                 self.logger.error(f"Error in detection loop: {e}", exc_info=True)
                 time.sleep(1)
 
+        self.subscription.close()
+        self.subscription = None
+        self.algorithm.close()
         self.camera_manager.stop_camera()
         self.logger.info("Motion detection loop exited.")
 
@@ -205,7 +285,7 @@ class MotionDetector:
         """Start the motion detection loop."""
         if not self.is_running:
             self.is_running = True
-            self.thread = Thread(target=self._motion_detection_loop, daemon=True)
+            self.thread = Thread(target=self._motion_detection_loop, name="motion-detection", daemon=True)
             self.thread.start()
             self._notify("detection_enabled")
         else:
@@ -0,0 +1,80 @@
+import logging
+import threading
+from collections import deque
+
+
+class EncodedPacket:
+    """One encoded H.264 access unit with its presentation timestamp."""
+
+    __slots__ = ("data", "keyframe", "timestamp")
+
+    def __init__(self, data, keyframe, timestamp):
+        self.data = data
+        self.keyframe = keyframe
+        self.timestamp = timestamp  # microseconds
+
+
+class _Gop:
+    __slots__ = ("packets", "size", "start")
+
+    def __init__(self, packet):
+        self.packets = [packet]
+        self.size = len(packet.data)
+        self.start = packet.timestamp
+
+
+class PrerollBuffer:
+    """Bounded in-memory ring of encoded packets aligned to keyframes.
+
+    Packets are grouped into GOPs (a keyframe and the frames that depend on
+    it). Whole GOPs are dropped from the front once the remaining ones still
+    cover ``duration`` seconds, or when the buffer exceeds ``max_bytes``, so
+    the buffer always starts on a keyframe and can be written out as a
+    decodable clip at any time.
+    """
+
+    def __init__(self, duration, max_bytes=None):
+        self.logger = logging.getLogger(__name__)
+        self.duration_us = int(duration * 1_000_000)
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._gops = deque()
+        self._lock = threading.Lock()
+
+    def append(self, packet):
+        with self._lock:
+            if packet.keyframe:
+                self._gops.append(_Gop(packet))
+            elif self._gops:
+                gop = self._gops[-1]
+                gop.packets.append(packet)
+                gop.size += len(packet.data)
+            else:
+                # Nothing decodable until the first keyframe arrives.
+                return
+            self.size += len(packet.data)
+            self._trim(packet.timestamp)
+
+    def _trim(self, now):
+        while len(self._gops) > 1 and (
+            now - self._gops[1].start >= self.duration_us
+            or (self.max_bytes is not None and self.size > self.max_bytes)
+        ):
+            self.size -= self._gops.popleft().size
+
+    def packets(self):
+        """Returns the buffered packets, oldest first, starting with a keyframe."""
+        with self._lock:
+            return [packet for gop in self._gops for packet in gop.packets]
+
+    def clear(self):
+        with self._lock:
+            self._gops.clear()
+            self.size = 0
+
+    @property
+    def buffered_seconds(self):
+        with self._lock:
+            if not self._gops:
+                return 0.0
+            return (self._gops[-1].packets[-1].timestamp - self._gops[0].start) / 1_000_000
@@ -5,6 +5,9 @@ import json
 import time
 from app.lib.camera.camera_manager import CameraManager
 from app.lib.camera.motion_detector import MotionDetector
+from app.lib.diagnostics.metrics import REGISTRY
+
+SSE_CLIENTS = REGISTRY.gauge("motionberry_status_clients", "Connected status stream (SSE) clients.")
 
 
 class StatusManager:
@@ -15,14 +18,18 @@ class StatusManager:
 
     def generate_status(self):
         """Generates status for streaming."""
+        SSE_CLIENTS.inc()
         try:
             while True:
                 data = { 
                     "is_camera_running": self.camera_manager.is_camera_running,
                     "is_recording": self.camera_manager.is_recording,
-                    "is_motion_detecting": self.motion_detector.is_running
+                    "is_motion_detecting": self.motion_detector.is_running,
+                    "detection": self.motion_detector.scheduler.status() if self.motion_detector.is_running else None,
                 }
                 yield f"data: {json.dumps(data)}\n\n"
                 time.sleep(1)
         except Exception as e:
             self.logger.error("Error during generate_status: %s", e, exc_info=True)
+        finally:
+            SSE_CLIENTS.dec()
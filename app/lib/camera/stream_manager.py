@@ -1,55 +1,72 @@
-
-
-import io
 import logging
 import threading
-import time
-from PIL import Image
 from app.lib.camera.camera_manager import CameraManager
+from app.lib.camera.mjpeg_broadcaster import MjpegBroadcaster
+from app.lib.diagnostics.metrics import REGISTRY
 
 
 class StreamManager:
-    def __init__(self, camera_manager: CameraManager):
+    def __init__(self, camera_manager: CameraManager, encoder="software", quality=75, max_fps=10):
         self.logger = logging.getLogger(__name__)
         self.camera_manager = camera_manager
         self.streaming_clients = 0
         self.client_lock = threading.Lock()
+        self.encoder = encoder
+        self.quality = quality
+        self.max_fps = max_fps
+        self.broadcasters = {}
+        self.broadcaster_clients = {}
+        REGISTRY.gauge("motionberry_stream_clients", "Connected MJPEG live view clients.").set_function(
+            lambda: self.streaming_clients)
 
-    def generate_frames(self, stream="main"):
-        """Generates frames for streaming."""
+    def _acquire_broadcaster(self, stream):
         with self.client_lock:
             self.streaming_clients += 1
             self.logger.debug(f"New streaming client connected. Total clients: {self.streaming_clients}")
             if self.streaming_clients == 1:
                 self.camera_manager.start_camera()
+            broadcaster = self.broadcasters.get(stream)
+            if broadcaster is None:
+                broadcaster = MjpegBroadcaster(
+                    self.camera_manager,
+                    stream=stream,
+                    encoder=self.encoder,
+                    quality=self.quality,
+                    max_fps=self.max_fps,
+                )
+                self.broadcasters[stream] = broadcaster
+            self.broadcaster_clients[stream] = self.broadcaster_clients.get(stream, 0) + 1
+            if self.broadcaster_clients[stream] == 1:
+                broadcaster.start()
+            return broadcaster
+
+    def _release_broadcaster(self, stream):
+        with self.client_lock:
+            self.broadcaster_clients[stream] -= 1
+            if self.broadcaster_clients[stream] == 0:
+                self.broadcasters[stream].stop()
+            self.streaming_clients -= 1
+            self.logger.debug(f"Streaming client disconnected. Remaining clients: {self.streaming_clients}")
+            if self.streaming_clients == 0:
+                self.camera_manager.stop_camera()
+                self.logger.debug("All streaming clients disconnected.")
 
+    def generate_frames(self, stream="main"):
+        """Generates frames for streaming.
+
+        JPEG encoding happens once per frame in a shared MjpegBroadcaster;
+        each client only waits for the next chunk and writes it out.
+        """
+        broadcaster = self._acquire_broadcaster(stream)
         try:
+            sequence = 0
             while True:
-                frame = self.camera_manager.capture_image_array(stream)
-
-                if frame is None:
-                    self.logger.warning("Captured frame is None. Skipping this frame.")
-                    time.sleep(0.25)
+                sequence, chunk = broadcaster.wait_for_chunk(sequence, timeout=5)
+                if chunk is None:
+                    self.logger.debug("No new frame available. Waiting.")
                     continue
-
-                try:
-                    stream_bytes = io.BytesIO()
-                    image = Image.fromarray(frame)
-                    image.save(stream_bytes, format="JPEG")
-                    stream_bytes.seek(0)
-
-                    yield (b'--frame\r\n'
-                        b'Content-Type: image/jpeg\r\n\r\n' + stream_bytes.getvalue() + b'\r\n')
-                except Exception as e:
-                    self.logger.error("Error processing frame: %s", e, exc_info=True)
-                
-                time.sleep(0.1)
+                yield chunk
         except Exception as e:
             self.logger.error("Error during streaming: %s", e, exc_info=True)
         finally:
-            with self.client_lock:
-                self.streaming_clients -= 1
-                self.logger.debug(f"Streaming client disconnected. Remaining clients: {self.streaming_clients}")
-                if self.streaming_clients == 0:
-                    self.camera_manager.stop_camera()
-                    self.logger.debug("All streaming clients disconnected.")
+            self._release_broadcaster(stream)
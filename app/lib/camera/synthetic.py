@@ -0,0 +1,76 @@
+import numpy as np
+
+
+class SyntheticScene:
+    """Deterministic generated frames for replay and benchmarking.
+
+    Patterns:
+        static: fixed sensor-like noise over a gradient, no change between frames.
+        noise: the same scene with fresh per-frame noise.
+        lighting_ramp: global brightness slowly oscillating, no moving objects.
+        moving_blob: a bright disc crossing the scene for half of every cycle,
+            with quiet frames in between.
+
+    Frames are generated at one base size and derived per stream, so a lores
+    frame and the main frame of the same index show the same scene.
+    """
+
+    PATTERNS = ("static", "noise", "lighting_ramp", "moving_blob")
+
+    def __init__(self, size=(320, 240), pattern="moving_blob", seed=0, cycle=90, noise_level=4):
+        if pattern not in self.PATTERNS:
+            raise ValueError(f"Unknown synthetic pattern: {pattern}")
+        self.width, self.height = size
+        self.pattern = pattern
+        self.cycle = cycle
+        rng = np.random.default_rng(seed)
+        gradient = np.linspace(60, 160, self.width, dtype=np.float32)
+        self.background = np.broadcast_to(gradient, (self.height, self.width)).astype(np.float32)
+        # A noise field twice as tall as the frame; per-frame noise is a rolling window into it.
+        self.noise = rng.normal(0, noise_level, (self.height * 2, self.width)).astype(np.float32)
+        yy, xx = np.mgrid[0:self.height, 0:self.width]
+        self._yy = yy.astype(np.float32)
+        self._xx = xx.astype(np.float32)
+        self.radius = max(4.0, min(self.width, self.height) / 10)
+
+    def is_moving(self, index):
+        """True if frame ``index`` contains motion (ground truth for scoring)."""
+        if self.pattern != "moving_blob":
+            return False
+        return (index % self.cycle) < self.cycle // 2
+
+    def gray(self, index):
+        """Returns frame ``index`` as a (h, w) uint8 grayscale image."""
+        frame = self.background.copy()
+        offset = 0 if self.pattern == "static" else (index * 7919) % self.height
+        frame += self.noise[offset:offset + self.height]
+
+        if self.pattern == "lighting_ramp":
+            frame *= 0.75 + 0.25 * np.sin(2 * np.pi * index / (self.cycle * 4))
+        elif self.is_moving(index):
+            progress = (index % self.cycle) / (self.cycle / 2)
+            cx = progress * self.width
+            cy = self.height / 2 + np.sin(progress * np.pi) * self.height / 4
+            disc = (self._xx - cx) ** 2 + (self._yy - cy) ** 2 <= self.radius ** 2
+            frame[disc] = 230
+
+        return np.clip(frame, 0, 255).astype(np.uint8)
+
+    def rgb(self, index, size=None):
+        """Returns frame ``index`` as a (h, w, 3) uint8 image, resized to ``size`` if given."""
+        gray = self.gray(index)
+        if size is not None and tuple(size) != (self.width, self.height):
+            gray = resize_nearest(gray, size)
+        rgb = np.empty(gray.shape + (3,), dtype=np.uint8)
+        rgb[..., 0] = gray
+        rgb[..., 1] = gray
+        rgb[..., 2] = (gray.astype(np.uint16) * 3 // 4).astype(np.uint8)
+        return rgb
+
+
+def resize_nearest(frame, size):
+    """Nearest-neighbour resize of a 2D or 3D frame to ``size`` (width, height)."""
+    width, height = size
+    rows = (np.arange(height) * frame.shape[0] // height)
+    cols = (np.arange(width) * frame.shape[1] // width)
+    return frame[rows[:, None], cols]
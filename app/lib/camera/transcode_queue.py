@@ -0,0 +1,179 @@
+import itertools
+import logging
+import queue
+import threading
+import time
+from collections import deque
+
+from app.lib.diagnostics.metrics import REGISTRY
+
+STORAGE_BYTES = REGISTRY.counter(
+    "motionberry_storage_bytes_written", "Bytes written to the capture storage for saved clips.")
+CLIP_BYTES = REGISTRY.counter("motionberry_clip_bytes", "Size of saved clips in bytes.")
+
+
+class TranscodeJob:
+    """A finished recording waiting to be converted and moved to the output directory."""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    def __init__(self, job_id, raw_path, pts_path, on_done=None):
+        self.id = job_id
+        self.raw_path = raw_path
+        self.pts_path = pts_path
+        self.on_done = on_done
+        self.state = self.QUEUED
+        self.output_path = None
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.done = threading.Event()
+
+    def wait(self, timeout=None):
+        """Waits for the job to finish.
+
+        Returns:
+            Path: The output file, or None if the job failed or the wait timed out.
+        """
+        self.done.wait(timeout)
+        return self.output_path
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "state": self.state,
+            "source": self.raw_path.name,
+            "filename": self.output_path.name if self.output_path else None,
+            "error": self.error,
+            "frames": self.result.frames if self.result else None,
+            "duration": self.result.duration if self.result else None,
+            "dropped_frames": self.result.dropped_frames if self.result else None,
+            "write_amplification": self.result.write_amplification if self.result else None,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+
+class TranscodeJobQueue:
+    """Finalizes recordings on background worker threads.
+
+    Converting a clip (an ffmpeg remux, cleanup of the temporary directory and
+    of the output directory) takes seconds, and the camera lock and detection
+    loop must not wait for it. Jobs are served in order by ``workers``
+    threads. At most ``max_pending`` jobs may wait; beyond that submit()
+    blocks, which throttles recording instead of letting raw files pile up in
+    the temporary directory. The last ``history`` finished jobs are kept for
+    the jobs API.
+    """
+
+    def __init__(self, video_processor, file_manager, workers=1, max_pending=8, history=50):
+        self.logger = logging.getLogger(__name__)
+        self.video_processor = video_processor
+        self.file_manager = file_manager
+        self._queue = queue.Queue(maxsize=max(1, int(max_pending)))
+        self._ids = itertools.count(1)
+        self._jobs = {}
+        self._history = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._threads = []
+        for i in range(max(1, int(workers))):
+            thread = threading.Thread(target=self._run, name=f"transcode-{i + 1}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        REGISTRY.gauge("motionberry_transcode_jobs_pending", "Recordings waiting to be converted.").set_function(
+            lambda: self.pending)
+        self.logger.info(f"Transcode queue started with {len(self._threads)} worker(s), {self._queue.maxsize} pending max.")
+
+    @property
+    def pending(self):
+        return self._queue.qsize()
+
+    def submit(self, raw_path, pts_path, on_done=None):
+        """Queues a recording for conversion.
+
+        Args:
+            raw_path (Path): Raw H.264 file in its temporary directory.
+            pts_path (Path): Timestamps file next to it.
+            on_done (callable, optional): Called as ``on_done(job)`` on the worker
+                thread once the job has finished or failed.
+
+        Returns:
+            TranscodeJob: The queued job.
+        """
+        job = TranscodeJob(next(self._ids), raw_path, pts_path, on_done)
+        with self._lock:
+            self._jobs[job.id] = job
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            self.logger.warning(f"Transcode queue full ({self._queue.maxsize} jobs). Waiting for a free slot.")
+            self._queue.put(job)
+        self.logger.debug(f"Transcode job {job.id} queued: {raw_path}")
+        return job
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            job.state = TranscodeJob.RUNNING
+            job.started = time.time()
+            try:
+                staged_bytes = self.file_manager.staged_storage_bytes(job.raw_path)
+                job.result = self.video_processor.process_and_save(job.raw_path, job.pts_path)
+                job.output_path = job.result.path
+                self.file_manager.catalog.add(job.output_path, duration=job.result.duration, frames=job.result.frames)
+                job.state = TranscodeJob.DONE
+                self._account_writes(job.result, staged_bytes)
+            except Exception as e:
+                job.state = TranscodeJob.FAILED
+                job.error = str(e)
+                self.logger.error(f"Transcode job {job.id} failed: {e}", exc_info=True)
+            finally:
+                job.finished = time.time()
+                self.file_manager.cleanup_tmp_dir(job.raw_path.parent)
+                self.file_manager.cleanup_output_directory()
+                with self._lock:
+                    self._history.append(job)
+                    self._jobs = {
+                        j.id: j for j in self._jobs.values()
+                        if j.state in (TranscodeJob.QUEUED, TranscodeJob.RUNNING)
+                    }
+                    self._jobs.update((j.id, j) for j in self._history)
+                job.done.set()
+
+            if job.on_done is not None:
+                try:
+                    job.on_done(job)
+                except Exception as e:
+                    self.logger.error(f"Error in transcode job callback: {e}", exc_info=True)
+
+    def _account_writes(self, result, staged_bytes):
+        """Records how many bytes reached the storage for a clip, relative to its size.
+
+        A clip staged in RAM and written once costs 1.0x its size; a recording
+        staged or spilled on the storage costs those bytes on top.
+        """
+        size = result.path.stat().st_size
+        written = size if result.bytes_written is None else result.bytes_written
+        result.storage_bytes = staged_bytes + written
+        result.write_amplification = round(result.storage_bytes / size, 2) if size else None
+        STORAGE_BYTES.inc(result.storage_bytes)
+        CLIP_BYTES.inc(size)
+        self.logger.info(
+            f"Video saved: {result.path} ({size} bytes, {result.storage_bytes} written to storage, "
+            f"write amplification {result.write_amplification})"
+        )
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self):
+        """Returns queued, running and recently finished jobs, oldest first."""
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda job: job.id)
@@ -0,0 +1,112 @@
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+
+class ProfilerBusyError(RuntimeError):
+    pass
+
+
+class SamplingProfiler:
+    """Samples the stacks of every thread in the running process.
+
+    Every ``interval`` seconds the current frame of each thread is read from
+    sys._current_frames() and its call stack recorded, prefixed with the
+    thread name (motion-detection, capture-worker, Flask request threads...).
+    The result is in the collapsed-stack format used by flamegraph.pl and
+    speedscope: one "thread;outer;...;inner count" line per distinct stack.
+    Sampling happens in the calling thread, so nothing runs between profiles.
+    """
+
+    MAX_DURATION = 120
+
+    def __init__(self, interval=0.005):
+        self.logger = logging.getLogger(__name__)
+        self.interval = interval
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _frame_label(frame):
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def _stack(self, frame):
+        labels = []
+        while frame is not None:
+            labels.append(self._frame_label(frame))
+            frame = frame.f_back
+        labels.reverse()
+        return labels
+
+    def profile(self, duration, interval=None, thread_filter=None, trace_allocations=False, top=25):
+        """Samples all threads for ``duration`` seconds.
+
+        Args:
+            duration (float): Seconds to sample, up to MAX_DURATION.
+            interval (float, optional): Seconds between samples.
+            thread_filter (str, optional): Only keep threads whose name contains this text.
+            trace_allocations (bool): Also trace allocations with tracemalloc and
+                report the top allocation sites at the end.
+            top (int): Number of allocation sites to report.
+
+        Returns:
+            dict: collapsed (str), samples (int), duration (float) and,
+            with trace_allocations, allocations (list of dicts).
+
+        Raises:
+            ProfilerBusyError: If another profile is running.
+        """
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusyError("A profile is already running.")
+        try:
+            duration = max(0.1, min(float(duration), self.MAX_DURATION))
+            interval = max(0.001, float(interval or self.interval))
+            started_tracemalloc = False
+            if trace_allocations and not tracemalloc.is_tracing():
+                tracemalloc.start(10)
+                started_tracemalloc = True
+            self.logger.info(f"Profiling for {duration:.1f}s every {interval * 1000:.1f}ms.")
+
+            own_ident = threading.get_ident()
+            stacks = Counter()
+            samples = 0
+            start = time.monotonic()
+            deadline = start + duration
+            while time.monotonic() < deadline:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if ident == own_ident:
+                        continue
+                    name = names.get(ident, f"thread-{ident}")
+                    if thread_filter and thread_filter not in name:
+                        continue
+                    stacks[";".join([name.replace(";", ":"), *self._stack(frame)])] += 1
+                samples += 1
+                time.sleep(interval)
+            elapsed = time.monotonic() - start
+
+            result = {
+                "duration": round(elapsed, 3),
+                "samples": samples,
+                "collapsed": "".join(f"{stack} {count}\n" for stack, count in stacks.most_common()),
+            }
+            if trace_allocations:
+                snapshot = tracemalloc.take_snapshot()
+                result["allocations"] = [
+                    {
+                        "location": str(stat.traceback[0]),
+                        "size_bytes": stat.size,
+                        "count": stat.count,
+                    }
+                    for stat in snapshot.statistics("lineno")[:top]
+                ]
+                if started_tracemalloc:
+                    tracemalloc.stop()
+            self.logger.info(f"Profile finished: {samples} samples, {len(stacks)} distinct stacks.")
+            return result
+        finally:
+            self._lock.release()
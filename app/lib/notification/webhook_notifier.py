@@ -5,6 +5,10 @@ import threading
 import requests
 from string import Template
 from .event_notifier import EventNotifier
+from app.lib.diagnostics.metrics import STAGE_ERRORS, STAGE_SECONDS
+
+WEBHOOK_SECONDS = STAGE_SECONDS.labels(stage="webhook")
+WEBHOOK_ERRORS = STAGE_ERRORS.labels(stage="webhook")
 
 class WebhookNotifier(EventNotifier):
     def __init__(self, config: dict):
@@ -28,11 +32,16 @@ class WebhookNotifier(EventNotifier):
             thread = threading.Thread(
                 target=self._dispatch_action,
                 args=(action_def, data),
+                name="webhook",
                 daemon=True,
             )
             thread.start()
 
     def _dispatch_action(self, action_def: dict, context: dict) -> None:
+        with WEBHOOK_SECONDS.time():
+            self._send_action(action_def, context)
+
+    def _send_action(self, action_def: dict, context: dict) -> None:
         try:
             action_type = action_def.get("type")
 
@@ -47,24 +56,28 @@ class WebhookNotifier(EventNotifier):
             else:
                 self.logger.warning(f"Unknown notification type: {action_type}")
         except Exception as e:
+            WEBHOOK_ERRORS.inc()
             self.logger.error(f"Failed to dispatch notification: {e}")
 
     def _post_http(self, url, headers, body):
         try:
             requests.post(url, headers=headers, data=body, timeout=10)
         except Exception as e:
+            WEBHOOK_ERRORS.inc()
             self.logger.error(f"HTTP POST failed to {url}: {e}")
 
     def _post_form(self, url, data):
         try:
             requests.post(url, data=data, timeout=10)
         except Exception as e:
+            WEBHOOK_ERRORS.inc()
             self.logger.error(f"Form POST failed to {url}: {e}")
 
     def _post_json(self, url, json_data):
         try:
             requests.post(url, json=json_data, timeout=10)
         except Exception as e:
+            WEBHOOK_ERRORS.inc()
             self.logger.error(f"JSON POST failed to {url}: {e}")
 
     def _substitute_fields(self, data, context):
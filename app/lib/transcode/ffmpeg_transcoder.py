@@ -1,39 +1,25 @@
 import subprocess
+import tempfile
 import time
 import logging
 from pathlib import Path
-from .video_transcoder import VideoTranscoder
+from .video_transcoder import TranscodeResult, VideoTranscoder
+from .mkv_muxer import MatroskaMuxer
+from .native_transcoder import mux_raw_h264
+from .pts import analyze_timestamps, load_timestamps
+from app.lib.diagnostics.metrics import STAGE_ERRORS, STAGE_SECONDS
 
 logger = logging.getLogger(__name__)
 
 
 class FFmpegTranscoder(VideoTranscoder):
-    """Unified MP4/MKV transcoder using ffmpeg."""
+    """Unified MP4/MKV transcoder using ffmpeg.
 
-    def normalize_pts_file(self, pts_file):
-        p = Path(pts_file)
-        if not p.exists():
-            return
-
-        lines = [x.strip() for x in p.read_text().splitlines() if x.strip()]
-
-        # Remove mkvmerge header if present
-        if lines and lines[0].startswith("# timestamp format"):
-            lines = lines[1:]
-
-        try:
-            timestamps = [float(x) for x in lines]
-        except ValueError:
-            logger.error(f"Invalid PTS file: {pts_file}")
-            return
-
-        if timestamps:
-            base = timestamps[0]
-            normalized = [f"{ts - base:.6f}\n" for ts in timestamps]
-        else:
-            normalized = []
-
-        p.write_text("".join(normalized))
+    Raw Annex-B H.264 carries no timestamps, so the stream is wrapped in
+    Matroska with the PTS file timestamps on the way into ffmpeg's stdin and
+    copied from there. Frames keep their capture times instead of being
+    spread evenly at the nominal framerate.
+    """
 
     def convert(self, raw_path, pts_file=None):
         raw_path = Path(raw_path)
@@ -43,48 +29,68 @@ class FFmpegTranscoder(VideoTranscoder):
             raise ValueError(f"Unsupported video_format: {video_format}")
 
         output_ext = f".{video_format}"
-        output_path = (self.file_manager.output_dir /
-                       raw_path.with_suffix(output_ext).name).resolve()
+        output_name = raw_path.with_suffix(output_ext).name
+        output_path = (self.file_manager.output_dir / output_name).resolve()
+        # Written next to the output directory and renamed into it once complete.
+        staged_path = self.file_manager.staging_path(output_name)
+        timestamps = load_timestamps(pts_file)
+        timing = analyze_timestamps(timestamps, self.framerate)
 
         try:
             start = time.time()
             logger.info(f"Starting transcoding: {raw_path} -> {output_path}")
 
-            args = ["ffmpeg", "-y", "-loglevel", "error"]
-
-            # Raw Annex-B inputs require explicit input framerate
-            args.extend(["-framerate", str(self.framerate)])
-
-            # Apply timecodes only if MKV + pts_file present
-            # if video_format == "mkv" and pts_file and Path(pts_file).exists():
-            #     self.normalize_pts_file(pts_file)
-            #     args.extend(["-timecodes", f"0:{pts_file}"])
-
-            args.extend([
-                "-i", str(raw_path),
+            args = [
+                "ffmpeg", "-y", "-loglevel", "error",
+                "-f", "matroska", "-i", "pipe:0",
                 "-c", "copy",
-                "-r", str(self.framerate),
-                str(output_path),
-            ])
-
-            proc = subprocess.run(
-                args,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-            )
+                str(staged_path),
+            ]
+
+            # stderr goes to a file so a chatty ffmpeg cannot block while we write to stdin.
+            with tempfile.TemporaryFile() as error_log:
+                proc = subprocess.Popen(
+                    args,
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.DEVNULL,
+                    stderr=error_log,
+                )
+                frames = 0
+                try:
+                    with self.file_manager.open_raw(raw_path) as source:
+                        frames = mux_raw_h264(source, proc.stdin, MatroskaMuxer, timestamps, self.framerate)
+                except BrokenPipeError:
+                    # ffmpeg exited early; its error output says why.
+                    pass
+                finally:
+                    try:
+                        proc.stdin.close()
+                    except BrokenPipeError:
+                        pass
+                    proc.wait()
+                error_log.seek(0)
+                stderr = error_log.read().decode(errors="replace")
 
             if proc.returncode != 0:
                 logger.error(f"ffmpeg failed ({video_format}) rc={proc.returncode}")
-                logger.error(proc.stderr)
-                raise subprocess.CalledProcessError(
-                    proc.returncode, proc.args, proc.stdout, proc.stderr
-                )
+                logger.error(stderr)
+                raise subprocess.CalledProcessError(proc.returncode, args, None, stderr)
 
+            self.file_manager.publish(staged_path, output_name)
             elapsed = time.time() - start
+            STAGE_SECONDS.labels(stage="transcode").observe(elapsed)
             logger.info(f"Transcoding successful: {output_path} ({elapsed:.2f}s)")
 
-        except subprocess.CalledProcessError:
+        except (subprocess.CalledProcessError, ValueError):
+            # ffmpeg may have written part of the output before the muxer gave up.
+            staged_path.unlink(missing_ok=True)
+            STAGE_ERRORS.labels(stage="transcode").inc()
             raise
 
-        return output_path
+        if timing["dropped_frames"]:
+            logger.warning(
+                f"{timing['dropped_frames']} frames dropped in {timing['gaps']} places while recording {raw_path.name}."
+            )
+        if not timestamps.size:
+            timing["duration"] = frames / self.framerate
+        return TranscodeResult.from_timing(output_path, timing, frames=frames, elapsed=elapsed)
@@ -0,0 +1,147 @@
+"""Fragmented MP4 (ISO BMFF) writer for a single H.264 video track."""
+
+import struct
+
+from .h264 import NAL_AUD, NAL_PPS, NAL_SPS, SequenceParameterSet, nal_type, split_nal_units
+
+TIMESCALE = 90000
+TRACK_ID = 1
+
+_MATRIX = struct.pack(">9I", 0x00010000, 0, 0, 0, 0x00010000, 0, 0, 0, 0x40000000)
+_SAMPLE_FLAGS_SYNC = 0x02000000
+_SAMPLE_FLAGS_NON_SYNC = 0x01010000
+
+
+def box(kind, *payload):
+    data = b"".join(payload)
+    return struct.pack(">I4s", 8 + len(data), kind) + data
+
+
+def full_box(kind, version, flags, *payload):
+    return box(kind, struct.pack(">I", (version << 24) | flags), *payload)
+
+
+def to_avcc_sample(annexb):
+    """Converts an Annex-B access unit to a length-prefixed sample.
+
+    Parameter sets and access unit delimiters are dropped; they live in the
+    init segment.
+
+    Returns:
+        tuple: (sample_bytes, sps_nal or None, pps_nal or None)
+    """
+    sps = pps = None
+    parts = []
+    for nal in split_nal_units(annexb):
+        kind = nal_type(nal)
+        if kind == NAL_SPS:
+            sps = nal
+        elif kind == NAL_PPS:
+            pps = nal
+        elif kind != NAL_AUD:
+            parts.append(struct.pack(">I", len(nal)))
+            parts.append(nal)
+    return b"".join(parts), sps, pps
+
+
+def avc_decoder_configuration(sps_nal, pps_nal):
+    """Builds the AVCDecoderConfigurationRecord (avcC payload, MKV CodecPrivate) for a stream."""
+    return b"".join([
+        struct.pack(">BBBBBB", 1, sps_nal[1], sps_nal[2], sps_nal[3], 0xFF, 0xE1),
+        struct.pack(">H", len(sps_nal)), sps_nal,
+        struct.pack(">BH", 1, len(pps_nal)), pps_nal,
+    ])
+
+
+def movie_box(sps_nal, pps_nal, timescale=TIMESCALE, duration=0, sample_tables=None, mvex=None):
+    """Builds the moov box of a single H.264 track.
+
+    Args:
+        sps_nal (bytes): Sequence parameter set.
+        pps_nal (bytes): Picture parameter set.
+        timescale (int): Media timescale in units per second.
+        duration (int): Track duration in timescale units (0 if unknown).
+        sample_tables (list, optional): stts, stss, stsc, stsz and stco/co64 boxes.
+            Empty tables are written when omitted, as in a fragmented file.
+        mvex (bytes, optional): Movie extends box of a fragmented file.
+    """
+    sps = SequenceParameterSet(sps_nal)
+    width, height = sps.width, sps.height
+    movie_duration = duration * 1000 // timescale
+
+    mvhd = full_box(
+        b"mvhd", 0, 0,
+        struct.pack(">IIII", 0, 0, 1000, movie_duration),
+        struct.pack(">IH", 0x00010000, 0x0100), b"\x00" * 10,
+        _MATRIX, b"\x00" * 24,
+        struct.pack(">I", TRACK_ID + 1),
+    )
+    tkhd = full_box(
+        b"tkhd", 0, 0x000003,
+        struct.pack(">IIIII", 0, 0, TRACK_ID, 0, movie_duration),
+        b"\x00" * 8,
+        struct.pack(">hhhH", 0, 0, 0, 0),
+        _MATRIX,
+        struct.pack(">II", width << 16, height << 16),
+    )
+    mdhd = full_box(b"mdhd", 0, 0, struct.pack(">IIIIHH", 0, 0, timescale, duration, 0x55C4, 0))
+    hdlr = full_box(b"hdlr", 0, 0, struct.pack(">I4s", 0, b"vide"), b"\x00" * 12, b"VideoHandler\x00")
+    vmhd = full_box(b"vmhd", 0, 1, b"\x00" * 8)
+    dinf = box(b"dinf", full_box(b"dref", 0, 0, struct.pack(">I", 1), full_box(b"url ", 0, 1)))
+    avc1 = box(
+        b"avc1",
+        b"\x00" * 6, struct.pack(">H", 1),
+        b"\x00" * 16,
+        struct.pack(">HHIIIH", width, height, 0x00480000, 0x00480000, 0, 1),
+        b"\x00" * 32,
+        struct.pack(">Hh", 0x0018, -1),
+        box(b"avcC", avc_decoder_configuration(sps_nal, pps_nal)),
+    )
+    if sample_tables is None:
+        sample_tables = [
+            full_box(b"stts", 0, 0, struct.pack(">I", 0)),
+            full_box(b"stsc", 0, 0, struct.pack(">I", 0)),
+            full_box(b"stsz", 0, 0, struct.pack(">II", 0, 0)),
+            full_box(b"stco", 0, 0, struct.pack(">I", 0)),
+        ]
+    stbl = box(b"stbl", full_box(b"stsd", 0, 0, struct.pack(">I", 1), avc1), *sample_tables)
+    trak = box(b"trak", tkhd, box(b"mdia", mdhd, hdlr, box(b"minf", vmhd, dinf, stbl)))
+    return box(b"moov", mvhd, trak, *([mvex] if mvex else []))
+
+
+def init_segment(sps_nal, pps_nal, timescale=TIMESCALE):
+    """Builds the ftyp+moov initialization segment for a stream."""
+    ftyp = box(b"ftyp", b"isom", struct.pack(">I", 0x200), b"isom", b"iso6", b"avc1", b"mp41")
+    mvex = box(b"mvex", full_box(b"trex", 0, 0, struct.pack(">IIIII", TRACK_ID, 1, 0, 0, 0)))
+    return ftyp + movie_box(sps_nal, pps_nal, timescale, mvex=mvex)
+
+
+def media_fragment(sequence_number, base_decode_time, samples):
+    """Builds one moof+mdat fragment.
+
+    Args:
+        sequence_number (int): Fragment sequence number, starting at 1.
+        base_decode_time (int): Decode time of the first sample in timescale units.
+        samples (list): (sample_bytes, duration, keyframe) tuples in decode order.
+    """
+    entries = b"".join(
+        struct.pack(
+            ">III", duration, len(data), _SAMPLE_FLAGS_SYNC if keyframe else _SAMPLE_FLAGS_NON_SYNC
+        )
+        for data, duration, keyframe in samples
+    )
+
+    def build_moof(data_offset):
+        trun = full_box(b"trun", 0, 0x000701, struct.pack(">Ii", len(samples), data_offset), entries)
+        traf = box(
+            b"traf",
+            full_box(b"tfhd", 0, 0x020000, struct.pack(">I", TRACK_ID)),
+            full_box(b"tfdt", 1, 0, struct.pack(">Q", base_decode_time)),
+            trun,
+        )
+        return box(b"moof", full_box(b"mfhd", 0, 0, struct.pack(">I", sequence_number)), traf)
+
+    moof_size = len(build_moof(0))
+    moof = build_moof(moof_size + 8)
+    mdat = box(b"mdat", *(data for data, _, _ in samples))
+    return moof + mdat
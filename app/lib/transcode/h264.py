@@ -0,0 +1,198 @@
+"""Minimal H.264 Annex-B parsing helpers."""
+
+NAL_SLICE = 1
+NAL_IDR = 5
+NAL_SEI = 6
+NAL_SPS = 7
+NAL_PPS = 8
+NAL_AUD = 9
+
+VCL_TYPES = {NAL_SLICE, NAL_IDR}
+
+
+def nal_type(nal):
+    return nal[0] & 0x1F
+
+
+def split_nal_units(data):
+    """Splits an Annex-B buffer into NAL units without start codes.
+
+    Trailing zero bytes of a NAL unit (part of a 4-byte start code) are dropped.
+    """
+    nals = []
+    start = _find_start_code(data, 0)
+    while start is not None:
+        payload_start = start[1]
+        following = _find_start_code(data, payload_start)
+        end = following[0] if following else len(data)
+        nal = bytes(data[payload_start:end]).rstrip(b"\x00") if following else bytes(data[payload_start:end])
+        if nal:
+            nals.append(nal)
+        start = following
+    return nals
+
+
+def _find_start_code(data, offset):
+    """Returns (start_code_index, payload_index) of the next 00 00 01, or None."""
+    index = data.find(b"\x00\x00\x01", offset)
+    if index < 0:
+        return None
+    return index, index + 3
+
+
+def starts_new_picture(nal):
+    """True if a VCL NAL unit is the first slice of a picture (first_mb_in_slice == 0)."""
+    return nal_type(nal) in VCL_TYPES and len(nal) > 1 and bool(nal[1] & 0x80)
+
+
+def iter_nal_units(stream, chunk_size=1024 * 1024):
+    """Yields NAL units from a binary file object or pipe in constant memory."""
+    read = getattr(stream, "read1", stream.read)
+    buffer = bytearray()
+    while True:
+        chunk = read(chunk_size)
+        if chunk:
+            buffer.extend(chunk)
+        # Keep the last (possibly incomplete) NAL unit in the buffer until more data arrives.
+        last = buffer.rfind(b"\x00\x00\x01")
+        if chunk and last <= 0:
+            continue
+        if not chunk:
+            yield from split_nal_units(buffer)
+            return
+        cut = last - 1 if last > 0 and buffer[last - 1] == 0 else last
+        yield from split_nal_units(buffer[:cut])
+        del buffer[:cut]
+
+
+class AccessUnit:
+    """One coded picture and the parameter sets/SEI that precede it."""
+
+    __slots__ = ("nals", "keyframe")
+
+    def __init__(self):
+        self.nals = []
+        self.keyframe = False
+
+    def to_annexb(self):
+        return b"".join(b"\x00\x00\x00\x01" + nal for nal in self.nals)
+
+    @property
+    def size(self):
+        return sum(len(nal) for nal in self.nals)
+
+
+def iter_access_units(nals):
+    """Groups a NAL unit sequence into access units (one per coded picture)."""
+    current = AccessUnit()
+    has_picture = False
+    for nal in nals:
+        kind = nal_type(nal)
+        if has_picture and (kind in (NAL_AUD, NAL_SEI, NAL_SPS, NAL_PPS) or starts_new_picture(nal)):
+            yield current
+            current = AccessUnit()
+            has_picture = False
+        current.nals.append(nal)
+        if kind in VCL_TYPES:
+            has_picture = True
+            if kind == NAL_IDR:
+                current.keyframe = True
+    if has_picture:
+        yield current
+
+
+def remove_emulation_prevention(data):
+    """Strips emulation prevention bytes (00 00 03 -> 00 00) from a NAL payload."""
+    return bytes(data).replace(b"\x00\x00\x03", b"\x00\x00")
+
+
+class _BitReader:
+    def __init__(self, data):
+        self.data = data
+        self.position = 0
+
+    def bit(self):
+        byte = self.data[self.position >> 3]
+        value = (byte >> (7 - (self.position & 7))) & 1
+        self.position += 1
+        return value
+
+    def bits(self, count):
+        value = 0
+        for _ in range(count):
+            value = (value << 1) | self.bit()
+        return value
+
+    def ue(self):
+        zeros = 0
+        while self.bit() == 0:
+            zeros += 1
+        return (1 << zeros) - 1 + self.bits(zeros)
+
+    def se(self):
+        value = self.ue()
+        return (value + 1) // 2 if value & 1 else -(value // 2)
+
+
+class SequenceParameterSet:
+    """The fields of an SPS needed to describe a stream in a container."""
+
+    HIGH_PROFILES = {100, 110, 122, 244, 44, 83, 86, 118, 128, 138, 139, 134, 135}
+
+    def __init__(self, nal):
+        self.nal = nal
+        reader = _BitReader(remove_emulation_prevention(nal[1:]))
+        self.profile_idc = reader.bits(8)
+        self.constraint_flags = reader.bits(8)
+        self.level_idc = reader.bits(8)
+        reader.ue()  # seq_parameter_set_id
+        chroma_format_idc = 1
+        if self.profile_idc in self.HIGH_PROFILES:
+            chroma_format_idc = reader.ue()
+            if chroma_format_idc == 3:
+                reader.bit()  # separate_colour_plane_flag
+            reader.ue()  # bit_depth_luma_minus8
+            reader.ue()  # bit_depth_chroma_minus8
+            reader.bit()  # qpprime_y_zero_transform_bypass_flag
+            if reader.bit():  # seq_scaling_matrix_present_flag
+                for i in range(8 if chroma_format_idc != 3 else 12):
+                    if reader.bit():
+                        self._skip_scaling_list(reader, 16 if i < 6 else 64)
+        reader.ue()  # log2_max_frame_num_minus4
+        pic_order_cnt_type = reader.ue()
+        if pic_order_cnt_type == 0:
+            reader.ue()  # log2_max_pic_order_cnt_lsb_minus4
+        elif pic_order_cnt_type == 1:
+            reader.bit()  # delta_pic_order_always_zero_flag
+            reader.se()  # offset_for_non_ref_pic
+            reader.se()  # offset_for_top_to_bottom_field
+            for _ in range(reader.ue()):
+                reader.se()
+        reader.ue()  # max_num_ref_frames
+        reader.bit()  # gaps_in_frame_num_value_allowed_flag
+        width_in_mbs = reader.ue() + 1
+        height_in_map_units = reader.ue() + 1
+        frame_mbs_only = reader.bit()
+        if not frame_mbs_only:
+            reader.bit()  # mb_adaptive_frame_field_flag
+        reader.bit()  # direct_8x8_inference_flag
+        crop_left = crop_right = crop_top = crop_bottom = 0
+        if reader.bit():  # frame_cropping_flag
+            crop_left, crop_right, crop_top, crop_bottom = (reader.ue() for _ in range(4))
+        crop_unit_x = 1 if chroma_format_idc in (0, 3) else 2
+        crop_unit_y = (1 if chroma_format_idc in (0, 2, 3) else 2) * (2 - frame_mbs_only)
+        self.width = width_in_mbs * 16 - crop_unit_x * (crop_left + crop_right)
+        self.height = (2 - frame_mbs_only) * height_in_map_units * 16 - crop_unit_y * (crop_top + crop_bottom)
+
+    @staticmethod
+    def _skip_scaling_list(reader, size):
+        last_scale = next_scale = 8
+        for _ in range(size):
+            if next_scale != 0:
+                next_scale = (last_scale + reader.se() + 256) % 256
+            last_scale = next_scale if next_scale != 0 else last_scale
+
+    @property
+    def codec_string(self):
+        """RFC 6381 codec string, e.g. avc1.640028."""
+        return f"avc1.{self.profile_idc:02x}{self.constraint_flags:02x}{self.level_idc:02x}"
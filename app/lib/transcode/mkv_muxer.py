@@ -0,0 +1,207 @@
+"""Matroska writer for a single H.264 video track."""
+
+import struct
+
+from .fmp4 import avc_decoder_configuration
+from .h264 import SequenceParameterSet
+
+EBML = b"\x1a\x45\xdf\xa3"
+SEGMENT = b"\x18\x53\x80\x67"
+SEEK_HEAD = b"\x11\x4d\x9b\x74"
+SEEK = b"\x4d\xbb"
+SEEK_ID = b"\x53\xab"
+SEEK_POSITION = b"\x53\xac"
+VOID = b"\xec"
+INFO = b"\x15\x49\xa9\x66"
+TIMESTAMP_SCALE = b"\x2a\xd7\xb1"
+DURATION = b"\x44\x89"
+MUXING_APP = b"\x4d\x80"
+WRITING_APP = b"\x57\x41"
+TRACKS = b"\x16\x54\xae\x6b"
+TRACK_ENTRY = b"\xae"
+TRACK_NUMBER = b"\xd7"
+TRACK_UID = b"\x73\xc5"
+TRACK_TYPE = b"\x83"
+FLAG_LACING = b"\x9c"
+CODEC_ID = b"\x86"
+CODEC_PRIVATE = b"\x63\xa2"
+DEFAULT_DURATION = b"\x23\xe3\x83"
+VIDEO = b"\xe0"
+PIXEL_WIDTH = b"\xb0"
+PIXEL_HEIGHT = b"\xba"
+CLUSTER = b"\x1f\x43\xb6\x75"
+TIMESTAMP = b"\xe7"
+SIMPLE_BLOCK = b"\xa3"
+CUES = b"\x1c\x53\xbb\x6b"
+CUE_POINT = b"\xbb"
+CUE_TIME = b"\xb3"
+CUE_TRACK_POSITIONS = b"\xb7"
+CUE_TRACK = b"\xf7"
+CUE_CLUSTER_POSITION = b"\xf1"
+
+_UNKNOWN_SIZE = b"\x01\xff\xff\xff\xff\xff\xff\xff"
+_SEEK_HEAD_SPACE = 96
+
+
+def encode_size(size, length=None):
+    """Encodes an element size as an EBML variable-length integer."""
+    if length is None:
+        length = 1
+        while size >= (1 << (7 * length)) - 1:
+            length += 1
+    return ((1 << (7 * length)) | size).to_bytes(length, "big")
+
+
+def element(element_id, payload):
+    return element_id + encode_size(len(payload)) + payload
+
+
+def uint_element(element_id, value, length=None):
+    length = length or max(1, (value.bit_length() + 7) // 8)
+    return element(element_id, value.to_bytes(length, "big"))
+
+
+def string_element(element_id, value):
+    return element(element_id, value.encode())
+
+
+def void_element(size):
+    """A Void element occupying exactly ``size`` bytes (at least 2)."""
+    if size >= 9:
+        return VOID + encode_size(size - 9, 8) + b"\x00" * (size - 9)
+    return VOID + encode_size(size - 2, 1) + b"\x00" * (size - 2)
+
+
+class MatroskaMuxer:
+    """Writes length-prefixed H.264 samples into a Matroska file.
+
+    Each GOP becomes one cluster, written as soon as the next keyframe
+    arrives, so memory use is bounded by one GOP. Timestamps are in
+    milliseconds. close() patches the segment size and duration, and writes
+    the cues and the seek head into space reserved at the start. On a pipe,
+    where that is impossible, the segment is written with an unknown size
+    and without duration, cues or seek head, as in a live stream.
+    """
+
+    def __init__(self, fileobj, sps_nal, pps_nal, framerate, app_name="Motionberry"):
+        """
+        Args:
+            fileobj: Binary file or pipe opened for writing.
+            sps_nal (bytes): Sequence parameter set of the stream.
+            pps_nal (bytes): Picture parameter set of the stream.
+            framerate (float): Nominal framerate, written as the default frame duration.
+            app_name (str): Muxing and writing application name.
+        """
+        self.file = fileobj
+        self.seekable = fileobj.seekable()
+        self._position = 0
+        self.frame_duration_ms = 1000 / framerate
+        self.cues = []
+        self._cluster_time = None
+        self._blocks = []
+        self._last_time = None
+
+        sps = SequenceParameterSet(sps_nal)
+        self._write(element(EBML, b"".join([
+            uint_element(b"\x42\x86", 1),
+            uint_element(b"\x42\xf7", 1),
+            uint_element(b"\x42\xf2", 4),
+            uint_element(b"\x42\xf3", 8),
+            string_element(b"\x42\x82", "matroska"),
+            uint_element(b"\x42\x87", 4),
+            uint_element(b"\x42\x85", 2),
+        ])))
+        self._write(SEGMENT)
+        self._segment_size_position = self._position
+        self._write(_UNKNOWN_SIZE)
+        self._segment_start = self._position
+
+        if self.seekable:
+            self._write(void_element(_SEEK_HEAD_SPACE))
+
+        self._info_position = self._position - self._segment_start
+        info_payload = b"".join([
+            uint_element(TIMESTAMP_SCALE, 1_000_000),
+            string_element(MUXING_APP, app_name),
+            string_element(WRITING_APP, app_name),
+        ])
+        if self.seekable:
+            self._write(INFO + encode_size(len(info_payload) + 11) + info_payload + DURATION + encode_size(8))
+            self._duration_position = self._position
+            self._write(struct.pack(">d", 0.0))
+        else:
+            self._write(element(INFO, info_payload))
+
+        self._tracks_position = self._position - self._segment_start
+        self._write(element(TRACKS, element(TRACK_ENTRY, b"".join([
+            uint_element(TRACK_NUMBER, 1),
+            uint_element(TRACK_UID, 1),
+            uint_element(TRACK_TYPE, 1),
+            uint_element(FLAG_LACING, 0),
+            string_element(CODEC_ID, "V_MPEG4/ISO/AVC"),
+            element(CODEC_PRIVATE, avc_decoder_configuration(sps_nal, pps_nal)),
+            uint_element(DEFAULT_DURATION, round(1_000_000_000 / framerate)),
+            element(VIDEO, uint_element(PIXEL_WIDTH, sps.width) + uint_element(PIXEL_HEIGHT, sps.height)),
+        ]))))
+
+    def write(self, sample, timestamp_us, keyframe):
+        """Appends one sample.
+
+        Args:
+            sample (bytes): Access unit with 4-byte length-prefixed NAL units.
+            timestamp_us (int): Presentation time in microseconds, increasing.
+            keyframe (bool): True for IDR pictures.
+        """
+        time_ms = round(timestamp_us / 1000)
+        if self._last_time is not None and time_ms <= self._last_time:
+            time_ms = self._last_time + 1
+        self._last_time = time_ms
+        if self._cluster_time is None or keyframe or time_ms - self._cluster_time > 0x7FFF:
+            self._flush_cluster()
+            self._cluster_time = time_ms
+            if keyframe:
+                self.cues.append((time_ms, self._position - self._segment_start))
+        header = struct.pack(">BhB", 0x81, time_ms - self._cluster_time, 0x80 if keyframe else 0)
+        self._blocks.append(element(SIMPLE_BLOCK, header + sample))
+
+    def _write(self, data):
+        self.file.write(data)
+        self._position += len(data)
+
+    def _flush_cluster(self):
+        if not self._blocks:
+            return
+        payload = uint_element(TIMESTAMP, self._cluster_time)
+        self._write(CLUSTER + encode_size(len(payload) + sum(len(block) for block in self._blocks)))
+        self._write(payload)
+        for block in self._blocks:
+            self._write(block)
+        self._blocks = []
+
+    def close(self):
+        """Writes the last cluster and the cues, and fills in sizes. Does not close the file."""
+        self._flush_cluster()
+        if not self.seekable:
+            return
+        cues_position = self._position - self._segment_start
+        self._write(element(CUES, b"".join(
+            element(CUE_POINT, uint_element(CUE_TIME, time_ms) + element(
+                CUE_TRACK_POSITIONS, uint_element(CUE_TRACK, 1) + uint_element(CUE_CLUSTER_POSITION, position)
+            ))
+            for time_ms, position in self.cues
+        )))
+        end = self._position
+
+        seek_head = element(SEEK_HEAD, b"".join(
+            element(SEEK, element(SEEK_ID, element_id) + uint_element(SEEK_POSITION, position, 8))
+            for element_id, position in ((INFO, self._info_position), (TRACKS, self._tracks_position), (CUES, cues_position))
+        ))
+        self.file.seek(self._segment_start)
+        self.file.write(seek_head + void_element(_SEEK_HEAD_SPACE - len(seek_head)))
+
+        duration = (self._last_time + self.frame_duration_ms) if self._last_time is not None else 0
+        self.file.seek(self._duration_position)
+        self.file.write(struct.pack(">d", duration))
+        self.file.seek(self._segment_size_position)
+        self.file.write(encode_size(end - self._segment_start, 8))
+        self.file.seek(end)
@@ -2,40 +2,18 @@ import subprocess
 import time
 from pathlib import Path
 import logging
-from .video_transcoder import VideoTranscoder
+from .video_transcoder import TranscodeResult, VideoTranscoder
+from .pts import analyze_timestamps, load_timestamps, normalize_timestamps, write_timestamps
 
 logger = logging.getLogger(__name__)
 
 
 class MKVTranscoder(VideoTranscoder):
     def normalize_pts_file(self, pts_file):
-        """Ensures the PTS file has the correct format and starts at 0."""
-        if not Path(pts_file).exists():
-            return
-
-        with open(pts_file, "r+") as f:
-            lines = f.readlines()
-
-            # Check and add header if missing
-            if not lines[0].startswith("# timestamp format v2"):
-                header = "# timestamp format v2\n"
-                logger.info(f"Adding missing PTS header to: {pts_file}")
-            else:
-                header = lines.pop(0)
-
-            # Convert timestamps to start at 0
-            try:
-                timestamps = [float(line.strip()) for line in lines if line.strip()]
-                min_timestamp = timestamps[0] if timestamps else 0.0
-                normalized_timestamps = [
-                    f"{ts - min_timestamp:.6f}\n" for ts in timestamps
-                ]
-
-                f.seek(0)
-                f.write(header + "".join(normalized_timestamps))
-                f.truncate()
-            except ValueError:
-                logger.error(f"Invalid PTS file format: {pts_file}")
+        """Ensures the PTS file has the mkvmerge header and starts at 0."""
+        timestamps = load_timestamps(pts_file)
+        if timestamps.size:
+            write_timestamps(pts_file, normalize_timestamps(timestamps))
 
     def convert(self, raw_path, pts_file=None):
         mkv_filename = raw_path.with_suffix(".mkv").name
@@ -45,6 +23,7 @@ class MKVTranscoder(VideoTranscoder):
             start_time = time.time()
             logger.info(f"Starting MKV transcoding for file: {raw_path}")
 
+            timing = analyze_timestamps(load_timestamps(pts_file), self.framerate)
             if pts_file:
                 self.normalize_pts_file(pts_file)
 
@@ -83,4 +62,4 @@ class MKVTranscoder(VideoTranscoder):
             )
             raise
 
-        return output_path
+        return TranscodeResult.from_timing(output_path, timing, elapsed=elapsed_time)
@@ -0,0 +1,89 @@
+"""Progressive MP4 writer for a single H.264 video track."""
+
+import struct
+
+from .fmp4 import TIMESCALE, box, full_box, movie_box
+
+
+class MP4Muxer:
+    """Writes length-prefixed H.264 samples into a regular (non-fragmented) MP4.
+
+    Samples are streamed into the mdat as they arrive and only their sizes,
+    offsets and timestamps are kept; the moov with the sample tables is
+    appended by close(). Players fetch it with a range request, so the file
+    does not have to be rewritten to move it to the front.
+    """
+
+    def __init__(self, fileobj, sps_nal, pps_nal, framerate, timescale=TIMESCALE):
+        """
+        Args:
+            fileobj: Binary file opened for writing and seeking.
+            sps_nal (bytes): Sequence parameter set of the stream.
+            pps_nal (bytes): Picture parameter set of the stream.
+            framerate (float): Nominal framerate, for the duration of the last sample.
+            timescale (int): Media timescale in units per second.
+        """
+        self.file = fileobj
+        self.sps_nal = sps_nal
+        self.pps_nal = pps_nal
+        self.timescale = timescale
+        self.frame_duration = round(timescale / framerate)
+        self.sizes = []
+        self.offsets = []
+        self.decode_times = []
+        self.sync_samples = []
+
+        self.file.write(box(b"ftyp", b"isom", struct.pack(">I", 0x200), b"isom", b"iso2", b"avc1", b"mp41"))
+        self._mdat_start = self.file.tell()
+        # 64-bit size, filled in by close().
+        self.file.write(struct.pack(">I4sQ", 1, b"mdat", 0))
+        self._position = self.file.tell()
+
+    def write(self, sample, timestamp_us, keyframe):
+        """Appends one sample.
+
+        Args:
+            sample (bytes): Access unit with 4-byte length-prefixed NAL units.
+            timestamp_us (int): Presentation time in microseconds, increasing.
+            keyframe (bool): True for IDR pictures.
+        """
+        decode_time = round(timestamp_us * self.timescale / 1_000_000)
+        if self.decode_times and decode_time <= self.decode_times[-1]:
+            decode_time = self.decode_times[-1] + 1
+        self.file.write(sample)
+        self.offsets.append(self._position)
+        self.sizes.append(len(sample))
+        self.decode_times.append(decode_time)
+        if keyframe:
+            self.sync_samples.append(len(self.sizes))
+        self._position += len(sample)
+
+    def _sample_tables(self):
+        durations = [b - a for a, b in zip(self.decode_times, self.decode_times[1:])]
+        durations.append(self.frame_duration)
+        runs = []
+        for duration in durations:
+            if runs and runs[-1][1] == duration:
+                runs[-1][0] += 1
+            else:
+                runs.append([1, duration])
+
+        stts = full_box(b"stts", 0, 0, struct.pack(">I", len(runs)), *(struct.pack(">II", *run) for run in runs))
+        stss = full_box(b"stss", 0, 0, struct.pack(f">I{len(self.sync_samples)}I", len(self.sync_samples), *self.sync_samples))
+        # One sample per chunk, so the chunk offsets are the sample offsets.
+        stsc = full_box(b"stsc", 0, 0, struct.pack(">IIII", 1, 1, 1, 1))
+        stsz = full_box(b"stsz", 0, 0, struct.pack(f">II{len(self.sizes)}I", 0, len(self.sizes), *self.sizes))
+        if self.offsets and self.offsets[-1] > 0xFFFFFFFF:
+            stco = full_box(b"co64", 0, 0, struct.pack(f">I{len(self.offsets)}Q", len(self.offsets), *self.offsets))
+        else:
+            stco = full_box(b"stco", 0, 0, struct.pack(f">I{len(self.offsets)}I", len(self.offsets), *self.offsets))
+        return [stts, stss, stsc, stsz, stco], sum(durations)
+
+    def close(self):
+        """Finishes the mdat and writes the moov. Does not close the file."""
+        end = self._position
+        self.file.seek(self._mdat_start + 8)
+        self.file.write(struct.pack(">Q", end - self._mdat_start))
+        self.file.seek(end)
+        tables, duration = self._sample_tables()
+        self.file.write(movie_box(self.sps_nal, self.pps_nal, self.timescale, duration, tables))
@@ -2,7 +2,7 @@ import subprocess
 import time
 from pathlib import Path
 import logging
-from .video_transcoder import VideoTranscoder
+from .video_transcoder import TranscodeResult, VideoTranscoder
 
 logger = logging.getLogger(__name__)
 
@@ -51,4 +51,4 @@ class MP4Transcoder(VideoTranscoder):
             )
             raise
 
-        return output_path
+        return TranscodeResult(output_path, elapsed=elapsed_time)
@@ -1,9 +1,25 @@
 import logging
-from .video_transcoder import VideoTranscoder
+import shutil
+from .video_transcoder import TranscodeResult, VideoTranscoder
+from .pts import analyze_timestamps, load_timestamps
+from app.lib.camera.file_manager import WRITE_BUFFER_SIZE
 
 logger = logging.getLogger(__name__)
 
 
 class NullTranscoder(VideoTranscoder):
     def convert(self, raw_path, pts_file=None):
-        return self.file_manager.move_to_output(raw_path, raw_path.name)
+        timing = analyze_timestamps(load_timestamps(pts_file), self.framerate)
+        spill = self.file_manager.spill_path(raw_path)
+        if spill != raw_path and spill.exists():
+            # Part of the recording spilled to disk; join both parts into the output.
+            size = raw_path.stat().st_size + spill.stat().st_size
+            with self.file_manager.open_raw(raw_path) as source, \
+                    self.file_manager.write_output(raw_path.name, size) as output:
+                shutil.copyfileobj(source, output, WRITE_BUFFER_SIZE)
+            path = self.file_manager.output_dir / raw_path.name
+            return TranscodeResult.from_timing(path, timing, bytes_written=size)
+        # A rename within the storage writes no data.
+        renamed = self.file_manager.is_on_storage(raw_path)
+        path = self.file_manager.move_to_output(raw_path, raw_path.name)
+        return TranscodeResult.from_timing(path, timing, bytes_written=0 if renamed else None)
@@ -0,0 +1,88 @@
+"""Loading and checking of picamera2-style PTS files (one millisecond timestamp per frame)."""
+
+import logging
+import warnings
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+PTS_HEADER = "# timestamp format v2"
+
+
+def load_timestamps(pts_file):
+    """Reads a PTS file.
+
+    Args:
+        pts_file (str or Path): PTS file, optionally starting with a header line.
+
+    Returns:
+        np.ndarray: int64 timestamps in microseconds, empty if the file is
+        missing or invalid.
+    """
+    if not pts_file or not Path(pts_file).exists():
+        return np.empty(0, dtype=np.int64)
+    try:
+        with warnings.catch_warnings():
+            # A clip stopped before its first frame has only the header line.
+            warnings.filterwarnings("ignore", "loadtxt: input contained no data", UserWarning)
+            milliseconds = np.loadtxt(pts_file, dtype=np.float64, comments="#", ndmin=1)
+    except ValueError as e:
+        logger.error(f"Invalid PTS file {pts_file}: {e}")
+        return np.empty(0, dtype=np.int64)
+    return np.rint(milliseconds * 1000).astype(np.int64)
+
+
+def normalize_timestamps(timestamps):
+    """Shifts timestamps to start at 0."""
+    if timestamps.size == 0:
+        return timestamps
+    return timestamps - timestamps[0]
+
+
+def write_timestamps(pts_file, timestamps):
+    """Writes microsecond timestamps as a PTS file with a header."""
+    np.savetxt(pts_file, timestamps / 1000, fmt="%.3f", header=PTS_HEADER[2:], comments="# ")
+
+
+def analyze_timestamps(timestamps, framerate):
+    """Finds dropped frames from the gaps between timestamps.
+
+    The frame interval is the median interval, so a camera running slower
+    than the configured framerate (long exposures) does not count as
+    dropping frames. A gap of n intervals means n - 1 frames were dropped.
+
+    Args:
+        timestamps (np.ndarray): Timestamps in microseconds.
+        framerate (float): Configured framerate, used when there are too few frames.
+
+    Returns:
+        dict: frames, duration (s), frame_interval (s), dropped_frames, gaps
+        (number of places where frames were dropped) and out_of_order.
+    """
+    frames = int(timestamps.size)
+    frame_interval = 1_000_000 / framerate
+    if frames < 2:
+        return {
+            "frames": frames,
+            "duration": frames * frame_interval / 1_000_000,
+            "frame_interval": frame_interval / 1_000_000,
+            "dropped_frames": 0,
+            "gaps": 0,
+            "out_of_order": 0,
+        }
+    intervals = np.diff(timestamps)
+    positive = intervals[intervals > 0]
+    if positive.size:
+        frame_interval = float(np.median(positive))
+    missing = np.rint(intervals / frame_interval).astype(np.int64) - 1
+    np.maximum(missing, 0, out=missing)
+    return {
+        "frames": frames,
+        "duration": float(timestamps[-1] - timestamps[0] + frame_interval) / 1_000_000,
+        "frame_interval": frame_interval / 1_000_000,
+        "dropped_frames": int(missing.sum()),
+        "gaps": int(np.count_nonzero(missing)),
+        "out_of_order": int(np.count_nonzero(intervals <= 0)),
+    }
@@ -1,6 +1,59 @@
 from abc import ABC, abstractmethod
 import logging
 
+
+class TranscodeResult:
+    """Outcome of a conversion: the output file and the timing of the recording."""
+
+    def __init__(self, path, frames=None, duration=None, dropped_frames=0, gaps=0, elapsed=None,
+                 bytes_written=None):
+        """
+        Args:
+            path (Path): The output file.
+            frames (int, optional): Frames written.
+            duration (float, optional): Duration of the clip in seconds.
+            dropped_frames (int): Frames missing according to the PTS file.
+            gaps (int): Places in the clip where frames were dropped.
+            elapsed (float, optional): Seconds the conversion took.
+            bytes_written (int, optional): Bytes the conversion wrote to the
+                output storage. Defaults to the size of the output file.
+        """
+        self.path = path
+        self.frames = frames
+        self.duration = duration
+        self.dropped_frames = dropped_frames
+        self.gaps = gaps
+        self.elapsed = elapsed
+        self.bytes_written = bytes_written
+        self.storage_bytes = None
+        self.write_amplification = None
+
+    @classmethod
+    def from_timing(cls, path, timing, frames=None, elapsed=None, bytes_written=None):
+        """Builds a result from the output of pts.analyze_timestamps()."""
+        return cls(
+            path,
+            frames=timing["frames"] if frames is None else frames,
+            duration=timing["duration"],
+            dropped_frames=timing["dropped_frames"],
+            gaps=timing["gaps"],
+            elapsed=elapsed,
+            bytes_written=bytes_written,
+        )
+
+    def to_dict(self):
+        return {
+            "filename": self.path.name,
+            "frames": self.frames,
+            "duration": self.duration,
+            "dropped_frames": self.dropped_frames,
+            "gaps": self.gaps,
+            "elapsed": self.elapsed,
+            "storage_bytes": self.storage_bytes,
+            "write_amplification": self.write_amplification,
+        }
+
+
 class VideoTranscoder(ABC):
     def __init__(self, file_manager, framerate, video_format):
         self.file_manager = file_manager
@@ -10,4 +63,9 @@ class VideoTranscoder(ABC):
 
     @abstractmethod
     def convert(self, raw_path, pts_file=None):
+        """Converts a raw recording and saves it to the output directory.
+
+        Returns:
+            TranscodeResult: The output file and frame statistics.
+        """
         pass
@@ -0,0 +1,192 @@
+"""Offline evaluator that scores motion detection settings on recorded clips.
+
+Every clip in a capture directory is decoded once to grayscale frames at the
+detection size, then run through each algorithm/threshold/blur combination
+via the same detect() interface the live detector uses. Clips are spread
+over a process pool, one clip per worker.
+
+Labels are optional: a JSON file mapping clip file names to lists of
+[start, end] seconds that contain motion. For labelled clips every frame is
+scored, and precision/recall are reported per combination together with the
+CPU time spent per frame. Unlabelled clips only contribute detection counts
+and CPU cost.
+
+Usage:
+    python -m app.tools.evaluate captures --labels labels.json \\
+        --algorithms frame_diff running_average --thresholds 3 5 7 --blur 0 3
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import cv2
+
+from app.lib.camera.algorithms import MOTION_ALGORITHMS, get_motion_algorithm
+from app.tools.benchmark import parse_size
+
+VIDEO_EXTENSIONS = (".mp4", ".mkv", ".h264", ".avi", ".mov")
+
+
+def decode_clip(path, detect_size, sample_fps=None):
+    """Decodes a clip to grayscale frames at ``detect_size``.
+
+    Returns:
+        list: (timestamp_seconds, frame) tuples.
+    """
+    capture = cv2.VideoCapture(str(path))
+    if not capture.isOpened():
+        raise RuntimeError(f"Unable to open {path}")
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30
+    frames = []
+    next_sample = 0.0
+    index = 0
+    try:
+        while True:
+            ok, bgr = capture.read()
+            if not ok:
+                break
+            timestamp = index / fps
+            index += 1
+            if sample_fps and timestamp < next_sample:
+                continue
+            if sample_fps:
+                next_sample += 1.0 / sample_fps
+            small = cv2.resize(bgr, detect_size, interpolation=cv2.INTER_AREA)
+            frames.append((timestamp, cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)))
+    finally:
+        capture.release()
+    return frames
+
+
+def in_intervals(timestamp, intervals):
+    return any(start <= timestamp <= end for start, end in intervals)
+
+
+def evaluate_clip(path, intervals, combinations, detect_size, sample_fps):
+    """Runs every combination over one clip. Executed in a worker process."""
+    logging.getLogger("app.lib").setLevel(logging.WARNING)
+    frames = decode_clip(path, detect_size, sample_fps)
+    results = []
+    for name, threshold, blur in combinations:
+        algorithm = get_motion_algorithm(name, threshold, blur)
+        counts = {"tp": 0, "fp": 0, "fn": 0, "tn": 0, "detections": 0}
+        cpu_start = time.thread_time()
+        flags = [bool(algorithm.detect(frame)) for _, frame in frames]
+        cpu = time.thread_time() - cpu_start
+        for (timestamp, _), detected in zip(frames, flags):
+            counts["detections"] += detected
+            if intervals is None:
+                continue
+            moving = in_intervals(timestamp, intervals)
+            key = ("tp" if moving else "fp") if detected else ("fn" if moving else "tn")
+            counts[key] += 1
+        results.append({
+            "algorithm": name,
+            "threshold": threshold,
+            "blur_strength": blur,
+            "frames": len(frames),
+            "labelled": intervals is not None,
+            "cpu_seconds": cpu,
+            **counts,
+        })
+    return path.name, results
+
+
+def summarize(per_clip):
+    """Sums per-clip counts into one row per combination."""
+    totals = {}
+    for results in per_clip.values():
+        for result in results:
+            key = (result["algorithm"], result["threshold"], result["blur_strength"])
+            total = totals.setdefault(key, {
+                "algorithm": key[0], "threshold": key[1], "blur_strength": key[2],
+                "frames": 0, "labelled_frames": 0, "cpu_seconds": 0.0,
+                "tp": 0, "fp": 0, "fn": 0, "tn": 0, "detections": 0,
+            })
+            total["frames"] += result["frames"]
+            total["cpu_seconds"] += result["cpu_seconds"]
+            if result["labelled"]:
+                total["labelled_frames"] += result["frames"]
+            for field in ("tp", "fp", "fn", "tn", "detections"):
+                total[field] += result[field]
+
+    rows = []
+    for total in totals.values():
+        tp, fp, fn = total["tp"], total["fp"], total["fn"]
+        total["precision"] = round(tp / (tp + fp), 4) if tp + fp else None
+        total["recall"] = round(tp / (tp + fn), 4) if tp + fn else None
+        total["cpu_ms_per_frame"] = round(total["cpu_seconds"] * 1000 / total["frames"], 4) if total["frames"] else None
+        rows.append(total)
+    rows.sort(key=lambda row: (-(row["recall"] or 0), -(row["precision"] or 0), row["cpu_ms_per_frame"] or 0))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score motion detection settings on recorded clips.")
+    parser.add_argument("captures", help="Directory of recorded clips (capture.directory).")
+    parser.add_argument("--labels", help="JSON file mapping clip names to [start, end] second intervals with motion.")
+    parser.add_argument("--algorithms", nargs="+", default=["frame_diff"], choices=MOTION_ALGORITHMS)
+    parser.add_argument("--thresholds", nargs="+", type=float, default=[3, 5, 7])
+    parser.add_argument("--blur", nargs="+", type=int, default=[0, 3])
+    parser.add_argument("--detect-size", type=parse_size, default=(320, 240))
+    parser.add_argument("--sample-fps", type=float, default=None,
+                        help="Evaluate at this detection rate instead of every frame (motion.detection_fps).")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("-o", "--output", default="evaluation.json", help="JSON results file.")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+    logger = logging.getLogger(__name__)
+
+    labels = {}
+    if args.labels:
+        with open(args.labels) as f:
+            labels = json.load(f)
+
+    clips = sorted(p for p in Path(args.captures).iterdir() if p.suffix.lower() in VIDEO_EXTENSIONS)
+    if not clips:
+        parser.error(f"No clips found in {args.captures}")
+    combinations = list(itertools.product(args.algorithms, args.thresholds, args.blur))
+    logger.info(f"Evaluating {len(combinations)} combinations on {len(clips)} clips with {args.workers} workers.")
+
+    per_clip = {}
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = {
+            executor.submit(
+                evaluate_clip, clip, labels.get(clip.name), combinations, args.detect_size, args.sample_fps
+            ): clip
+            for clip in clips
+        }
+        for future in as_completed(futures):
+            clip = futures[future]
+            try:
+                name, results = future.result()
+                per_clip[name] = results
+                logger.info(f"Evaluated {name}.")
+            except Exception as e:
+                logger.error(f"Failed to evaluate {clip.name}: {e}")
+
+    rows = summarize(per_clip)
+    print(f"{'algorithm':24} {'thr':>4} {'blur':>4} {'precision':>9} {'recall':>7} {'cpu ms/frame':>12}")
+    for row in rows:
+        precision = "-" if row["precision"] is None else f"{row['precision']:.3f}"
+        recall = "-" if row["recall"] is None else f"{row['recall']:.3f}"
+        cpu = "-" if row["cpu_ms_per_frame"] is None else f"{row['cpu_ms_per_frame']:.3f}"
+        print(
+            f"{row['algorithm']:24} {row['threshold']:>4g} {row['blur_strength']:>4} "
+            f"{precision:>9} {recall:>7} {cpu:>12}"
+        )
+
+    with open(args.output, "w") as f:
+        json.dump({"summary": rows, "clips": per_clip}, f, indent=2)
+    logger.info(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 from app import create_app
 
-app = create_app()
-
 if __name__ == "__main__":
+    # Guarded so worker processes started with the "spawn" method (see
+    # DetectionProcess) can import this module without starting a second app.
+    app = create_app()
     app.run(host="0.0.0.0", port=5000, debug=True, use_reloader=False)